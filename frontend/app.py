@@ -8,6 +8,9 @@ import os
 API_BASE = os.getenv("API_URL", "http://backend:8000") + "/api/v1"
 OLLAMA_API = os.getenv("OLLAMA_HOST", "http://host.docker.internal:11434")
 
+# Dashboard users are waiting on the result, so ask for the interactive queue
+API_HEADERS = {"X-Priority": "interactive"}
+
 # Page config
 st.set_page_config(
     page_title="NLP Services Dashboard",
@@ -324,6 +327,7 @@ with col1:
                     cleaned_text = text_input.strip().strip('"')
                     response = requests.post(
                         f"{API_BASE}/sentiment",
+                        headers=API_HEADERS,
                         json={
                             "text": text_input,
                             "options": {
@@ -444,6 +448,7 @@ with col2:
 
                     response = requests.post(
                         f"{API_BASE}/ner",
+                        headers=API_HEADERS,
                         json=payload
                     )
 
@@ -535,6 +540,7 @@ with col3:
                 try:
                     response = requests.post(
                         f"{API_BASE}/classify",
+                        headers=API_HEADERS,
                         json={
                             "text": classify_text,
                             "options": {
@@ -622,6 +628,7 @@ with col4:
                     try:
                         response = requests.post(
                             f"{API_BASE}/summarize",
+                            headers=API_HEADERS,
                             json={
                                 "text": summarize_text,
                                 "options": {
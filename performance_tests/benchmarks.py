@@ -0,0 +1,209 @@
+"""
+Micro-benchmarks for the service's own CPU work
+
+Times the hot paths around each model call (cache keys, JSON extraction,
+entity validation, text features, pydantic validation) on realistic input
+sizes. Nothing here needs Ollama or Redis.
+
+    python -m performance_tests.benchmarks                       # print results
+    python -m performance_tests.benchmarks --save baseline.json  # write a baseline
+    python -m performance_tests.benchmarks --compare performance_tests/baseline.json
+
+With --compare each benchmark is shown against the baseline, and the exit
+status is 1 if any got slower than --threshold (default 1.25x).
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+from src.api.models import (
+    AnalyzeRequest,
+    JobRequest,
+    NERResponse,
+    SentimentRequest,
+    SummarizationRequest,
+    TextClassificationResponse,
+)
+from src.cache.cache_manager import CacheManager
+from src.models.ner_analyzer import NERAnalyzer
+from src.models.sentiment_analyzer import SentimentAnalyzer
+from src.models.text_summarizer import TextSummarizer
+from src.utils.json_utils import extract_json_object
+from src.utils.text_utils import split_sentences
+
+WORDS = (
+    "the service quarterly revenue growth customers product launch market team support "
+    "delivery great terrible really love hate battery screen update price shipping quality"
+).split()
+NAMES = ["Microsoft", "Seattle", "Tesla", "Berlin", "ISRO", "SpaDex", "John Smith", "Reserve Bank", "Tuesday", "$4.2 billion"]
+
+
+def make_text(n_chars: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = []
+    while sum(len(word) + 1 for word in words) < n_chars:
+        words.append(rng.choice(WORDS + NAMES) if rng.random() < 0.9 else rng.choice(NAMES))
+    return " ".join(words)[:n_chars]
+
+
+def make_entities(text: str, count: int, seed: int = 0) -> List[Dict]:
+    """Model-style entities: most correct, some with wrong offsets, some hallucinated"""
+    rng = random.Random(seed)
+    entities = []
+    for i in range(count):
+        name = rng.choice(NAMES)
+        start = text.find(name)
+        roll = rng.random()
+        if roll < 0.1:
+            name = f"Unknown Corp {i}"  # Not in the text
+        elif roll < 0.4:
+            start += 3  # Offsets off by a few characters
+        entities.append({"text": name, "type": "ORG", "start": start, "end": start + len(name), "confidence": 0.912345})
+    return entities
+
+
+def model_output(payload: Dict) -> str:
+    """Raw model output with the JSON wrapped in prose and a markdown fence"""
+    return f"Sure! Here is the analysis you asked for:\n```json\n{json.dumps(payload, indent=2)}\n```\nLet me know if you need more."
+
+
+def build_benchmarks() -> Dict[str, Callable[[], object]]:
+    # Only the pure methods are timed, so skip the constructors' pool and Redis setup
+    cache = CacheManager.__new__(CacheManager)
+    ner = NERAnalyzer.__new__(NERAnalyzer)
+    sentiment = SentimentAnalyzer.__new__(SentimentAnalyzer)
+    summarizer = TextSummarizer.__new__(TextSummarizer)
+
+    short_text, review, article = make_text(120, 1), make_text(500, 2), make_text(8000, 3)
+    classify_options = {"categories": ["Business", "Technology", "Science", "Sports", "Politics"], "multi_label": True}
+
+    ner_text = make_text(5000, 4)
+    ner_entities = make_entities(ner_text, 500)
+
+    sentiment_output = model_output({"sentiment": "POSITIVE", "confidence": 0.93, "explanation": "Praises the battery and screen"})
+    ner_output = model_output({"entities": make_entities(ner_text, 200)})
+
+    financial = " ".join(
+        f"Revenue rose to ${i}.{i % 10}billion while costs fell ${i * 3}million and margins held at {i}.5%."
+        for i in range(1, 120)
+    )
+
+    sentiment_request = {"text": review[:480], "options": {"include_metadata": True}, "model": "gemma"}
+    summarize_request = {"text": article, "options": {"max_length": 150, "type": "abstractive"}}
+    analyze_request = {
+        "text": review,
+        "tasks": ["sentiment", "ner", "classify", "summarize"],
+        "options": {"ner": {"extract_time": True}, "classify": classify_options}
+    }
+    job_request = {"task": "classify", "items": [make_text(200, i) for i in range(1000)], "options": classify_options}
+    ner_response = {"text": ner_text, "entities": ner.__class__._validate_entities(ner, ner_text, make_entities(ner_text, 200)),
+                    "model": "llama3.2:3b"}
+    classify_response = {
+        "text": review, "primary_category": "Technology", "confidence": 0.82,
+        "all_categories": [{"category": c, "confidence": 0.1 * i} for i, c in enumerate(classify_options["categories"])],
+        "explanation": "Mentions product launch and battery", "model": "llama3.2:3b"
+    }
+
+    return {
+        "generate_key/short": lambda: cache.generate_key("sentiment", short_text, model="llama3.2:3b"),
+        "generate_key/article+options": lambda: cache.generate_key("classify", article, classify_options, model="llama3.2:3b"),
+        "extract_json/sentiment": lambda: extract_json_object(sentiment_output),
+        "extract_json/ner_200_entities": lambda: extract_json_object(ner_output),
+        # The method updates entities in place, so each call gets fresh copies (included in the time)
+        "validate_entities/500": lambda: ner._validate_entities(ner_text, [dict(entity) for entity in ner_entities]),
+        "sentiment_features/review": lambda: sentiment._extract_sentiment_features(review),
+        "sentiment_features/article": lambda: sentiment._extract_sentiment_features(article),
+        "split_sentences/article": lambda: split_sentences(article),
+        "clean_currency_numbers/report": lambda: summarizer.clean_currency_numbers(financial),
+        "pydantic/sentiment_request": lambda: SentimentRequest.model_validate(sentiment_request),
+        "pydantic/summarize_request": lambda: SummarizationRequest.model_validate(summarize_request),
+        "pydantic/analyze_request": lambda: AnalyzeRequest.model_validate(analyze_request),
+        "pydantic/job_request_1000_items": lambda: JobRequest.model_validate(job_request),
+        "pydantic/ner_response_200_entities": lambda: NERResponse.model_validate(ner_response).model_dump_json(),
+        "pydantic/classify_response": lambda: TextClassificationResponse.model_validate(classify_response).model_dump_json(),
+    }
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """Per-call time in microseconds over `repeat` runs of at least `min_time` seconds each"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [seconds / number * 1e6 for seconds in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min_us": round(min(runs), 3),
+        "median_us": round(statistics.median(runs), 3),
+        "stdev_us": round(statistics.stdev(runs), 3) if len(runs) > 1 else 0.0,
+        "calls_per_run": number
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> Tuple[List[str], List[str]]:
+    """Lines for the comparison table, and the names of benchmarks slower than threshold"""
+    lines, regressions = [], []
+    for name, result in results.items():
+        if name not in baseline:
+            lines.append(f"{name:<40} {result['min_us']:>12.2f} us   (new)")
+            continue
+        ratio = result["min_us"] / baseline[name]["min_us"]
+        flag = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        lines.append(f"{name:<40} {result['min_us']:>12.2f} us   {baseline[name]['min_us']:>12.2f} us   x{ratio:.2f}{flag}")
+    return lines, regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m performance_tests.benchmarks", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per run")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    benchmarks = build_benchmarks()
+    results = {}
+    for name, func in benchmarks.items():
+        if args.filter and args.filter not in name:
+            continue
+        func()  # Warm up caches (regexes, pydantic validators)
+        results[name] = measure(func, args.repeat, args.min_time)
+        if not args.compare:
+            print(f"{name:<40} {results[name]['min_us']:>12.2f} us  (median {results[name]['median_us']:.2f})")
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        lines, regressions = compare(results, baseline["results"], args.threshold)
+        print(f"{'benchmark':<40} {'current':>15}   {'baseline':>15}")
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above x{args.threshold}: {', '.join(regressions)}")
+            status = 1
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results
+            }, file, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
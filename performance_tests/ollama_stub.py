@@ -0,0 +1,392 @@
+"""
+Stand-in Ollama server for load tests and local development
+
+Speaks enough of the Ollama API (/api/generate, /api/embed, /api/tags,
+/api/ps) for the service to run end to end without a GPU. Generations
+return well-formed results for every service prompt, with latency drawn
+from a configurable distribution plus time per prompt and output token.
+
+    python -m performance_tests.ollama_stub --port 11434 --latency lognormal:0.3,0.5 --tokens-per-second 40
+
+Failures can be injected (HTTP 500s, hung requests, malformed JSON), and
+real responses can be recorded through a real Ollama and replayed later:
+
+    python -m performance_tests.ollama_stub --upstream http://gpu-box:11434 --record recordings.jsonl
+    python -m performance_tests.ollama_stub --replay recordings.jsonl
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_MODELS = ["llama3.2:3b", "gemma2:2b", "qwen2.5:3b", "phi3:3.8b", "nomic-embed-text"]
+
+# Where each service prompt puts the input text
+TEXT_MARKERS = re.compile(r'(?:Analyze this text|Text to analyze|Text to classify|Text to summarize):\s*"?(.*?)"?\s*$', re.S)
+CATEGORIES = re.compile(r"these categories ONLY (\[.*?\])")
+CAPITALIZED = re.compile(r"\b[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*")
+POSITIVE = {"good", "great", "love", "amazing", "excellent", "happy", "enjoyed", "fantastic", "win"}
+NEGATIVE = {"bad", "terrible", "hate", "awful", "poor", "worst", "slow", "broken", "disappointed"}
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Build a base-latency sampler (seconds) from a spec
+
+    none | fixed:S | uniform:LOW,HIGH | normal:MEAN,STDEV | lognormal:MEDIAN,SIGMA
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "none":
+        return lambda rng: 0.0
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count: about four characters per token"""
+    return max(1, len(text) // 4)
+
+
+def embed(text: str, dim: int) -> List[float]:
+    """
+    Deterministic bag-of-words embedding
+
+    Words are hashed into `dim` buckets and the vector normalized, so
+    texts sharing words get a high cosine similarity, like a real model.
+    """
+    vector = [0.0] * dim
+    for word in re.findall(r"[a-z0-9']+", text.lower()):
+        digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class SyntheticModel:
+    """Plausible results for each service's prompt, derived from the input text"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+
+    @staticmethod
+    def _input_text(prompt: str) -> str:
+        match = TEXT_MARKERS.search(prompt[-20000:])
+        return match.group(1) if match else prompt[-500:]
+
+    def sentiment(self, text: str) -> Dict[str, Any]:
+        words = set(re.findall(r"[a-z]+", text.lower()))
+        score = len(words & POSITIVE) - len(words & NEGATIVE)
+        label = "POSITIVE" if score > 0 else "NEGATIVE" if score < 0 else "NEUTRAL"
+        return {"sentiment": label, "confidence": round(self.rng.uniform(0.7, 0.98), 2),
+                "explanation": f"The text reads as {label.lower()} overall"}
+
+    def ner(self, text: str, entity_type: str = "ORG") -> Dict[str, Any]:
+        entities = [
+            {"text": match.group(0), "type": entity_type, "start": match.start(), "end": match.end(),
+             "confidence": round(self.rng.uniform(0.8, 0.99), 2)}
+            for match in CAPITALIZED.finditer(text)
+        ]
+        return {"entities": entities[:20]}
+
+    def classify(self, categories: List[str]) -> Dict[str, Any]:
+        ranked = self.rng.sample(categories, len(categories))
+        scores = sorted((round(self.rng.uniform(0.3, 0.9), 2) for _ in ranked), reverse=True)
+        return {
+            "primary_category": ranked[0],
+            "confidence": scores[0],
+            "all_categories": [{"category": c, "confidence": s} for c, s in zip(ranked[:3], scores[:3])],
+            "explanation": f"Mostly about {ranked[0].lower()}"
+        }
+
+    def summarize(self, text: str) -> Dict[str, Any]:
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()] or [text]
+        return {"summary": " ".join(sentences[:2]), "key_points": sentences[:3]}
+
+    def _for_schema(self, task: str, schema: Dict[str, Any], text: str) -> Dict[str, Any]:
+        if task == "sentiment":
+            return self.sentiment(text)
+        if task == "ner":
+            types = schema["properties"]["entities"]["items"]["properties"]["type"].get("enum") or ["ORG"]
+            return self.ner(text, "ORG" if "ORG" in types else types[0])
+        if task == "classify":
+            return self.classify(schema["properties"]["primary_category"]["enum"])
+        return self.summarize(text)
+
+    def respond(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+        text = self._input_text(prompt)
+        if isinstance(schema, dict) and schema.get("properties"):
+            # Joint analysis: one section per task in the schema
+            result = {task: self._for_schema(task, sub, text) for task, sub in schema["properties"].items()}
+        elif "sentiment analyzer" in prompt:
+            result = self.sentiment(text)
+        elif "Named Entity Recognition" in prompt:
+            result = self.ner(text)
+        elif "text classifier" in prompt:
+            match = CATEGORIES.search(prompt)
+            result = self.classify(ast.literal_eval(match.group(1)) if match else ["Business", "Technology"])
+        elif "summarizer" in prompt:
+            result = self.summarize(text)
+        else:
+            result = {"response": "ok"}
+        return json.dumps(result)
+
+
+class StubOllama(ThreadingHTTPServer):
+    """The stub server; settings are plain attributes so tests can change them live"""
+
+    daemon_threads = True
+
+    def __init__(self, address, models=DEFAULT_MODELS, latency: str = "none", tokens_per_second: float = 0.0,
+                 prompt_tokens_per_second: float = 0.0, error_rate: float = 0.0, timeout_rate: float = 0.0,
+                 timeout_seconds: float = 300.0, malformed_rate: float = 0.0, embed_dim: int = 256,
+                 upstream: Optional[str] = None, record: Optional[str] = None, replay: Optional[str] = None,
+                 seed: Optional[int] = None):
+        super().__init__(address, StubHandler)
+        self.models = list(models)
+        self.latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.malformed_rate = malformed_rate
+        self.embed_dim = embed_dim
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.rng = random.Random(seed)
+        self.model = SyntheticModel(self.rng)
+        self.lock = threading.Lock()
+        self.stats = {"generate": 0, "embed": 0, "errors": 0, "timeouts": 0, "malformed": 0, "replayed": 0, "recorded": 0}
+
+        self.recordings: Dict[str, Dict[str, Any]] = {}
+        if replay:
+            with open(replay) as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recordings[entry["key"]] = entry["response"]
+        self._record_file = open(record, "a", buffering=1) if record else None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self, stat: str):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+    @staticmethod
+    def request_key(path: str, body: Dict[str, Any]) -> str:
+        """Recordings are matched on what decides the output, not on options like keep_alive"""
+        relevant = {k: body.get(k) for k in ("model", "prompt", "format", "system", "input")}
+        return hashlib.sha256(json.dumps([path, relevant], sort_keys=True).encode()).hexdigest()
+
+    def forward(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a request to the real Ollama, recording the response"""
+        request = urllib.request.Request(
+            self.upstream + path, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+            result = json.loads(response.read())
+        if self._record_file is not None:
+            entry = {"key": self.request_key(path, body), "path": path, "request": body, "response": result}
+            with self.lock:
+                self._record_file.write(json.dumps(entry) + "\n")
+            self.count("recorded")
+        return result
+
+    def server_close(self):
+        super().server_close()
+        if self._record_file is not None:
+            self._record_file.close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: StubOllama
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Any, raw: Optional[bytes] = None):
+        payload = raw if raw is not None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            return self._send(200, {"models": [{"name": name, "model": name} for name in self.server.models]})
+        if self.path == "/api/ps":
+            return self._send(200, {"models": [{"name": name, "model": name} for name in self.server.models]})
+        if self.path == "/api/version":
+            return self._send(200, {"version": "stub"})
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except json.JSONDecodeError:
+            return self._send(400, {"error": "invalid JSON body"})
+        if self.path not in ("/api/generate", "/api/embed"):
+            return self._send(404, {"error": "not found"})
+        if body.get("model") not in self.server.models:
+            return self._send(404, {"error": f"model '{body.get('model')}' not found, try pulling it first"})
+
+        # Injected failures
+        roll = self.server.roll()
+        if roll < self.server.error_rate:
+            self.server.count("errors")
+            return self._send(500, {"error": "injected failure"})
+        if roll < self.server.error_rate + self.server.timeout_rate:
+            self.server.count("timeouts")
+            time.sleep(self.server.timeout_seconds)
+            return self._send(500, {"error": "injected timeout"})
+
+        if self.path == "/api/embed":
+            self.server.count("embed")
+            return self._send(200, self._embed(body))
+        self.server.count("generate")
+        result = self._generate(body)
+        if result is None:
+            return
+        if self.server.roll() < self.server.malformed_rate:
+            self.server.count("malformed")
+            result["response"] = result["response"][: len(result["response"]) // 2]  # Cut off mid-object
+        self._send(200, result)
+
+    def _replayed_or_forwarded(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = self.server.request_key(self.path, body)
+        if key in self.server.recordings:
+            self.server.count("replayed")
+            recorded = dict(self.server.recordings[key])
+            time.sleep(recorded.get("total_duration", 0) / 1e9)  # Replay the original timing too
+            return recorded
+        if self.server.upstream:
+            return self.server.forward(self.path, body)
+        return None
+
+    def _generate(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            recorded = self._replayed_or_forwarded(body)
+        except Exception as e:
+            self._send(502, {"error": f"upstream failed: {str(e)}"})
+            return None
+        if recorded is not None:
+            return recorded
+
+        with self.server.lock:
+            text = self.server.model.respond(body.get("prompt", ""), body.get("format"))
+            base = self.server.latency(self.server.rng)
+        prompt_tokens, output_tokens = count_tokens(body.get("prompt", "")), count_tokens(text)
+        prompt_seconds = prompt_tokens / self.server.prompt_tokens_per_second if self.server.prompt_tokens_per_second else 0.0
+        eval_seconds = output_tokens / self.server.tokens_per_second if self.server.tokens_per_second else 0.0
+        time.sleep(base + prompt_seconds + eval_seconds)
+        return {
+            "model": body["model"],
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "response": text,
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((base + prompt_seconds + eval_seconds) * 1e9),
+            "load_duration": int(base * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_seconds * 1e9),
+            "eval_count": output_tokens,
+            "eval_duration": int(eval_seconds * 1e9)
+        }
+
+    def _embed(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        recorded = self._replayed_or_forwarded(body) if self.server.upstream or self.server.recordings else None
+        if recorded is not None:
+            return recorded
+        inputs = body.get("input", "")
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+        with self.server.lock:
+            base = self.server.latency(self.server.rng)
+        time.sleep(base)
+        return {
+            "model": body["model"],
+            "embeddings": [embed(text, self.server.embed_dim) for text in inputs],
+            "total_duration": int(base * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": sum(count_tokens(text) for text in inputs)
+        }
+
+
+def start_stub(host: str = "127.0.0.1", port: int = 0, **settings) -> StubOllama:
+    """Run a stub server in a background thread (port 0 picks a free port)"""
+    server = StubOllama((host, port), **settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m performance_tests.ollama_stub", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="Comma-separated model tags to serve")
+    parser.add_argument("--latency", default="none",
+                        help="Base latency: none | fixed:S | uniform:LOW,HIGH | normal:MEAN,STDEV | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed; 0 for instant")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0, help="Prompt evaluation speed; 0 for instant")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--timeout-seconds", type=float, default=300.0, help="How long hung requests hang")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of generations with broken JSON")
+    parser.add_argument("--embed-dim", type=int, default=256)
+    parser.add_argument("--upstream", help="Real Ollama to forward requests to (with --record)")
+    parser.add_argument("--record", help="Append upstream responses to this JSONL file")
+    parser.add_argument("--replay", help="Serve responses recorded in this JSONL file when the request matches")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    server = StubOllama(
+        (args.host, args.port),
+        models=[model.strip() for model in args.models.split(",") if model.strip()],
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        malformed_rate=args.malformed_rate,
+        embed_dim=args.embed_dim,
+        upstream=args.upstream,
+        record=args.record,
+        replay=args.replay,
+        seed=args.seed
+    )
+    print(f"Ollama stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,189 @@
-# Locust - Open source load testing tools written in python 
+# Locust - Open source load testing tools written in python
 # It can simulate how real users will interact with the API
 # Provide detaile statistics and graphs
+#
+# Run against the service backed by the Ollama stub (performance_tests/ollama_stub.py):
+#
+#   locust -f performance_tests/test_load.py --host http://localhost:8000 --headless -u 50 -r 10 -t 5m \
+#       --cache-hit-ratio 0.8 --corpus texts.jsonl --report-dir reports/
+#
+# --cache-hit-ratio  share of requests reusing a text from a small hot set (cache hits once warm);
+#                    the rest get a unique text and always reach the model
+# --corpus           .txt (one text per line) or .jsonl ({"text": ...}) file of texts; a built-in
+#                    corpus of varied lengths and topics is used otherwise
+# --report-dir       where the per-endpoint p50/p95/p99 report (JSON and CSV) is written at the end
+
+import csv
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+from locust import HttpUser, task, between, events
+
+BUILTIN_CORPUS = [
+    "I love this product!",
+    "John works at Microsoft in Seattle",
+    "Tesla announced new electric vehicle technology.",
+    "The battery died after two days and support never answered my emails. Really disappointed.",
+    "Apple reported quarterly revenue of $94.8 billion on Thursday, beating analyst expectations.",
+    "The delivery was fine, nothing special, but the packaging was a bit damaged.",
+    "ISRO successfully completed the SpaDex docking experiment, making India the fourth country to do so.",
+    "Manchester United beat Liverpool 2-1 at Old Trafford on Sunday afternoon.",
+    "The Reserve Bank of India kept the repo rate unchanged at 6.5 percent, citing sticky food inflation.",
+    "Researchers at MIT developed a new battery chemistry that charges in under ten minutes.",
+    "Honestly the worst customer service I have experienced, three calls and still no refund.",
+    "The new update makes the app faster and the dark mode looks great.",
+    "The Senate passed the infrastructure bill after weeks of negotiation between party leaders.",
+    "Amazon Web Services expanded its Mumbai region with two new availability zones.",
+    ("The quarterly report shows steady growth across all regions. Revenue increased by twelve percent "
+     "while operating costs stayed flat. Management expects the new product line to contribute to margins "
+     "next year, although supply chain delays remain a risk. The board approved a dividend increase and a "
+     "share buyback programme. Analysts welcomed the results but questioned the pace of hiring. ") * 3,
+]
+
+CATEGORY_SETS = [
+    None,  # Service defaults
+    ["Business", "Technology", "Sports"],
+    ["Politics", "Science", "Entertainment", "Health"],
+]
+
+settings = {"cache_hit_ratio": 0.5, "hot_set_size": 20, "corpus": BUILTIN_CORPUS, "report_dir": "reports"}
+unique_counter = itertools.count()
+observed = {}  # endpoint -> [hits, total], from the Server-Timing header
+observed_lock = threading.Lock()
+
+
+@events.init_command_line_parser.add_listener
+def _(parser):
+    parser.add_argument("--cache-hit-ratio", type=float, env_var="LOAD_CACHE_HIT_RATIO", default=0.5,
+                        help="Share of requests drawn from the hot set (0-1)")
+    parser.add_argument("--hot-set-size", type=int, env_var="LOAD_HOT_SET_SIZE", default=20,
+                        help="Distinct texts in the hot set")
+    parser.add_argument("--corpus", type=str, env_var="LOAD_CORPUS", default="",
+                        help="Text corpus: .txt (one per line) or .jsonl with a 'text' field")
+    parser.add_argument("--report-dir", type=str, env_var="LOAD_REPORT_DIR", default="reports",
+                        help="Directory for the per-endpoint latency report")
+
+
+def load_corpus(path):
+    texts = []
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            texts.append(json.loads(line)["text"] if path.endswith(".jsonl") else line)
+    return texts
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    options = environment.parsed_options
+    if options is None:
+        return
+    settings["cache_hit_ratio"] = options.cache_hit_ratio
+    settings["hot_set_size"] = options.hot_set_size
+    settings["report_dir"] = options.report_dir
+    if options.corpus:
+        settings["corpus"] = load_corpus(options.corpus)
+
+
+def pick_text(hot_set_size=None):
+    """
+    A text from the hot set, or a unique one
+
+    Unique texts are a corpus text with a run-wide counter appended, so
+    they never match an earlier cache key but keep realistic content.
+    """
+    corpus = settings["corpus"]
+    if random.random() < settings["cache_hit_ratio"]:
+        return corpus[random.randrange(min(hot_set_size or settings["hot_set_size"], len(corpus)))]
+    return f"{random.choice(corpus)} (ref {next(unique_counter)}-{os.getpid()})"
+
+
+def record_outcome(name, response):
+    """A response served from the cache never reached the model, so has no ollama timing"""
+    if response.status_code != 200:
+        return
+    hit = "ollama" not in response.headers.get("server-timing", "")
+    with observed_lock:
+        counts = observed.setdefault(name, [0, 0])
+        counts[0] += hit
+        counts[1] += 1
 
-from locust import HttpUser, task, between
 
 class NLPUser(HttpUser):
     wait_time = between(1, 2)
 
-    @task(3)  # Higher weight for sentiment analysis 
+    def post(self, name, path, body):
+        with self.client.post(path, json=body, name=name, catch_response=True) as response:
+            record_outcome(name, response)
+            if response.status_code != 200:
+                response.failure(f"HTTP {response.status_code}")
+
+    @task(3)  # Higher weight for sentiment analysis
     def test_sentiment(self):
-        self.client.post(
-            "/api/v1/sentiment",
-            json={"text": "I love this product!"}
-        )
-    
+        self.post("sentiment", "/api/v1/sentiment", {"text": pick_text()[:500]})
+
     @task(2)
     def test_ner(self):
-        self.client.post(
-            "/api/v1/ner",
-            json={"text": "John works at Microsoft in Seattle"}
-        )
+        self.post("ner", "/api/v1/ner", {"text": pick_text()})
 
     @task(2)
     def test_classify(self):
-        self.client.post(
-            "/api/v1/classify",
-            json={
-                "text": "Tesla announced new electric vehicle technology.",
-                "options": {"multi_lable": True}
-            }
-        )
+        options = {"multi_label": True}
+        categories = random.choice(CATEGORY_SETS)
+        if categories:
+            options["categories"] = categories
+        self.post("classify", "/api/v1/classify", {"text": pick_text(), "options": options})
 
     @task(1)
     def test_summarization(self):
-        self.client.post(
-            "/api/v1/summarize",
-            json={
-                "text": "The quick brown fox jumps over the lazy dog." * 10,
-                "options": {"max_length":10}
-            }
-        )
\ No newline at end of file
+        text = pick_text()
+        while len(text) < 200:  # The summarizer wants some substance
+            text = f"{text} {random.choice(settings['corpus'])}"
+        self.post("summarize", "/api/v1/summarize", {"text": text, "options": {"max_length": 50}})
+
+    @task(1)
+    def test_analyze(self):
+        self.post("analyze", "/api/v1/analyze", {"text": pick_text()[:2000], "tasks": ["sentiment", "ner", "classify"]})
+
+
+@events.test_stop.add_listener
+def write_report(environment, **kwargs):
+    """Per-endpoint latency percentiles, throughput and observed cache hit ratio"""
+    rows = []
+    for entry in sorted(environment.stats.entries.values(), key=lambda entry: entry.name):
+        hits, total = observed.get(entry.name, (0, 0))
+        rows.append({
+            "endpoint": entry.name,
+            "method": entry.method,
+            "requests": entry.num_requests,
+            "failures": entry.num_failures,
+            "rps": round(entry.total_rps, 3),
+            "p50_ms": entry.get_response_time_percentile(0.50),
+            "p95_ms": entry.get_response_time_percentile(0.95),
+            "p99_ms": entry.get_response_time_percentile(0.99),
+            "max_ms": entry.max_response_time,
+            "cache_hit_ratio": round(hits / total, 4) if total else None
+        })
+
+    os.makedirs(settings["report_dir"], exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(settings["report_dir"], f"load-{stamp}")
+    with open(f"{base}.json", "w") as file:
+        json.dump({
+            "target_cache_hit_ratio": settings["cache_hit_ratio"],
+            "hot_set_size": settings["hot_set_size"],
+            "corpus_size": len(settings["corpus"]),
+            "endpoints": rows
+        }, file, indent=2)
+    if rows:
+        with open(f"{base}.csv", "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    print(f"Load test report written to {base}.json")
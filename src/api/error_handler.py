@@ -5,24 +5,37 @@ from src.exceptions.custom_exceptions import (
     ModelConnectionError,
     InvalidModelResponseError,
     ValidationError,
-    JSONParsingError
+    JSONParsingError,
+    CircuitOpenError,
+    DeadlineExceededError,
+    JobNotFoundError
 )
+import math
 
 async def nlp_exception_handler(request: Request, exc: NLPServiceException):
     """Handle custom NLP service exceptions"""
     status_code_mapping = {
         ModelConnectionError: 503,  # Service Unavailable
+        CircuitOpenError: 503,  # Service Unavailable
+        DeadlineExceededError: 504,  # Gateway Timeout
         InvalidModelResponseError: 502,  # Bad Gateway
         ValidationError: 400,  # Bad Request
+        JobNotFoundError: 404,  # Not Found
         JSONParsingError: 502,  # Bad Gateway
         NLPServiceException: 500,  # Internal Server Error
     }
     
     # Get the appropriate status code based on exception type
     status_code = status_code_mapping.get(type(exc), 500)
+
+    # Tell clients when to come back instead of letting them retry straight away
+    headers = None
+    if isinstance(exc, CircuitOpenError):
+        headers = {"Retry-After": str(math.ceil(exc.retry_after))}
     
     return JSONResponse(
         status_code=status_code,
+        headers=headers,
         content={
             "error": {
                 "type": exc.__class__.__name__,
@@ -0,0 +1,323 @@
+"""ASGI middleware enforcing API admission limits, timing requests and compressing responses"""
+
+import gzip
+import hashlib
+import json
+import time
+from typing import Dict, Iterable, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.api.rate_limiter import RateLimiter
+from src.utils.request_context import StageTimings, deadline, priority, timed, timings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+async def send_error(send, status_code: int, error_type: str, code: str, message: str, headers=None):
+    """Send an error in the same shape as nlp_exception_handler"""
+    body = json.dumps({
+        "error": {
+            "type": error_type,
+            "code": code,
+            "message": message
+        }
+    }).encode()
+    raw_headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode())
+    ]
+    raw_headers.extend((k.lower().encode(), v.encode()) for k, v in (headers or {}).items())
+    await send({"type": "http.response.start", "status": status_code, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies above `max_size` bytes before they are parsed.
+
+    Requests announcing a larger Content-Length are refused without reading
+    the body. Bodies without a Content-Length (chunked uploads) are read
+    here up to the limit and replayed to the app, so an oversized upload is
+    cut off as soon as it crosses the limit. `path_limits` overrides the
+    limit for specific paths; None disables it for endpoints that stream
+    their body.
+    """
+
+    def __init__(self, app, max_size: int, path_limits: Optional[Dict[str, Optional[int]]] = None):
+        self.app = app
+        self.max_size = max_size
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        max_size = self.path_limits.get(scope["path"], self.max_size)
+        if max_size is None:
+            return await self.app(scope, receive, send)
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None:
+            if content_length.isdigit() and int(content_length) > max_size:
+                return await self._reject(send, max_size)
+            return await self.app(scope, receive, send)
+
+        # No declared length: buffer up to the limit before the app sees it
+        messages, received = [], 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            received += len(message.get("body", b""))
+            if received > max_size:
+                return await self._reject(send, max_size)
+            if not message.get("more_body", False):
+                break
+
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        await self.app(scope, replay_receive, send)
+
+    async def _reject(self, send, max_size: int):
+        await send_error(
+            send, 413, "RequestTooLargeError", "REQUEST_TOO_LARGE",
+            f"Request body exceeds the maximum size of {max_size} bytes"
+        )
+
+
+class RateLimitMiddleware:
+    """
+    Enforce token-bucket rate limits per client and per endpoint.
+
+    Clients are identified by their X-API-Key header, falling back to the
+    remote address. Every limited response carries RateLimit-Limit,
+    RateLimit-Remaining and RateLimit-Reset headers; rejected requests get
+    429 with Retry-After.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, exempt_paths: Iterable[str] = ()):
+        self.app = app
+        self.limiter = limiter
+        self.exempt_paths = set(exempt_paths)
+
+    def _client_id(self, scope) -> str:
+        api_key = Headers(scope=scope).get("x-api-key")
+        if api_key:
+            return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            return await self.app(scope, receive, send)
+
+        with timed("ratelimit"):
+            result = await run_in_threadpool(self.limiter.hit, self._client_id(scope), scope["path"])
+        headers = result.headers()
+
+        if not result.allowed:
+            return await send_error(
+                send, 429, "RateLimitExceededError", "RATE_LIMIT_EXCEEDED",
+                f"Rate limit of {result.limit} requests per minute exceeded",
+                headers=headers
+            )
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (k.lower().encode(), v.encode()) for k, v in headers.items()
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class DeadlineMiddleware:
+    """
+    Give every request a deadline for the cache, queueing and model layers.
+
+    Clients may ask for a shorter (or, up to `max_timeout`, longer) budget
+    in seconds with the X-Request-Timeout header; otherwise `default_timeout`
+    applies.
+    """
+
+    HEADER = "x-request-timeout"
+
+    def __init__(self, app, default_timeout: float, max_timeout: float):
+        self.app = app
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+
+    def _timeout(self, scope) -> float:
+        value = Headers(scope=scope).get(self.HEADER)
+        try:
+            timeout = float(value) if value is not None else self.default_timeout
+        except ValueError:
+            timeout = self.default_timeout
+        return min(max(timeout, 0.0), self.max_timeout)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = deadline.set(time.monotonic() + self._timeout(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            deadline.reset(token)
+
+
+class PriorityMiddleware:
+    """
+    Tag every request with a priority class for the model-call scheduler.
+
+    The class comes from the X-Priority header, then from the class mapped
+    to the request's X-API-Key, then `default_class`. Unknown classes fall
+    back to the default.
+    """
+
+    HEADER = "x-priority"
+
+    def __init__(self, app, classes: Iterable[str], default_class: str, api_keys: Dict[str, str]):
+        self.app = app
+        self.classes = set(classes)
+        self.default_class = default_class
+        self.api_keys = api_keys
+
+    def _priority(self, scope) -> str:
+        headers = Headers(scope=scope)
+        name = headers.get(self.HEADER) or self.api_keys.get(headers.get("x-api-key", ""))
+        name = (name or "").strip().lower()
+        return name if name in self.classes else self.default_class
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = priority.set(self._priority(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            priority.reset(token)
+
+
+class ServerTimingMiddleware:
+    """
+    Time each request's stages and report them in a Server-Timing header.
+
+    The stages are recorded by the layers the request passes through
+    (rate limiting, validation, cache, Redis, scheduler queue, Ollama,
+    response parsing); `total` is the time until the response starts.
+    Requests sending `X-Include-Timings: true` also get the stages, and
+    the token counts of the request's model calls, in the response
+    `metadata`.
+    """
+
+    HEADER = "x-include-timings"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        current = StageTimings()
+        current.include_in_metadata = Headers(scope=scope).get(self.HEADER, "").lower() == "true"
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                current.add("total", current.elapsed())
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", current.server_timing().encode())
+                ]
+            await send(message)
+
+        token = timings.set(current)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            timings.reset(token)
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Codings the client accepts (q=0 means refused)"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Compress responses above a size threshold with brotli or gzip.
+
+    Brotli is used when the client accepts it and the `brotli` package is
+    installed, gzip otherwise. Small bodies, streamed responses and
+    responses that are already encoded (NDJSON streams compress
+    themselves) pass through untouched.
+    """
+
+    def __init__(self, app, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose(self, scope) -> Optional[str]:
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if "br" in accepted and brotli is not None:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        coding = self._choose(scope)
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message  # Held until the body shows whether to compress
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                return await send(message)
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            body = message.get("body", b"")
+            if message.get("more_body", False) or "content-encoding" in headers or len(body) < self.min_size:
+                await send(start)
+                return await send(message)
+
+            with timed("compress"):
+                body = self._compress(body, coding)
+            headers["content-encoding"] = coding
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,10 +1,25 @@
-from pydantic import BaseModel, Field, field_validator, ConfigDict, model_validator
-from typing import Optional, Dict, List, Literal, Any
+from pydantic import AfterValidator, BaseModel, Field, field_validator, ConfigDict, model_validator
+from typing import Annotated, Optional, Dict, List, Literal, Any
+from src.config.config import config
+from src.config.default import AVAILABLE_MODELS
 
 # Model selection
 class ModelSelection(BaseModel):
     model_name: str
 
+def _resolve_model(v: Optional[str]) -> Optional[str]:
+    """Turn a model name or Ollama tag into the tag, rejecting unknown models"""
+    if v is None:
+        return None
+    model = config.resolve_model(v.strip())
+    if model is None:
+        raise ValueError(f"Unknown model '{v}'. Available models: {list(AVAILABLE_MODELS.keys())}")
+    return model
+
+# Optional per-request model; None uses the current default from /set-model
+RequestModel = Annotated[Optional[str], AfterValidator(_resolve_model)]
+_MODEL_FIELD = dict(default=None, description="Model name or Ollama tag for this request (default: the current model)")
+
 # Sentiment 
 class SentimentRequest(BaseModel):
     model_config = ConfigDict(
@@ -18,13 +33,17 @@ class SentimentRequest(BaseModel):
     text: str = Field(
         ..., 
         min_length=1,
-        max_length=500,  # Reasonable length for sentiment analysis
-        description="Input text to analyze (max 1000 characters)"
+        max_length=config.sentiment["max_length"],
+        description=(
+            f"Input text to analyze; texts over {config.sentiment['sentence_threshold']} characters "
+            "are scored sentence by sentence"
+        )
     )
     options: Optional[Dict] = Field(
         default=None,
         description="Optional parameters for sentiment analysis"
     )
+    model: RequestModel = Field(**_MODEL_FIELD)
 
     @field_validator('text')
     @classmethod
@@ -87,6 +106,7 @@ class NERRequest(BaseModel):
         default=None,
         description="Optional features: extract_time, extract_numerical, extract_email"
     )
+    model: RequestModel = Field(**_MODEL_FIELD)
 
     @field_validator('text')
     @classmethod
@@ -131,6 +151,7 @@ class NERResponse(BaseModel):
     text: str
     entities: List[EntityModel]
     model: str
+    metadata: Optional[Dict] = None
 #----------------------------------------------------------------------------------------------------------------
 
 # Summarization 
@@ -147,8 +168,9 @@ class SummarizationRequest(BaseModel):
     text: str = Field(..., min_length=10, description="Text to summarize")
     options: Optional[Dict] = Field(
         default=None,
-        description="Summarization options like max_length, type"
+        description="Summarization options like max_length, type, and mode (\"incremental\" for chunk-cached summaries)"
     )
+    model: RequestModel = Field(**_MODEL_FIELD)
 
     @field_validator('text')
     @classmethod
@@ -201,6 +223,7 @@ class TextClassificationRequest(BaseModel):
         default=None,
         description="Classification options like categories, multi_label"
     )
+    model: RequestModel = Field(**_MODEL_FIELD)
 
     @field_validator('text')
     @classmethod
@@ -236,4 +259,218 @@ class TextClassificationResponse(BaseModel):
     confidence: float = Field(..., ge=0.0, le=1.0)
     all_categories: List[CategoryResult]  # Using the new CategoryResult model
     explanation: str
-    model: str
\ No newline at end of file
+    model: str
+    metadata: Optional[Dict] = None
+#---------------------------------------------------------------------------------------------------------------
+
+# Combined analysis
+ANALYZE_TASK_REQUESTS = {
+    "sentiment": SentimentRequest,
+    "ner": NERRequest,
+    "classify": TextClassificationRequest,
+    "summarize": SummarizationRequest,
+}
+
+def _validate_task_input(task: str, text: str, options: Optional[Dict]):
+    """Apply a service's own input rules, raising ValueError with a short message"""
+    try:
+        ANALYZE_TASK_REQUESTS[task](text=text, options=options)
+    except ValueError as e:
+        errors = getattr(e, "errors", None)
+        message = errors()[0]["msg"] if callable(errors) else str(e)
+        raise ValueError(message.removeprefix("Value error, "))
+
+class AnalyzeRequest(BaseModel):
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "text": "Tesla's new battery plant in Berlin is a huge win for the company",
+                "tasks": ["sentiment", "ner", "classify"],
+                "options": {
+                    "ner": {"extract_time": True},
+                    "classify": {"multi_label": True}
+                }
+            }
+        }
+    )
+
+    text: str = Field(..., min_length=1, description="Text to analyze with every selected task")
+    tasks: List[Literal["sentiment", "ner", "classify", "summarize"]] = Field(
+        ...,
+        min_length=1,
+        description="Tasks to run in a single model call"
+    )
+    options: Optional[Dict[str, Dict]] = Field(
+        default=None,
+        description="Per-task options keyed by task name, same as the single-service endpoints"
+    )
+    model: RequestModel = Field(**_MODEL_FIELD)
+
+    @field_validator('text')
+    @classmethod
+    def validate_text(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
+            raise ValueError("Text cannot be empty or whitespace only")
+        return v
+
+    @model_validator(mode='after')
+    def validate_tasks(self) -> 'AnalyzeRequest':
+        # Remove duplicate tasks, keeping the requested order
+        self.tasks = list(dict.fromkeys(self.tasks))
+
+        unknown = set(self.options or {}) - set(self.tasks)
+        if unknown:
+            raise ValueError(f"Options given for tasks that were not requested: {sorted(unknown)}")
+
+        # Apply each service's own input rules to the shared text
+        for task in self.tasks:
+            try:
+                _validate_task_input(task, self.text, (self.options or {}).get(task))
+            except ValueError as e:
+                raise ValueError(f"Invalid input for '{task}': {str(e)}")
+        return self
+
+class AnalyzeResponse(BaseModel):
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "text": "Tesla's new battery plant in Berlin is a huge win for the company",
+                "sentiment": {
+                    "text": "Tesla's new battery plant in Berlin is a huge win for the company",
+                    "sentiment": "POSITIVE",
+                    "confidence": 0.92,
+                    "explanation": "Describes the plant as a huge win",
+                    "model": "llama3.2:3b"
+                },
+                "ner": {
+                    "text": "Tesla's new battery plant in Berlin is a huge win for the company",
+                    "entities": [
+                        {"text": "Tesla", "type": "ORG", "start": 0, "end": 5, "confidence": 0.95},
+                        {"text": "Berlin", "type": "LOC", "start": 29, "end": 35, "confidence": 0.97}
+                    ],
+                    "model": "llama3.2:3b"
+                },
+                "model": "llama3.2:3b",
+                "metadata": {
+                    "cached_tasks": ["ner"],
+                    "computed_tasks": ["sentiment"],
+                    "processing_time_seconds": 3.412
+                }
+            }
+        }
+    )
+
+    text: str
+    sentiment: Optional[SentimentResponse] = None
+    ner: Optional[NERResponse] = None
+    classify: Optional[TextClassificationResponse] = None
+    summarize: Optional[SummarizationResponse] = None
+    errors: Optional[Dict[str, str]] = None
+    model: str
+    metadata: Optional[Dict] = None
+
+# --------------------------------------------------------------------------------------------------------------
+
+# Asynchronous jobs
+class JobRequest(BaseModel):
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "task": "classify",
+                "items": [
+                    "The new phone has a stunning display",
+                    "Parliament passed the budget bill on Tuesday"
+                ],
+                "options": {"multi_label": True},
+                "model": "gemma"
+            }
+        }
+    )
+
+    task: Literal["sentiment", "ner", "classify", "summarize"]
+    items: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=config.jobs["max_items"],
+        description="Texts to process, each validated like the single-service endpoint"
+    )
+    options: Optional[Dict] = Field(
+        default=None,
+        description="Options applied to every item, same as the single-service endpoint"
+    )
+    model: RequestModel = Field(**_MODEL_FIELD)
+
+    @model_validator(mode='after')
+    def validate_items(self) -> 'JobRequest':
+        items = []
+        for index, text in enumerate(self.items):
+            try:
+                _validate_task_input(self.task, text, self.options)
+            except ValueError as e:
+                raise ValueError(f"Invalid item {index}: {str(e)}")
+            items.append(text.strip())
+        self.items = items
+        return self
+
+class JobResponse(BaseModel):
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "job_id": "4f1c2a9e0b7d4c3e8a6f5b2d1e0c9a87",
+                "task": "classify",
+                "model": "llama3.2:3b",
+                "status": "running",
+                "total": 2,
+                "completed": 1,
+                "succeeded": 1,
+                "failed": 0,
+                "progress": 0.5,
+                "created_at": 1760860800.12,
+                "started_at": 1760860800.53,
+                "finished_at": None,
+                "cancelled_at": None,
+                "results": [
+                    {"index": 0, "result": {"text": "The new phone has a stunning display", "model": "llama3.2:3b"}}
+                ],
+                "next_offset": None
+            }
+        }
+    )
+
+    job_id: str
+    task: str
+    model: Optional[str] = None
+    status: Literal["queued", "running", "completed", "cancelled"]
+    total: int
+    completed: int
+    succeeded: int
+    failed: int
+    progress: float
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancelled_at: Optional[float] = None
+    results: List[Dict[str, Any]] = []
+    next_offset: Optional[int] = None
+
+# --------------------------------------------------------------------------------------------------------------
+
+# Cache administration
+class CacheInvalidationRequest(BaseModel):
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "tags": ["service:classify", "model:qwen2.5:3b"],
+                "dry_run": False
+            }
+        }
+    )
+
+    tags: List[str] = Field(
+        ...,
+        min_length=1,
+        description="Invalidate the entries carrying all of these tags: service:<name>, model:<tag>, "
+                    "prompt:<service>:<version> or categories:<hash>"
+    )
+    dry_run: bool = Field(default=False, description="Only count the matching entries")
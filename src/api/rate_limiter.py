@@ -0,0 +1,182 @@
+"""Token-bucket rate limiting backed by Redis"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from src.cache.redis_client import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# Checks every bucket and only takes a token when all of them have one, so a
+# request either counts against all its limits or none. Uses the Redis clock
+# so workers on different machines agree on refill times.
+#   KEYS: bucket keys
+#   ARGV: capacity_1, refill_per_ms_1, capacity_2, refill_per_ms_2, ...
+# Returns {allowed, limit, remaining, reset_ms, retry_after_ms} for the
+# most restrictive bucket.
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local tokens = {}
+local allowed = 1
+local retry_after = 0
+
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local t = tonumber(bucket[1])
+    local ts = tonumber(bucket[2])
+    if t == nil or ts == nil then
+        t = capacity
+        ts = now
+    end
+    t = math.min(capacity, t + math.max(0, now - ts) * rate)
+    tokens[i] = t
+    if t < 1 then
+        allowed = 0
+        retry_after = math.max(retry_after, (1 - t) / rate)
+    end
+end
+
+local limit = 0
+local remaining = -1
+local reset = 0
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local t = tokens[i]
+    if allowed == 1 then
+        t = t - 1
+    end
+    redis.call('HSET', KEYS[i], 'tokens', tostring(t), 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil((capacity - t) / rate) + 1000)
+    if remaining < 0 or math.floor(t) < remaining then
+        remaining = math.floor(t)
+        limit = capacity
+        reset = math.ceil((capacity - t) / rate)
+    end
+end
+
+return {allowed, limit, remaining, reset, math.ceil(retry_after)}
+"""
+
+
+class RateLimitResult:
+    """Outcome of a rate limit check, for the most restrictive bucket"""
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset: float, retry_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = max(0, remaining)
+        self.reset = reset
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        """Standard RateLimit-* response headers"""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset))
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimiter:
+    """
+    Token buckets per client and per client/endpoint.
+
+    State lives in Redis so every worker shares it; when Redis is not
+    reachable the limiter falls back to in-process buckets so a Redis
+    outage degrades to per-worker limits instead of no limits. Local
+    buckets are dropped once they have refilled, like the Redis keys
+    expire, and the least recently used go first past max_local_buckets.
+    """
+
+    KEY_PREFIX = "ratelimit"
+    MAX_LOCAL_BUCKETS = 10_000
+
+    def __init__(self, per_minute: int, endpoint_limits: Optional[Dict[str, int]] = None,
+                 max_local_buckets: int = MAX_LOCAL_BUCKETS):
+        self.per_minute = per_minute
+        self.endpoint_limits = endpoint_limits or {}
+        self.max_local_buckets = max_local_buckets
+        self._script = None
+        # key -> (tokens, ts, time it is full again), least recently used first
+        self._local: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self._local_lock = threading.Lock()
+
+    def _buckets(self, client_id: str, endpoint: str) -> List[Tuple[str, int]]:
+        """Bucket keys and per-minute capacities that apply to a request"""
+        # The client id is a hash tag, so on a Redis Cluster a request's
+        # buckets share a slot and the script can take them together
+        buckets = [(f"{self.KEY_PREFIX}:{{{client_id}}}", self.per_minute)]
+        name = endpoint.rstrip("/").rsplit("/", 1)[-1]
+        if name in self.endpoint_limits:
+            buckets.append((f"{self.KEY_PREFIX}:{{{client_id}}}:{name}", self.endpoint_limits[name]))
+        return buckets
+
+    def hit(self, client_id: str, endpoint: str) -> RateLimitResult:
+        """Take one token from every bucket for this request, if all allow it"""
+        buckets = self._buckets(client_id, endpoint)
+        redis = RedisClient()
+        # While Redis is down, don't wait on it for every request
+        if redis.healthy:
+            try:
+                return self._hit_redis(redis, buckets)
+            except Exception as e:
+                redis.health.record_error(e)
+                logger.error(f"Rate limiter falling back to local buckets: {str(e)}")
+                self._script = None
+        return self._hit_local(buckets)
+
+    def _hit_redis(self, redis: RedisClient, buckets: List[Tuple[str, int]]) -> RateLimitResult:
+        if self._script is None:
+            self._script = redis.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+        args = []
+        for _, capacity in buckets:
+            args.extend([capacity, capacity / 60_000])  # tokens per millisecond
+        allowed, limit, remaining, reset_ms, retry_after_ms = self._script(
+            keys=[key for key, _ in buckets], args=args
+        )
+        return RateLimitResult(bool(allowed), int(limit), int(remaining), reset_ms / 1000, retry_after_ms / 1000)
+
+    def _hit_local(self, buckets: List[Tuple[str, int]]) -> RateLimitResult:
+        now = time.monotonic()
+        with self._local_lock:
+            levels = []
+            for key, capacity in buckets:
+                tokens, ts, _ = self._local.get(key, (capacity, now, now))
+                levels.append(min(capacity, tokens + (now - ts) * capacity / 60))
+
+            allowed = all(level >= 1 for level in levels)
+            retry_after = max(
+                ((1 - level) * 60 / capacity for level, (_, capacity) in zip(levels, buckets) if level < 1),
+                default=0
+            )
+            result = None
+            for level, (key, capacity) in zip(levels, buckets):
+                if allowed:
+                    level -= 1
+                reset = (capacity - level) * 60 / capacity
+                self._local[key] = (level, now, now + reset)
+                self._local.move_to_end(key)
+                if result is None or math.floor(level) < result.remaining:
+                    result = RateLimitResult(allowed, capacity, math.floor(level), reset, retry_after)
+            self._expire_local(now)
+            return result
+
+    def _expire_local(self, now: float):
+        """Drop refilled buckets from the idle end, then any over the cap; caller must hold the lock"""
+        while self._local:
+            key, (_, _, full_at) = next(iter(self._local.items()))
+            if full_at > now and len(self._local) <= self.max_local_buckets:
+                break
+            del self._local[key]
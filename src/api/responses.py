@@ -0,0 +1,124 @@
+"""Fast response encoding: orjson, MessagePack negotiation and one-pass validation"""
+
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Type
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from src.utils.request_context import cache_stats, timed
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is only offered when installed
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode JSON like Starlette's JSONResponse (compact, UTF-8), with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _accepted_media_types(accept: str) -> Dict[str, float]:
+    """Media types in an Accept header with their q-values"""
+    accepted = {}
+    for part in accept.lower().split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[media_type] = max(quality, accepted.get(media_type, 0.0))
+    return accepted
+
+
+def wants_msgpack(request: Request) -> bool:
+    """Whether the client accepts MessagePack (q > 0) at least as much as JSON"""
+    if msgpack is None:
+        return False
+    accepted = _accepted_media_types(request.headers.get("accept", ""))
+    quality = max(accepted.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    return quality > 0 and quality >= accepted.get(JSON_MEDIA_TYPE, 0.0)
+
+
+def encode(request: Request, content: Any, status_code: int = 200) -> Response:
+    """Encode content in the format the client asked for (MessagePack or JSON)"""
+    headers = {"Vary": "Accept"}
+    if wants_msgpack(request):
+        return Response(msgpack.packb(content, use_bin_type=True), status_code=status_code,
+                        media_type=MSGPACK_MEDIA_TYPES[0], headers=headers)
+    return Response(dumps(content), status_code=status_code, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+# Per response model: the optional fields and their defaults
+_defaults: Dict[Type[BaseModel], Dict[str, Any]] = {}
+
+
+def _shape(result: Dict[str, Any], response_model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Give a trusted result the response model's top-level shape.
+
+    The same fields, in the same order, as validation would produce:
+    unknown keys dropped and optional fields filled with their default.
+    """
+    defaults = _defaults.get(response_model)
+    if defaults is None:
+        defaults = _defaults[response_model] = {
+            name: field.get_default(call_default_factory=True)
+            for name, field in response_model.model_fields.items() if not field.is_required()
+        }
+    return {name: result[name] if name in result else defaults[name]
+            for name in response_model.model_fields if name in result or name in defaults}
+
+
+def render(request: Request, result: Any, response_model: Type[BaseModel], trusted: bool = False,
+           status_code: int = 200) -> Response:
+    """
+    Respond with an endpoint's result, bypassing FastAPI's serializer.
+
+    FastAPI would validate the returned dict against the response model
+    and run it through jsonable_encoder before encoding it. Fresh results
+    are validated here once instead; `trusted` results (served from the
+    cache, so validated when first computed) are only trimmed to the
+    model's fields and encoded as they are.
+    """
+    with timed("serialize"):
+        if trusted and isinstance(result, dict):
+            content = _shape(result, response_model)
+        else:
+            content = response_model.model_validate(result).model_dump(mode="json")
+        return encode(request, content, status_code)
+
+
+@contextmanager
+def track_cache() -> Iterator[Dict[str, int]]:
+    """Collect the cache outcomes of the enclosed call (threadpool work shares the dict)"""
+    stats: Dict[str, int] = {}
+    token = cache_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        cache_stats.reset(token)
+
+
+def from_cache(stats: Optional[Dict[str, int]]) -> bool:
+    """Whether a tracked call was answered entirely from the cache"""
+    return bool(stats) and stats.get("hit", 0) > 0 and not stats.get("miss") and not stats.get("error")
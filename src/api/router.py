@@ -1,5 +1,9 @@
-from fastapi import APIRouter, HTTPException
+import logging
+import secrets
+import threading
+from fastapi import APIRouter, Header, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from src.api.models import  (
     ModelSelection,
     SentimentRequest,
@@ -10,17 +14,41 @@ from src.api.models import  (
     TextClassificationResponse, 
     SummarizationRequest, 
     SummarizationResponse,
+    AnalyzeRequest,
+    AnalyzeResponse,
+    JobRequest,
+    JobResponse,
+    CacheInvalidationRequest,
 )
 from src.models.sentiment_analyzer import SentimentAnalyzer
 from src.models.ner_analyzer import NERAnalyzer
 from src.models.text_summarizer import TextSummarizer
 from src.models.text_classifier import TextClassifier
-from src.exceptions.custom_exceptions import NLPServiceException
-from typing import Dict, Any
+from src.models.joint_analyzer import JointAnalyzer
+from src.exceptions.custom_exceptions import (
+    NLPServiceException,
+    CircuitOpenError,
+    DeadlineExceededError,
+    JobNotFoundError
+)
+from typing import Dict, Any, Callable, Literal, Optional
 from src.config.config import AVAILABLE_MODELS, config
+from src.cache.backend import get_cache_backend
 from src.cache.cache_manager import CacheManager
+from src.inference.ollama_pool import get_ollama_pool
+from src.inference.scheduler import get_scheduler
+from src.inference.warmup import check_readiness
+from src.jobs.job_queue import get_job_queue
+from src.api.streaming import NDJSONStreamProcessor, NDJSONStreamingResponse
+from src.api.responses import from_cache, render, track_cache
+from src.api.timing import TimedRoute, with_timings
+
+logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# Errors that keep their own status code (503 + Retry-After, 504, 404) instead of 400
+PASSTHROUGH_ERRORS = (CircuitOpenError, DeadlineExceededError, JobNotFoundError)
 
 class  LazyModelLoader:
     """Lazy loader for LLM to prevent loading all models at startup casusin OOM"""
@@ -29,61 +57,122 @@ class  LazyModelLoader:
         self._ner = None
         self._summarizer = None
         self._classifier = None
+        self._joint = None
+        # Concurrent first requests (or the startup warm-up) build each analyzer once
+        self._lock = threading.RLock()
+
+    def _load(self, attr: str, factory):
+        analyzer = getattr(self, attr)
+        if analyzer is None:
+            with self._lock:
+                analyzer = getattr(self, attr)
+                if analyzer is None:
+                    analyzer = factory()
+                    setattr(self, attr, analyzer)
+        return analyzer
 
     @property
     def sentiment_analyzer(self):
-        if self._sentiment is None:
-            self._sentiment = SentimentAnalyzer()
-        return self._sentiment
+        return self._load("_sentiment", SentimentAnalyzer)
     
     @property
     def ner_analyzer(self):
-        if self._ner is None:
-            self._ner = NERAnalyzer()
-        return self._ner
+        return self._load("_ner", NERAnalyzer)
     
     @property
     def summarizer(self):
-        if self._summarizer is None:
-            self._summarizer = TextSummarizer()
-        return self._summarizer
+        return self._load("_summarizer", TextSummarizer)
     
     @property
     def classifier(self):
-        if self._classifier is None:
-            self._classifier = TextClassifier()
-        return self._classifier
+        return self._load("_classifier", TextClassifier)
+
+    @property
+    def joint_analyzer(self):
+        return self._load("_joint", lambda: JointAnalyzer(self))
+
+    def load_all(self):
+        """Build every analyzer up front"""
+        for name in ("sentiment_analyzer", "ner_analyzer", "summarizer", "classifier", "joint_analyzer"):
+            getattr(self, name)
 
     def cleanup(self):
         """Clean up loaded models"""
-        self._sentiment = None
-        self._ner = None
-        self._summarizer = None
-        self._classifier = None
+        with self._lock:
+            self._sentiment = None
+            self._ner = None
+            self._summarizer = None
+            self._classifier = None
+            self._joint = None
 
 # Initialize lazy loader
 models = LazyModelLoader()
 
+# Analyzer call per task, as made by the single-service endpoints (used by jobs and streams)
+TASK_HANDLERS: Dict[str, Callable[[Any, str, Optional[Dict], Optional[str]], Dict[str, Any]]] = {
+    "sentiment": lambda models, text, options, model=None: models.sentiment_analyzer.analyze(text.strip('"'), options, model),
+    "ner": lambda models, text, options, model=None: models.ner_analyzer.analyze(text, options, model),
+    "classify": lambda models, text, options, model=None: models.classifier.classify(text, options, model),
+    "summarize": lambda models, text, options, model=None: models.summarizer.summarize(text, options, model),
+}
+
+def cache_health() -> Dict[str, Any]:
+    """Cache backend state, or why there is none"""
+    try:
+        return get_cache_backend().snapshot()
+    except Exception as e:
+        return {"state": "unavailable", "last_error": str(e)}
+
 @router.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    """Liveness; "degraded" while the cache is down and bypassed"""
+    cache = cache_health()
+    return {"status": "healthy" if cache.get("state") == "healthy" else "degraded", "cache": cache}
+
+@router.get("/ready")
+async def readiness_check():
+    """Whether this instance is warm and its dependencies are reachable"""
+    ready, checks = await run_in_threadpool(check_readiness)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": checks}
+    )
+
+@router.get("/metrics")
+async def get_metrics():
+    """Scheduler queues, Ollama hosts, circuits, retry budget, model token usage and cache health"""
+    pool = get_ollama_pool()
+    return {
+        "cache": cache_health(),
+        "scheduler": get_scheduler().snapshot(),
+        "ollama_hosts": pool.snapshot(),
+        "circuits": pool.breaker_snapshot(),
+        "retry_budget": pool.retry_budget.snapshot(),
+        "model_usage": pool.usage.snapshot()
+    }
 
 @router.post("/sentiment", response_model=SentimentResponse)
-async def analyze_sentiment(input_data: SentimentRequest):
+async def analyze_sentiment(input_data: SentimentRequest, http_request: Request):
     try:
         cleaned_text = input_data.text.strip('"')
-        result = models.sentiment_analyzer.analyze(cleaned_text, input_data.options)
-        return result
+        with track_cache() as cache_outcomes:
+            result = await run_in_threadpool(models.sentiment_analyzer.analyze, cleaned_text, input_data.options, input_data.model)
+        return render(http_request, with_timings(result), SentimentResponse, trusted=from_cache(cache_outcomes))
+    except PASSTHROUGH_ERRORS:
+        raise  # Rendered with their own status by the app's exception handler
     except NLPServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 @router.post("/ner", response_model=NERResponse)
-async def analyze_ner(input_data: NERRequest):
+async def analyze_ner(input_data: NERRequest, http_request: Request):
     try: 
-        result = models.ner_analyzer.analyze(input_data.text, input_data.options)  # Removed options parameter
-        return result
+        with track_cache() as cache_outcomes:
+            result = await run_in_threadpool(models.ner_analyzer.analyze, input_data.text, input_data.options, input_data.model)
+        return render(http_request, with_timings(result), NERResponse, trusted=from_cache(cache_outcomes))
+    except PASSTHROUGH_ERRORS:
+        raise  # Rendered with their own status by the app's exception handler
     except NLPServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -91,10 +180,13 @@ async def analyze_ner(input_data: NERRequest):
 
 
 @router.post("/summarize", response_model=SummarizationResponse)
-async def summarize_text(request: SummarizationRequest):
+async def summarize_text(request: SummarizationRequest, http_request: Request):
     try:
-        result = models.summarizer.summarize(request.text, request.options)
-        return result
+        with track_cache() as cache_outcomes:
+            result = await run_in_threadpool(models.summarizer.summarize, request.text, request.options, request.model)
+        return render(http_request, with_timings(result), SummarizationResponse, trusted=from_cache(cache_outcomes))
+    except PASSTHROUGH_ERRORS:
+        raise  # Rendered with their own status by the app's exception handler
     except NLPServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -102,18 +194,147 @@ async def summarize_text(request: SummarizationRequest):
     
 
 @router.post("/classify", response_model=TextClassificationResponse)
-async def classify_text(request: TextClassificationRequest):
+async def classify_text(request: TextClassificationRequest, http_request: Request):
     try:
-        result = models.classifier.classify(request.text, request.options)
-        return result
+        with track_cache() as cache_outcomes:
+            result = await run_in_threadpool(models.classifier.classify, request.text, request.options, request.model)
+        return render(http_request, with_timings(result), TextClassificationResponse, trusted=from_cache(cache_outcomes))
+    except PASSTHROUGH_ERRORS:
+        raise  # Rendered with their own status by the app's exception handler
     except NLPServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
     
+@router.post("/analyze", response_model=AnalyzeResponse)
+async def analyze_text(request: AnalyzeRequest, http_request: Request):
+    """Run several NLP tasks on the same text with a single model call"""
+    try:
+        options = request.options or {}
+        result = await run_in_threadpool(
+            models.joint_analyzer.analyze,
+            request.text,
+            {task: options.get(task) for task in request.tasks},
+            request.model
+        )
+        return render(http_request, with_timings(result), AnalyzeResponse)
+    except PASSTHROUGH_ERRORS:
+        raise  # Rendered with their own status by the app's exception handler
+    except NLPServiceException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(request: JobRequest):
+    """Queue a batch of texts for the worker processes"""
+    try:
+        queue = get_job_queue()
+        job_id = await run_in_threadpool(queue.create, request.task, request.items, request.options, request.model)
+        return await run_in_threadpool(queue.get, job_id, 0, 0)
+    except PASSTHROUGH_ERRORS:
+        raise  # Rendered with their own status by the app's exception handler
+    except NLPServiceException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    http_request: Request,
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=0, le=1000)
+):
+    """Job progress with a page of results"""
+    try:
+        job = await run_in_threadpool(get_job_queue().get, job_id, offset, limit)
+        return render(http_request, job, JobResponse)
+    except PASSTHROUGH_ERRORS:
+        raise  # Rendered with their own status by the app's exception handler
+    except NLPServiceException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a job; items already processed keep their results"""
+    try:
+        return await run_in_threadpool(get_job_queue().cancel, job_id)
+    except PASSTHROUGH_ERRORS:
+        raise  # Rendered with their own status by the app's exception handler
+    except NLPServiceException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.post(
+    "/stream/{task}",
+    response_class=NDJSONStreamingResponse,
+    status_code=200,  # Not inferable from the response class's signature, which OpenAPI needs
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+            "description": 'One {"text": ..., "options": {...}} object per line'
+        }
+    }
+)
+async def stream_task(
+    task: Literal["sentiment", "ner", "classify", "summarize"],
+    request: Request,
+    model: Optional[str] = Query(default=None, description="Model name or Ollama tag for every line (default: the current model)")
+):
+    """Process an NDJSON upload line by line, streaming back one result line per input"""
+    # One model for the whole stream, even if the default changes midway
+    current_model = config.resolve_model(model) if model else config.get_current_model()
+    if current_model is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid model name. Available models: {list(AVAILABLE_MODELS.keys())}"
+        )
+    processor = NDJSONStreamProcessor(
+        task,
+        lambda text, options: TASK_HANDLERS[task](models, text, options, current_model),
+        concurrency=config.stream["concurrency"],
+        max_line_size=config.stream["max_line_size"],
+        line_timeout=config.stream["line_timeout"]
+    )
+    return NDJSONStreamingResponse(
+        processor.results(request),
+        gzip="gzip" in request.headers.get("accept-encoding", ""),
+        gzip_level=config.stream["gzip_level"]
+    )
+
+@router.post("/admin/cache/invalidate")
+async def invalidate_cache(
+    request: CacheInvalidationRequest,
+    admin_key: Optional[str] = Header(default=None, alias="X-Admin-Key")
+):
+    """Delete the cache entries carrying all of the given tags, in batches, leaving the rest of the cache"""
+    # Fail closed: without a configured key the endpoint is disabled
+    if not config.api["admin_key"]:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled until API_ADMIN_KEY is set")
+    if not secrets.compare_digest(admin_key or "", config.api["admin_key"]):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Key")
+    try:
+        counts = await run_in_threadpool(
+            get_cache_backend().invalidate,
+            request.tags,
+            batch_size=config.cache_backend["invalidate_batch"],
+            dry_run=request.dry_run
+        )
+    except NotImplementedError:
+        raise HTTPException(status_code=501, detail="The cache backend doesn't support invalidation by tag")
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Cache unavailable: {str(e)}")
+    logger.info(f"Cache invalidated by tags {request.tags} (dry run: {request.dry_run}): {counts}")
+    return {"tags": request.tags, "dry_run": request.dry_run, **counts}
+
 @router.post("/set-model")
 async def set_model(selection: ModelSelection):
-    """Set the model to use for all NLP services"""
+    """Set the default model for requests that don't name one"""
     if config.set_current_model(selection.model_name):
         print(f"Model changed to: {config.get_current_model()}")  # Debug
         return {
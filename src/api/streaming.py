@@ -0,0 +1,169 @@
+"""NDJSON streaming of bulk requests"""
+
+import asyncio
+import json
+import time
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import StreamingResponse
+
+from src.api.models import _validate_task_input
+from src.exceptions.custom_exceptions import NLPServiceException
+from src.utils.request_context import deadline
+from src.utils.tracing import get_tracer
+
+_DONE = object()
+
+
+async def read_ndjson_lines(request: Request, max_line_size: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Yield the non-empty lines of an NDJSON body as they arrive.
+
+    Lines longer than `max_line_size` are dropped as they are read and
+    yielded as None, so a single huge line can't grow the buffer.
+    """
+    buffer = b""
+    oversized = False
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if oversized or len(line) > max_line_size:
+                oversized = False
+                yield None
+            elif line.strip():
+                yield line
+        if len(buffer) > max_line_size:
+            oversized, buffer = True, b""
+    if oversized or len(buffer) > max_line_size:
+        yield None
+    elif buffer.strip():
+        yield buffer
+
+
+class NDJSONStreamProcessor:
+    """
+    Run a task over NDJSON lines, emitting one result line per input.
+
+    Each input line is `{"text": ..., "options": {...}}`; each output line
+    is `{"index": i, "result": {...}}` or `{"index": i, "error": {...}}` and
+    is sent as soon as that line finishes, so results may come out of
+    order. At most `concurrency` lines are in flight, and a line holds its
+    slot until its result has been taken by the response: a slow client
+    stops the upload from being read instead of piling up results.
+    """
+
+    def __init__(self, task: str, handler: Callable[[str, Optional[Dict]], Dict[str, Any]],
+                 concurrency: int, max_line_size: int, line_timeout: float):
+        self.task = task
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_line_size = max_line_size
+        self.line_timeout = line_timeout
+
+    @staticmethod
+    def _error(index: int, code: str, message: str) -> Dict[str, Any]:
+        return {"index": index, "error": {"code": code, "message": message}}
+
+    async def _process(self, index: int, line: Optional[bytes]) -> Dict[str, Any]:
+        if line is None:
+            return self._error(index, "LINE_TOO_LARGE", f"Line exceeds {self.max_line_size} bytes")
+        try:
+            item = json.loads(line)
+            if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+                raise ValueError("Line must be a JSON object with a 'text' string")
+            options = item.get("options")
+            _validate_task_input(self.task, item["text"], options)
+        except ValueError as e:  # Includes JSONDecodeError
+            return self._error(index, "VALIDATION_ERROR", str(e))
+
+        # Every line gets its own time budget rather than sharing the request's
+        deadline.set(time.monotonic() + self.line_timeout)
+        try:
+            # Lines run after the request's handler returned, so each is its own trace
+            with get_tracer().span("stream.line", task=self.task, index=index):
+                result = await run_in_threadpool(self.handler, item["text"].strip(), options)
+        except NLPServiceException as e:
+            return self._error(index, e.error_code, str(e))
+        except Exception as e:
+            return self._error(index, "INTERNAL_ERROR", str(e))
+        return {"index": index, "result": result}
+
+    async def results(self, request: Request) -> AsyncIterator[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def run_line(index: int, line: Optional[bytes]):
+            try:
+                await queue.put(await self._process(index, line))
+            finally:
+                slots.release()
+
+        async def produce():
+            tasks = set()
+            try:
+                index = 0
+                async for line in read_ndjson_lines(request, self.max_line_size):
+                    await slots.acquire()
+                    task = asyncio.create_task(run_line(index, line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    index += 1
+                await asyncio.gather(*tasks)
+            except ClientDisconnect:
+                for task in tasks:
+                    task.cancel()
+            except asyncio.CancelledError:
+                # The response went away; don't leave lines waiting on the queue
+                for task in tasks:
+                    task.cancel()
+                raise
+            await queue.put(_DONE)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            producer.cancel()
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Stream NDJSON lines, optionally gzip-compressed.
+
+    Unlike StreamingResponse it doesn't listen on receive() for a
+    disconnect, since the body iterator is still reading the request body
+    from it. Compressed output is flushed after every line so results
+    aren't held back in the compressor.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, items: AsyncIterator[Dict[str, Any]], gzip: bool = False, gzip_level: int = 6):
+        headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"} if gzip else None
+        super().__init__(self._encode(items, gzip, gzip_level), headers=headers)
+
+    @staticmethod
+    async def _encode(items: AsyncIterator[Dict[str, Any]], gzip: bool, gzip_level: int) -> AsyncIterator[bytes]:
+        compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31) if gzip else None
+        async for item in items:
+            line = json.dumps(item).encode() + b"\n"
+            if compressor is None:
+                yield line
+            else:
+                yield compressor.compress(line) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressor is not None:
+            yield compressor.flush()
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
@@ -0,0 +1,89 @@
+"""Request timing and tracing around FastAPI's own work: body validation and response serialization"""
+
+import inspect
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.routing import APIRoute
+
+from src.utils.request_context import priority, record_timing, timings
+from src.utils.tracing import get_tracer
+
+# Endpoint start/end times of the current request, set by TimedRoute
+_endpoint_span: ContextVar[Optional[Dict[str, float]]] = ContextVar("endpoint_span", default=None)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    @wraps(endpoint)  # FastAPI reads the parameters through __wrapped__
+    async def wrapper(*args, **kwargs):
+        span = _endpoint_span.get()
+        if span is None:
+            return await endpoint(*args, **kwargs)
+        span["start"] = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            span["end"] = time.perf_counter()
+            record_timing("handler", span["end"] - span["start"])
+    wrapper.timed = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute recording the stages FastAPI runs around the endpoint.
+
+    `validate` is the time from the route being matched to the endpoint
+    starting (reading the body and validating it against the request
+    model), `handler` the endpoint itself, and `serialize` the response
+    model validation and JSON rendering after it returns. Each request
+    also gets an `http.request` span, the root of its trace.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # include_router builds new routes from already wrapped endpoints
+        if inspect.iscoroutinefunction(endpoint) and not getattr(endpoint, "timed", False):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def run_timed(request):
+            if timings.get() is None:
+                return await handler(request)
+            span: Dict[str, float] = {}
+            token = _endpoint_span.set(span)
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                _endpoint_span.reset(token)
+                if "start" in span:
+                    record_timing("validate", span["start"] - start)
+                    record_timing("serialize", time.perf_counter() - span["end"])
+                else:
+                    record_timing("validate", time.perf_counter() - start)  # Rejected before the endpoint
+
+        async def timed_handler(request):
+            # Root span of the request's trace
+            with get_tracer().span("http.request", method=request.method, route=self.path_format,
+                                   priority=priority.get()) as trace_span:
+                response = await run_timed(request)
+                trace_span.set_attribute("status_code", response.status_code)
+                return response
+        return timed_handler
+
+
+def with_timings(result: Any) -> Any:
+    """Add the stages and model token usage so far to a result's metadata when the client asked for them"""
+    current = timings.get()
+    if current is None or not current.include_in_metadata or not isinstance(result, dict):
+        return result
+    metadata = dict(result.get("metadata") or {})
+    metadata["timings_ms"] = current.milliseconds()
+    if current.usage:
+        metadata["model_usage"] = dict(current.usage)
+    return {**result, "metadata": metadata}
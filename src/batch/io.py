@@ -0,0 +1,132 @@
+"""Streaming readers and columnar part writers for offline batch runs"""
+
+import csv
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# (row number, row id, text)
+InputRow = Tuple[int, Optional[str], str]
+
+INPUT_FORMATS = ("csv", "jsonl", "parquet")
+OUTPUT_FORMATS = ("parquet", "arrow")
+
+
+def _pyarrow():
+    """Import pyarrow, which only batch runs need"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet/Arrow support needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def detect_format(path: str) -> str:
+    """Guess the input format from the file extension"""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension == "ndjson":
+        return "jsonl"
+    if extension in INPUT_FORMATS:
+        return extension
+    raise ValueError(f"Can't tell the format of '{path}'; pass --input-format ({', '.join(INPUT_FORMATS)})")
+
+
+def read_rows(path: str, fmt: str, text_column: str = "text", id_column: Optional[str] = None,
+              batch_size: int = 10_000) -> Iterator[InputRow]:
+    """Yield rows one at a time without loading the whole file"""
+    readers = {"csv": _read_csv, "jsonl": _read_jsonl, "parquet": _read_parquet}
+    if fmt not in readers:
+        raise ValueError(f"Unsupported input format '{fmt}'")
+    return readers[fmt](path, text_column, id_column, batch_size)
+
+
+def _cell(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _read_csv(path, text_column, id_column, batch_size):
+    csv.field_size_limit(sys.maxsize)  # Long documents
+    with open(path, newline="", encoding="utf-8") as file:
+        reader = csv.DictReader(file)
+        if reader.fieldnames is None or text_column not in reader.fieldnames:
+            raise ValueError(f"Column '{text_column}' not found in {path}")
+        for row_number, record in enumerate(reader):
+            yield row_number, _cell(record.get(id_column)) if id_column else None, record[text_column] or ""
+
+
+def _read_jsonl(path, text_column, id_column, batch_size):
+    with open(path, encoding="utf-8") as file:
+        row_number = 0
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield row_number, _cell(record.get(id_column)) if id_column else None, _cell(record.get(text_column)) or ""
+            row_number += 1
+
+
+def _read_parquet(path, text_column, id_column, batch_size):
+    pa = _pyarrow()
+    columns = [text_column] + ([id_column] if id_column else [])
+    row_number = 0
+    for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+        texts = batch.column(text_column).to_pylist()
+        ids = batch.column(id_column).to_pylist() if id_column else [None] * len(texts)
+        for row_id, text in zip(ids, texts):
+            yield row_number, _cell(row_id), _cell(text) or ""
+            row_number += 1
+
+
+class PartWriter:
+    """
+    Write results as numbered part files in an output directory.
+
+    Each part is written to a temporary file and renamed into place, so
+    a crash never leaves a half-written part behind.
+    """
+
+    def __init__(self, output_dir: str, fmt: str = "parquet"):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format '{fmt}'")
+        self.pa = _pyarrow()
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.schema = self.pa.schema([
+            ("row", self.pa.int64()),
+            ("id", self.pa.string()),
+            ("text_hash", self.pa.string()),
+            ("duplicate", self.pa.bool_()),
+            ("result", self.pa.string()),   # JSON, null for duplicates and errors
+            ("error_code", self.pa.string()),
+            ("error", self.pa.string()),
+            ("cached", self.pa.bool_()),
+            ("seconds", self.pa.float64())
+        ])
+        os.makedirs(output_dir, exist_ok=True)
+
+    def part_path(self, part: int) -> str:
+        return os.path.join(self.output_dir, f"part-{part:05d}.{self.fmt}")
+
+    def write(self, part: int, rows: List[Dict[str, Any]]) -> str:
+        path = self.part_path(part)
+        tmp_path = path + ".tmp"
+        table = self.pa.Table.from_pylist(rows, schema=self.schema)
+        if self.fmt == "parquet":
+            self.pa.parquet.write_table(table, tmp_path)
+        else:
+            with self.pa.OSFile(tmp_path, "wb") as sink, self.pa.ipc.new_file(sink, self.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return path
+
+    def read_column(self, part: int, column: str) -> List[Any]:
+        path = self.part_path(part)
+        if self.fmt == "parquet":
+            table = self.pa.parquet.read_table(path, columns=[column])
+        else:
+            with self.pa.memory_map(path) as source:
+                table = self.pa.ipc.open_file(source).read_all().select([column])
+        return table.column(column).to_pylist()
@@ -0,0 +1,169 @@
+"""Offline batch inference with deduplication and checkpoint/resume"""
+
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.api.models import _validate_task_input
+from src.batch.io import InputRow, PartWriter
+from src.exceptions.custom_exceptions import NLPServiceException
+from src.utils.request_context import cache_stats
+
+CHECKPOINT_FILE = "_checkpoint.json"
+REPORT_FILE = "_report.json"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class BatchRunner:
+    """
+    Run one task over a stream of rows, writing results in parts.
+
+    Rows are processed in chunks of `chunk_size` with `concurrency`
+    threads. Texts already seen in this run (by hash) are not processed
+    again; their rows are written with `duplicate` set and share the
+    first row's `text_hash`. After each chunk's part file is written the
+    checkpoint records the next row, so a crashed run started again with
+    the same output directory resumes from there.
+    """
+
+    def __init__(self, handler: Callable[[str, Optional[Dict]], Dict[str, Any]], task: str,
+                 options: Optional[Dict], writer: PartWriter, concurrency: int = 4, chunk_size: int = 1000,
+                 model: Optional[str] = None):
+        self.handler = handler
+        self.task = task
+        self.options = options
+        self.model = model
+        self.writer = writer
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.checkpoint_path = os.path.join(writer.output_dir, CHECKPOINT_FILE)
+
+    # Checkpointing ----------------------------------------------------------
+
+    def _load_checkpoint(self, source: str) -> Dict[str, Any]:
+        run = {"source": source, "task": self.task, "options": self.options, "model": self.model,
+               "format": self.writer.fmt}
+        if not os.path.exists(self.checkpoint_path):
+            return {**run, "next_row": 0, "parts": 0, "stats": {}}
+        with open(self.checkpoint_path) as file:
+            checkpoint = json.load(file)
+        for key, value in run.items():
+            if checkpoint.get(key) != value:
+                raise ValueError(
+                    f"{self.writer.output_dir} holds a different run ({key} was {checkpoint.get(key)!r}); "
+                    "use a new output directory"
+                )
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(checkpoint, file)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # Processing -------------------------------------------------------------
+
+    def _process(self, text: str) -> Dict[str, Any]:
+        """Run one unique text, recording whether it came from the cache"""
+        outcome = {"cached": False, "result": None, "error_code": None, "error": None}
+        stats: Dict[str, int] = {}
+        token = cache_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            _validate_task_input(self.task, text, self.options)
+            outcome["result"] = json.dumps(self.handler(text.strip(), self.options))
+        except ValueError as e:
+            outcome["error_code"], outcome["error"] = "VALIDATION_ERROR", str(e)
+        except NLPServiceException as e:
+            outcome["error_code"], outcome["error"] = e.error_code, str(e)
+        except Exception as e:
+            outcome["error_code"], outcome["error"] = "INTERNAL_ERROR", str(e)
+        finally:
+            cache_stats.reset(token)
+        outcome["cached"] = stats.get("hit", 0) > 0 and not stats.get("miss")
+        outcome["seconds"] = round(time.perf_counter() - start, 4)
+        return outcome
+
+    def _run_chunk(self, executor: ThreadPoolExecutor, chunk: List[InputRow], seen: set,
+                   stats: Dict[str, int]) -> List[Dict[str, Any]]:
+        rows, unique = [], []
+        for row_number, row_id, text in chunk:
+            digest = text_hash(text.strip())
+            key = int(digest, 16)
+            row = {"row": row_number, "id": row_id, "text_hash": digest, "duplicate": key in seen,
+                   "result": None, "error_code": None, "error": None, "cached": False, "seconds": 0.0}
+            if not row["duplicate"]:
+                seen.add(key)
+                unique.append((row, text))
+            rows.append(row)
+
+        for (row, _), outcome in zip(unique, executor.map(lambda item: self._process(item[1]), unique)):
+            row.update(outcome)
+
+        stats["rows"] = stats.get("rows", 0) + len(rows)
+        stats["processed"] = stats.get("processed", 0) + len(unique)
+        stats["duplicates"] = stats.get("duplicates", 0) + len(rows) - len(unique)
+        stats["errors"] = stats.get("errors", 0) + sum(1 for row, _ in unique if row["error_code"])
+        stats["cache_hits"] = stats.get("cache_hits", 0) + sum(1 for row, _ in unique if row["cached"])
+        return rows
+
+    def run(self, rows: Iterable[InputRow], source: str, progress: Optional[Callable[[Dict], None]] = None) -> Dict[str, Any]:
+        """Process every row not covered by the checkpoint and return the run report"""
+        checkpoint = self._load_checkpoint(source)
+        stats = checkpoint["stats"]
+
+        # Rebuild the dedup set from parts written before a crash
+        seen = set()
+        for part in range(checkpoint["parts"]):
+            seen.update(int(digest, 16) for digest in self.writer.read_column(part, "text_hash"))
+
+        pending = (row for row in rows if row[0] >= checkpoint["next_row"])
+        start = time.perf_counter()
+        session = {"rows": 0, "processed": 0}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                chunk = list(itertools.islice(pending, self.chunk_size))
+                if not chunk:
+                    break
+                before = dict(stats)
+                results = self._run_chunk(executor, chunk, seen, stats)
+                self.writer.write(checkpoint["parts"], results)
+                checkpoint["parts"] += 1
+                checkpoint["next_row"] = chunk[-1][0] + 1
+                self._save_checkpoint(checkpoint)
+
+                session["rows"] += stats["rows"] - before.get("rows", 0)
+                session["processed"] += stats["processed"] - before.get("processed", 0)
+                if progress is not None:
+                    progress(self._report(stats, session, time.perf_counter() - start, checkpoint))
+
+        checkpoint["completed"] = True
+        self._save_checkpoint(checkpoint)
+        report = self._report(stats, session, time.perf_counter() - start, checkpoint)
+        with open(os.path.join(self.writer.output_dir, REPORT_FILE), "w") as file:
+            json.dump(report, file, indent=2)
+        return report
+
+    @staticmethod
+    def _report(stats: Dict[str, int], session: Dict[str, int], elapsed: float,
+                checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+        processed = stats.get("processed", 0)
+        return {
+            "rows": stats.get("rows", 0),
+            "processed": processed,
+            "duplicates": stats.get("duplicates", 0),
+            "errors": stats.get("errors", 0),
+            "cache_hits": stats.get("cache_hits", 0),
+            "cache_hit_ratio": round(stats.get("cache_hits", 0) / processed, 4) if processed else 0.0,
+            "parts": checkpoint["parts"],
+            "session_seconds": round(elapsed, 3),
+            "rows_per_second": round(session["rows"] / elapsed, 2) if elapsed else 0.0,
+            "processed_per_second": round(session["processed"] / elapsed, 2) if elapsed else 0.0
+        }
@@ -0,0 +1,192 @@
+"""Cache storage backends: the interface and the configured instance"""
+
+import importlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config.config import config
+
+
+class CacheBackend:
+    """
+    Where cached results and single-flight locks are stored.
+
+    Values are JSON-serializable and expire after `expire` seconds, and
+    may carry tags (e.g. "service:classify") for `invalidate`. Like a
+    cache, a backend never raises: failed reads return None, failed
+    writes False, and `acquire_lock` returns None when the store can't
+    be reached.
+    """
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the store can be used right now (otherwise it is bypassed)"""
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State for /health and /metrics"""
+        return {"backend": type(self).__name__, "state": "healthy" if self.healthy else "unhealthy"}
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, expire: int, tags: Optional[List[str]] = None) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Values of the keys that are cached (backends may batch this)"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, items: Dict[str, Any], expire: int, tags: Optional[List[str]] = None) -> bool:
+        return all([self.set(key, value, expire, tags=tags) for key, value in items.items()])
+
+    def acquire_lock(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        raise NotImplementedError
+
+    def release_lock(self, key: str, token: str) -> bool:
+        raise NotImplementedError
+
+    def extend_lock(self, key: str, token: str, ttl_ms: int) -> bool:
+        raise NotImplementedError
+
+    def flush(self) -> bool:
+        raise NotImplementedError
+
+    def invalidate(self, tags: List[str], batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Delete the entries carrying all of the tags, `batch_size` at a time
+
+        Returns how many entries matched, how many were deleted and in how
+        many batches. With `dry_run`, only counts the matches. Unlike
+        other operations this raises when the store can't be reached, as
+        the caller needs to know the entries are still there.
+        """
+        raise NotImplementedError
+
+
+class FailoverCache(CacheBackend):
+    """
+    Redis while it is healthy, a local fallback store while it isn't.
+
+    The fallback is only created at the first outage. Entries written to
+    either store during the other's turn are simply missed later, which
+    a cache can afford.
+    """
+
+    def __init__(self, primary: CacheBackend, make_fallback: Callable[[], CacheBackend]):
+        self.primary = primary
+        self._make_fallback = make_fallback
+        self._fallback: Optional[CacheBackend] = None
+        self._lock = threading.Lock()
+
+    @property
+    def fallback(self) -> CacheBackend:
+        if self._fallback is None:
+            with self._lock:
+                if self._fallback is None:
+                    self._fallback = self._make_fallback()
+        return self._fallback
+
+    @property
+    def active(self) -> CacheBackend:
+        return self.primary if self.primary.healthy else self.fallback
+
+    @property
+    def healthy(self) -> bool:
+        return self.active.healthy
+
+    def snapshot(self) -> Dict[str, Any]:
+        active = self.active
+        snapshot = {**self.primary.snapshot(), "active": "primary" if active is self.primary else "fallback"}
+        if self._fallback is not None:
+            snapshot["fallback"] = self._fallback.snapshot()
+        return snapshot
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.active.get(key)
+
+    def set(self, key: str, value: Any, expire: int, tags: Optional[List[str]] = None) -> bool:
+        return self.active.set(key, value, expire, tags=tags)
+
+    def delete(self, key: str) -> bool:
+        return self.active.delete(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        return self.active.get_many(keys)
+
+    def set_many(self, items: Dict[str, Any], expire: int, tags: Optional[List[str]] = None) -> bool:
+        return self.active.set_many(items, expire, tags=tags)
+
+    def acquire_lock(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        return self.active.acquire_lock(key, token, ttl_ms)
+
+    def release_lock(self, key: str, token: str) -> bool:
+        return self.active.release_lock(key, token)
+
+    def extend_lock(self, key: str, token: str, ttl_ms: int) -> bool:
+        return self.active.extend_lock(key, token, ttl_ms)
+
+    def flush(self) -> bool:
+        return self.active.flush()
+
+    def invalidate(self, tags: List[str], batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        """Invalidate in the fallback, if it was ever used, and in the primary (raising while it is down)"""
+        stores = [self.primary] if self._fallback is None else [self._fallback, self.primary]
+        totals = {"matched": 0, "deleted": 0, "batches": 0}
+        for store in stores:
+            counts = store.invalidate(tags, batch_size=batch_size, dry_run=dry_run)
+            totals = {name: totals[name] + counts[name] for name in totals}
+        return totals
+
+
+def load_backend(settings: Dict[str, Any]) -> CacheBackend:
+    """
+    Build the configured backend
+
+    `backend` is "redis", "sqlite" or an import path
+    ("package.module:ClassName") to a CacheBackend subclass, which gets
+    the backend settings as keyword arguments. With `fallback` "sqlite",
+    the SQLite backend stands in whenever Redis is unhealthy; otherwise
+    the cache is bypassed until Redis is back.
+    """
+    # Imported here: both implementations import this module
+    from src.cache.redis_client import RedisClient
+    from src.cache.sqlite_backend import SQLiteCache
+
+    def sqlite():
+        return SQLiteCache(settings["sqlite_path"], max_bytes=settings["max_bytes"],
+                           evict_every=settings["evict_every"])
+
+    name = settings["backend"]
+    if name == "redis":
+        redis = RedisClient()
+        if settings["fallback"] != "sqlite":
+            return redis
+        return FailoverCache(redis, sqlite)
+    if name == "sqlite":
+        return sqlite()
+    module_name, _, class_name = name.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(**{k: v for k, v in settings.items() if k not in ("backend", "fallback", "invalidate_batch")})
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_cache_backend() -> CacheBackend:
+    """Get the process-wide cache backend built from config (raises if none can be built)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = load_backend(config.cache_backend)
+    return _backend
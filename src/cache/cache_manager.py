@@ -1,12 +1,20 @@
 import hashlib
 import logging
-from typing import Optional, Any
+from typing import Any, Dict, List, Optional
 from functools import wraps
-from .redis_client import RedisClient
+from .backend import get_cache_backend
+from .semantic_cache import get_semantic_cache
+from .single_flight import get_single_flight
 from src.config.config import config
+from src.utils.request_context import routing_key, service, check_deadline, record_cache_outcome, timed
+from src.utils.tracing import get_tracer
 
 logger = logging.getLogger(__name__)
 
+class CacheUnavailable(Exception):
+    """The cache backend is down and being bypassed"""
+
+
 class CacheConfig:
     """Cache configuration settings"""
     DEFAULT_EXPIRE = config.cache_timeouts["default"]
@@ -16,20 +24,41 @@ class CacheConfig:
     CLASSIFY_EXPIRE = config.cache_timeouts["classify"]
     TEST_EXPIRE = 2  # Keep this for testing
 
+
+def cache_tags(prefix: str, model: str, options: Optional[dict] = None) -> List[str]:
+    """
+    Tags of a cache entry, for invalidating it along with its kind
+
+    Service (the prefix's first part, so "summarize_chunk" entries are
+    "summarize" ones), model and prompt version, plus a hash of the
+    category set for classifications.
+    """
+    service_name = prefix.split("_")[0]
+    tags = [
+        f"service:{service_name}",
+        f"model:{model}",
+        f"prompt:{service_name}:{config.prompt_versions.get(service_name, '1')}"
+    ]
+    if service_name == "classify":
+        categories = (options or {}).get("categories")
+        digest = hashlib.md5("|".join(sorted(categories)).encode()).hexdigest()[:12] if categories else "default"
+        tags.append(f"categories:{digest}")
+    return tags
+
     
 class CacheManager:
     """Manager class for handling caching operations"""
     
     def __init__(self):
-        """Initialize Redis client"""
-        self.redis = RedisClient()
+        """Connect to the configured cache backend"""
+        self.backend = get_cache_backend()
 
-    def generate_key(self, prefix: str, text: str, options: Optional[dict] = None) -> str:
+    def generate_key(self, prefix: str, text: str, options: Optional[dict] = None, model: Optional[str] = None) -> str:
         """
         Generate a unique cache key based on input parameters
         """
-        # Get current model
-        current_model = config.get_current_model()
+        # Key on the request's model, falling back to the default
+        current_model = model or config.get_current_model()
         logging.info(f"Cache key Generation - Current Model: {current_model}")
         # Create a string combining all parameters
         cleaned_text = text.strip().strip('"')
@@ -50,60 +79,136 @@ class CacheManager:
 
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
-        return self.redis.get(key)
+        return self.backend.get(key)
 
-    def set(self, key: str, value: Any, expire: int = CacheConfig.DEFAULT_EXPIRE) -> bool:
-        """Set value in cache with expiration"""
-        return self.redis.set(key, value, expire)
+    def set(self, key: str, value: Any, expire: int = CacheConfig.DEFAULT_EXPIRE, tags: Optional[List[str]] = None) -> bool:
+        """Set value in cache with expiration and tags (see `cache_tags`)"""
+        return self.backend.set(key, value, expire, tags=tags)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get the cached values among several keys"""
+        return self.backend.get_many(keys)
+
+    def set_many(self, items: Dict[str, Any], expire: int = CacheConfig.DEFAULT_EXPIRE, tags: Optional[List[str]] = None) -> bool:
+        """Set several values with the same expiration and tags"""
+        return self.backend.set_many(items, expire, tags=tags)
 
     def delete(self, key: str) -> bool:
         """Delete value from cache"""
-        return self.redis.delete(key)
+        return self.backend.delete(key)
 
 def cache_response(prefix: str, expire: int = CacheConfig.DEFAULT_EXPIRE):
     """
     Decorator for caching NLP service responses
+
+    With single-flight enabled, concurrent misses on the same key in other
+    workers wait for this one's result instead of calling the model again.
+    With the semantic cache enabled for the prefix, an exact miss is served
+    from the cached result of a near-duplicate input when there is one.
     """
     def decorator(func):
         @wraps(func)
-        def wrapper(self, text: str, options: Optional[dict] = None):
-            try:
-                # Initialize cache manager
-                if not hasattr(self, '_cache_manager'):
-                    self._cache_manager = CacheManager()
-                
-                # Get current model
-                current_model = config.get_current_model()
-                print(f"Cache decorator - Using model: {current_model}")  # Debug
+        def wrapper(self, text: str, options: Optional[dict] = None, model: Optional[str] = None):
+            # Don't spend a Redis round trip (or a model call) on abandoned work
+            check_deadline("cache lookup")
+
+            # One model snapshot for the key, the call and the result, so a
+            # concurrent /set-model can't mix models within a request
+            current_model = model or config.get_current_model()
+            print(f"Cache decorator - Using model: {current_model}")  # Debug
+
+            with get_tracer().span("service", service=prefix, model=current_model) as span:
+                try:
+                    # Initialize cache manager
+                    if not hasattr(self, '_cache_manager'):
+                        self._cache_manager = CacheManager()
                 
-                # Generate cache key
-                cache_key = self._cache_manager.generate_key(prefix, text, options)
-                print(f"Cache key generated: {cache_key}")  # Debug
+                    # Don't wait on a cache that is known to be down
+                    if not self._cache_manager.backend.healthy:
+                        raise CacheUnavailable()
+
+                    # Generate cache key
+                    with timed("cache_key"):
+                        cache_key = self._cache_manager.generate_key(prefix, text, options, model=current_model)
+                    print(f"Cache key generated: {cache_key}")  # Debug
                 
-                # Try to get from cache
-                cached_result = self._cache_manager.get(cache_key)
+                    # Try to get from cache
+                    cached_result = self._cache_manager.get(cache_key)
+                except Exception as e:
+                    # Cache unavailable, compute without it. Errors from func itself
+                    # must not land here, or a failing model call would run twice
+                    outcome = "bypass" if isinstance(e, CacheUnavailable) else "error"
+                    print(f"Cache {outcome}: {str(e)}")  # Debug
+                    record_cache_outcome(outcome)
+                    span.set_attribute("cache", outcome)
+                    service_token = service.set(prefix)
+                    try:
+                        return func(self, text, options, model=current_model)
+                    finally:
+                        service.reset(service_token)
                 
                 if cached_result:  # Only check model if we have a cached result
                     print(f"Found cached result for model: {cached_result.get('model', 'unknown')}")  # Debug
                     if cached_result.get('model') == current_model:
                         print("Cache hit - returning cached result")  # Debug
+                        record_cache_outcome("hit")
+                        span.set_attribute("cache", "hit")
                         return cached_result
-                
+
+                # Near-duplicate of an earlier input?
+                vector = None
+                if config.semantic_cache["enabled"] and get_semantic_cache().enabled_for(prefix):
+                    similar, vector = get_semantic_cache().lookup(prefix, text, options, current_model)
+                    if similar is not None:
+                        similarity = similar.pop("similarity")
+                        print(f"Semantic cache hit - similarity {similarity}")  # Debug
+                        if "text" in similar:
+                            similar["text"] = text
+                        similar["metadata"] = {**(similar.get("metadata") or {}), "semantic_hit": {"similarity": similarity}}
+                        record_cache_outcome("semantic_hit")
+                        span.set_attribute("cache", "semantic_hit")
+                        return similar
+
                 # If we get here, either no cache or different model
-                print("Cache miss - computing new result")  # Debug
-                result = func(self, text, options)
-                
-                # Add model to result if not present
-                if isinstance(result, dict):
-                    result['model'] = current_model
-                
-                # Store in cache
-                self._cache_manager.set(cache_key, result, expire)
+                def compute():
+                    # Route by cache key so repeated requests land on a warm Ollama host
+                    token = routing_key.set(cache_key)
+                    service_token = service.set(prefix)
+                    try:
+                        result = func(self, text, options, model=current_model)
+                    finally:
+                        service.reset(service_token)
+                        routing_key.reset(token)
+
+                    # Add model to result if not present
+                    if isinstance(result, dict):
+                        result['model'] = current_model
+
+                    # Store in cache
+                    try:
+                        tags = cache_tags(prefix, current_model, options)
+                        if self._cache_manager.set(cache_key, result, expire, tags=tags) and vector is not None:
+                            get_semantic_cache().add(prefix, options, current_model, vector, cache_key)
+                    except Exception as e:
+                        print(f"Cache error: {str(e)}")  # Debug
+                    return result
+
+                if not config.single_flight["enabled"]:
+                    print("Cache miss - computing new result")  # Debug
+                    record_cache_outcome("miss")
+                    span.set_attribute("cache", "miss")
+                    return compute()
+
+                # Other workers missing on the same key wait for one computation
+                def lookup():
+                    cached = self._cache_manager.get(cache_key)
+                    return cached if cached and cached.get('model') == current_model else None
+
+                result, outcome = get_single_flight().run(cache_key, compute, lookup)
+                print(f"Cache miss - result {outcome}")  # Debug
+                record_cache_outcome("coalesced" if outcome == "coalesced" else "miss")
+                span.set_attribute("cache", "coalesced" if outcome == "coalesced" else "miss")
                 return result
-                
-            except Exception as e:
-                print(f"Cache error: {str(e)}")  # Debug
-                return func(self, text, options)
-                
+
         return wrapper
     return decorator
\ No newline at end of file
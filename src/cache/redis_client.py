@@ -1,81 +1,401 @@
-from redis import Redis
+from redis import ConnectionPool, Redis
+from redis.cluster import RedisCluster
 import json
 import logging
-from typing import Any, Optional
+import time
+from typing import Any, Dict, Iterable, List, Optional
 import os
 from datetime import timedelta
+from src.cache.backend import CacheBackend
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisClusterException
+from src.cache.redis_health import CONNECTION_ERRORS, RedisHealth
+from src.cache.sharding import ShardedRedis
 from src.config.config import config
+from src.utils.request_context import timed
+from src.utils.tracing import get_tracer
 
 logger = logging.getLogger(__name__)
 
-class RedisClient:
-    """Redis client wrapper function for basic operations"""
+# Delete / extend a lock only while it still holds our token
+RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+EXTEND_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Sorted set of the keys carrying a tag, scored by their expiry time, on the same node as the keys
+TAG_PREFIX = "tag:"
+
+class RedisClient(CacheBackend):
+    """
+    Redis client wrapper function for basic operations
+
+    The cache can live on one Redis, a Redis Cluster (`cluster`) or
+    several independent nodes sharded by consistent hashing (`nodes`),
+    with cache reads served by replicas when configured. `client` is
+    always a plain connection for everything else (jobs, rate limits):
+    the single Redis, the cluster, or the first node. A cluster that
+    can't be reached at startup leaves `client` None until it can.
+
+    An unreachable Redis doesn't fail construction: `health` goes
+    unhealthy, cache operations are bypassed (misses, failed writes) and
+    the connection is retried in the background.
+
+    Tagged entries are recorded in one Redis sorted set per tag
+    (`tag:<tag>`) on each key's own shard, scored by the entry's expiry
+    so expired members are trimmed on every write and a hot tag only
+    lists live entries. A tag can then be invalidated without SCAN or
+    FLUSHDB.
+    """
 
     _instance = None
 
-    def __new__(cls):
+    def __new__(cls, settings: Optional[Dict[str, Any]] = None):
         """Singelton pattern to ensure single redis connection"""
+        if settings is not None:
+            # A separately configured client (e.g. another deployment's Redis)
+            instance = super().__new__(cls)
+            instance._initialized = False
+            return instance
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._initialized = False
         return cls._instance
     
-    def __init__(self):
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
         """Initializes the Redis connection if not already done"""
         if self._initialized:
             return
+        settings = {**config.redis, **(settings or {})}
+        # Bounded waits, so a dead Redis is detected instead of hanging requests
+        timeouts = {
+            "socket_connect_timeout": settings["connect_timeout"],
+            "socket_timeout": settings["socket_timeout"]
+        }
         
         try: 
-            self.client = Redis(
-                host=config.redis["host"],
-                port=config.redis["port"],
-                db=config.redis["db"],
-                password=config.redis["password"],
-                decode_responses=True
-            )
-            self.client.ping()  # Test connection
-            logger.info("Successfully connected to Redis")
+            self.shards: Optional[ShardedRedis] = None
+            if settings.get("cluster"):
+                self.mode = "cluster"
+                # Connecting to a cluster discovers its nodes, so wait for the
+                # first ping (and the reconnects) rather than fail here
+                self._cluster_settings = {
+                    "host": settings["host"],
+                    "port": settings["port"],
+                    "password": settings["password"],
+                    "decode_responses": True,
+                    "read_from_replicas": bool(settings.get("replicas")),
+                    **timeouts
+                }
+                self.client = None
+            elif settings.get("nodes"):
+                self.mode = "sharded"
+                self.shards = ShardedRedis(
+                    settings["nodes"],
+                    replicas=settings.get("replicas"),
+                    password=settings["password"],
+                    db=settings["db"],
+                    virtual_nodes=settings.get("virtual_nodes", 160),
+                    **timeouts
+                )
+                self.client = self.shards.primaries[settings["nodes"][0]]
+            else:
+                self.mode = "single"
+                self.client = Redis(
+                    host=settings["host"],
+                    port=settings["port"],
+                    db=settings["db"],
+                    password=settings["password"],
+                    decode_responses=True,
+                    **timeouts
+                )
+            if self.client is not None:
+                self._register_scripts()
+            self.health = RedisHealth(self._ping, settings["reconnect_initial"], settings["reconnect_max"])
+            try:
+                self._ping()  # Test connection
+                logger.info("Successfully connected to Redis")
+            except CONNECTION_ERRORS as e:
+                self.health.record_error(e)
             self._initialized = True
         except Exception as e:
             logger.error(f"Failed to connect to Redis : {str(e)}")
             raise
 
+    def _register_scripts(self):
+        self._release_lock = self.client.register_script(RELEASE_LOCK)
+        self._extend_lock = self.client.register_script(EXTEND_LOCK)
+
+    def _ping(self):
+        if self.client is None:
+            try:
+                self.client = RedisCluster(**self._cluster_settings)
+            except RedisClusterException as e:
+                raise RedisConnectionError(str(e)) from e
+            self._register_scripts()
+        self.client.ping()
+        if self.shards is not None:
+            self.shards.ping()
+
+    def connection(self, **overrides):
+        """
+        A separate connection to where `client` points, with some settings
+        changed, e.g. `socket_timeout=None` for blocking commands that
+        must not share the command timeout
+        """
+        if self.mode == "cluster":
+            return RedisCluster(**{**self._cluster_settings, **overrides})
+        pool = self.client.connection_pool
+        return Redis(connection_pool=ConnectionPool(
+            connection_class=pool.connection_class, **{**pool.connection_kwargs, **overrides}
+        ))
+
+    def ping(self) -> bool:
+        """Check that Redis (every node) answers; raises if it doesn't"""
+        self._ping()
+        return True
+
+    @property
+    def healthy(self) -> bool:
+        return self.health.healthy
+
+    def _available(self) -> bool:
+        """Whether to use Redis now; while it is down, operations are bypassed"""
+        if self.health.healthy:
+            return True
+        self.health.bypass()
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"backend": "redis", "mode": self.mode, **self.health.snapshot()}
+
+    def _writer(self, key: str):
+        """Connection holding a key"""
+        return self.client if self.shards is None else self.shards.primary(key)
+
+    def _reader(self, key: str):
+        """Connection to read a key from (a replica when there are any)"""
+        return self.client if self.shards is None else self.shards.reader(key)
+
+    def _groups(self, keys: Iterable[str], read: bool = False):
+        """Keys grouped by connection, for one round trip per shard"""
+        if self.shards is None:
+            return [(self.client, list(keys))]
+        return self.shards.group(keys, read=read)
+
     def get(self, key: str) -> Optional[Any]:
         """Get value from Redis"""
+        if not self._available():
+            return None
         try:
-            data = self.client.get(key)
+            with timed("redis"), get_tracer().span("redis", operation="get") as span:
+                data = self._reader(key).get(key)
+                span.set_attribute("found", data is not None)
             if data:
                 return json.loads(data)
             return None
         except Exception as e:
+            self.health.record_error(e)
             logger.error(f"Error retrieving from Redis: {str(e)}")
             return None
 
-    def set(self, key: str, value: Any, expire: int) -> bool:
-        """Set value in Redis with expiration"""
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get several values, one round trip per shard; missing keys are left out"""
+        if not self._available():
+            return {}
+        found = {}
+        try:
+            with timed("redis"), get_tracer().span("redis", operation="mget", keys=len(keys)):
+                for client, group in self._groups(keys, read=True):
+                    values = client.mget_nonatomic(group) if isinstance(client, RedisCluster) else client.mget(group)
+                    found.update({key: json.loads(data) for key, data in zip(group, values) if data})
+        except Exception as e:
+            self.health.record_error(e)
+            logger.error(f"Error retrieving from Redis: {str(e)}")
+        return found
+
+    @staticmethod
+    def _add_tags(pipe, key: str, expire: int, tags: List[str]):
+        """Queue adding a key to its tags' sets, dropping members that have expired"""
+        now = time.time()
+        # Outlive the entries added later with longer timeouts
+        tag_expire = max([expire, *config.cache_timeouts.values()])
+        for tag in tags:
+            pipe.zadd(TAG_PREFIX + tag, {key: now + expire})
+            pipe.zremrangebyscore(TAG_PREFIX + tag, "-inf", now)
+            pipe.expire(TAG_PREFIX + tag, tag_expire)
+
+    def set(self, key: str, value: Any, expire: int, tags: Optional[List[str]] = None) -> bool:
+        """Set value in Redis with expiration, adding the key to its tags' sets"""
+        if not self._available():
+            return False
         try:
-            return self.client.setex(
-                key,
-                timedelta(seconds=expire),
-                json.dumps(value)
-            )
+            payload = json.dumps(value)
+            with timed("redis"), get_tracer().span("redis", operation="set", bytes=len(payload)):
+                if not tags:
+                    return self._writer(key).setex(key, timedelta(seconds=expire), payload)
+                pipe = self._writer(key).pipeline(transaction=False)
+                pipe.setex(key, timedelta(seconds=expire), payload)
+                self._add_tags(pipe, key, expire, tags)
+                return bool(pipe.execute()[0])
         except Exception as e:
+            self.health.record_error(e)
             logger.error(f"Error setting Redis key: {str(e)}")
             return False
 
+    def set_many(self, items: Dict[str, Any], expire: int, tags: Optional[List[str]] = None) -> bool:
+        """Set several values (all with the same tags) with one pipeline per shard"""
+        if not self._available():
+            return False
+        try:
+            with timed("redis"), get_tracer().span("redis", operation="mset", keys=len(items)):
+                for client, group in self._groups(items):
+                    pipe = client.pipeline(transaction=False)
+                    for key in group:
+                        pipe.setex(key, timedelta(seconds=expire), json.dumps(items[key]))
+                        if tags:
+                            self._add_tags(pipe, key, expire, tags)
+                    pipe.execute()
+            return True
+        except Exception as e:
+            self.health.record_error(e)
+            logger.error(f"Error setting Redis keys: {str(e)}")
+            return False
+
     def delete(self, key: str) -> bool:
         """Delete value from Redis"""
+        if not self._available():
+            return False
         try:
-            return bool(self.client.delete(key))
+            with timed("redis"), get_tracer().span("redis", operation="delete"):
+                return bool(self._writer(key).delete(key))
         except Exception as e:
+            self.health.record_error(e)
             logger.error(f"Error deleting Redis key: {str(e)}")
             return False
 
+    def acquire_lock(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        """Take a lock (SET NX PX); None when Redis can't be reached"""
+        if not self._available():
+            return None
+        try:
+            with timed("redis"), get_tracer().span("redis", operation="lock") as span:
+                acquired = bool(self._writer(key).set(key, token, nx=True, px=ttl_ms))
+                span.set_attribute("acquired", acquired)
+            return acquired
+        except Exception as e:
+            self.health.record_error(e)
+            logger.error(f"Error acquiring Redis lock: {str(e)}")
+            return None
+
+    def release_lock(self, key: str, token: str) -> bool:
+        """Release a lock if it is still ours"""
+        if not self._available():
+            return False
+        try:
+            with timed("redis"), get_tracer().span("redis", operation="unlock"):
+                return bool(self._release_lock(keys=[key], args=[token], client=self._writer(key)))
+        except Exception as e:
+            self.health.record_error(e)
+            logger.error(f"Error releasing Redis lock: {str(e)}")
+            return False
+
+    def extend_lock(self, key: str, token: str, ttl_ms: int) -> bool:
+        """Push back a lock's expiry if it is still ours"""
+        if not self._available():
+            return False
+        try:
+            return bool(self._extend_lock(keys=[key], args=[token, ttl_ms], client=self._writer(key)))
+        except Exception as e:
+            self.health.record_error(e)
+            logger.error(f"Error extending Redis lock: {str(e)}")
+            return False
+
     def flush(self) -> bool:
-        """Clear all keys in the current database"""
+        """Clear all keys in the current database (of every shard)"""
         try:
+            if self.shards is not None:
+                return all([bool(client.flushdb()) for client in self.shards.primaries.values()])
             return bool(self.client.flushdb())
         except Exception as e:
+            self.health.record_error(e)
             logger.error(f"Error flushing Redis db: {str(e)}")
             return False
-        
\ No newline at end of file
+        
+
+    def invalidate(self, tags: List[str], batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Delete the entries carrying all of the tags, on every shard
+
+        Each tag's set is a sorted set of keys scored by their expiry
+        time, so members whose entries have expired are dropped first.
+        Then the smallest set is walked with ZSCAN, the keys that are in
+        the other sets too are kept, and they are UNLINKed (freed in the
+        background) one pipelined batch at a time, so Redis keeps serving
+        other clients in between. Keys are removed from the tags' sets
+        as they go; their other tags' sets still list them until they
+        expire, which is harmless.
+        """
+        if not self.health.healthy:
+            raise RedisConnectionError("Redis unavailable, nothing was invalidated")
+        tag_keys = [TAG_PREFIX + tag for tag in tags]
+        counts = {"matched": 0, "deleted": 0, "batches": 0}
+        clients = list(self.shards.primaries.values()) if self.shards is not None else [self.client]
+        try:
+            with timed("redis"), get_tracer().span("redis", operation="invalidate", tags=len(tags)) as span:
+                for client in clients:
+                    now = time.time()
+                    pipe = client.pipeline(transaction=False)
+                    for tag_key in tag_keys:
+                        if not dry_run:
+                            pipe.zremrangebyscore(tag_key, "-inf", now)
+                        pipe.zcount(tag_key, now, "+inf")
+                    results = pipe.execute()
+                    sizes = results if dry_run else results[1::2]
+                    if not min(sizes):
+                        continue
+                    smallest = tag_keys[sizes.index(min(sizes))]
+                    others = [tag_key for tag_key in tag_keys if tag_key != smallest]
+                    cursor = 0
+                    while True:
+                        cursor, scored = client.zscan(smallest, cursor, count=batch_size)
+                        members = [key for key, expires_at in scored if expires_at > now]
+                        if members and others:
+                            pipe = client.pipeline(transaction=False)
+                            for key in members:
+                                for tag_key in others:
+                                    pipe.zscore(tag_key, key)
+                            found = pipe.execute()
+                            members = [
+                                key for i, key in enumerate(members)
+                                if all(score is not None and score > now
+                                       for score in found[i * len(others):(i + 1) * len(others)])
+                            ]
+                        counts["matched"] += len(members)
+                        # ZSCAN returns small (listpack) sets whole, so batch here too
+                        batches = [] if dry_run else [
+                            members[start:start + batch_size] for start in range(0, len(members), batch_size)
+                        ]
+                        for batch in batches:
+                            pipe = client.pipeline(transaction=False)
+                            for key in batch:
+                                pipe.unlink(key)
+                            for tag_key in tag_keys:
+                                pipe.zrem(tag_key, *batch)
+                            counts["deleted"] += sum(pipe.execute()[:len(batch)])
+                            counts["batches"] += 1
+                        if cursor == 0:
+                            break
+                span.set_attribute("deleted", counts["deleted"])
+            return counts
+        except Exception as e:
+            self.health.record_error(e)
+            logger.error(f"Error invalidating Redis tags: {str(e)}")
+            raise
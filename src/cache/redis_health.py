@@ -0,0 +1,110 @@
+"""Connection health of Redis, with background reconnects"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Errors that say Redis can't be reached, as opposed to a bad command
+CONNECTION_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+
+class RedisHealth:
+    """
+    Healthy/unhealthy state machine for the Redis connection.
+
+    A connection error moves it to unhealthy. From then on cache
+    operations are skipped at once (counted as bypassed) instead of each
+    waiting for a connect timeout, while a background thread pings Redis
+    with jittered exponential backoff, from `initial_backoff` up to
+    `max_backoff` seconds. The first successful ping makes it healthy
+    again.
+    """
+
+    HEALTHY = "healthy"
+    UNHEALTHY = "unhealthy"
+
+    def __init__(self, ping: Callable[[], Any], initial_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.ping = ping
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._state = self.HEALTHY
+        self._since = time.time()
+        self._last_error: Optional[str] = None
+        self._reconnect_attempts = 0
+        self._next_attempt: Optional[float] = None
+        self._outages = 0
+        self._bypassed = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def healthy(self) -> bool:
+        return self._state == self.HEALTHY
+
+    def bypass(self):
+        """Count an operation skipped because Redis is down"""
+        with self._lock:
+            self._bypassed += 1
+
+    def record_error(self, error: Exception):
+        """Go unhealthy on a connection error and start reconnecting"""
+        if not isinstance(error, CONNECTION_ERRORS):
+            return
+        with self._lock:
+            self._last_error = str(error)
+            if self._state == self.UNHEALTHY:
+                return
+            self._state = self.UNHEALTHY
+            self._since = time.time()
+            self._outages += 1
+            self._reconnect_attempts = 0
+            logger.error(f"Redis unavailable, bypassing the cache until it is back: {str(error)}")
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._reconnect, name="redis-reconnect", daemon=True)
+                self._thread.start()
+
+    def _reconnect(self):
+        delay = self.initial_backoff
+        while True:
+            pause = random.uniform(delay / 2, delay)
+            self._next_attempt = time.time() + pause
+            time.sleep(pause)
+            try:
+                self.ping()
+            except Exception as e:
+                with self._lock:
+                    self._reconnect_attempts += 1
+                    self._last_error = str(e)
+                delay = min(delay * 2, self.max_backoff)
+                continue
+            with self._lock:
+                self._state = self.HEALTHY
+                self._since = time.time()
+                self._next_attempt = None
+            logger.info(f"Redis reachable again after {self._reconnect_attempts + 1} attempts")
+            return
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {
+                "state": self._state,
+                "since": round(self._since, 3),
+                "outages": self._outages,
+                "bypassed_operations": self._bypassed,
+                "last_error": self._last_error
+            }
+            if self._state == self.UNHEALTHY:
+                snapshot["reconnect_attempts"] = self._reconnect_attempts
+                if self._next_attempt is not None:
+                    snapshot["next_attempt_in"] = round(max(0.0, self._next_attempt - time.time()), 3)
+            return snapshot
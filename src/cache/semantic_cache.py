@@ -0,0 +1,332 @@
+"""Semantic cache: reuse results of near-duplicate inputs found by embedding similarity"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.cache.backend import CacheBackend, get_cache_backend
+from src.config.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over unit vectors, each pointing at a cache key.
+
+    Up to `ann_threshold` vectors are searched exactly with one matrix
+    product. Beyond that an IVF index is built: vectors are clustered
+    with spherical k-means and a lookup only scans the `nprobe` clusters
+    nearest to the query. Vectors loaded from disk stay memory-mapped;
+    new ones go to an in-memory buffer.
+    """
+
+    def __init__(self, ann_threshold: int = 20_000, nprobe: int = 8, max_entries: int = 200_000):
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.max_entries = max_entries
+        self.keys: List[str] = []
+        self._mapped = np.empty((0, 0), dtype=np.float32)  # Read-only, from disk
+        self._buffer = np.empty((0, 0), dtype=np.float32)  # Added since, with spare capacity
+        self._count = 0  # Rows used in the buffer
+        self._alive = np.empty(0, dtype=bool)  # Per row, with spare capacity like the buffer
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._built_size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def dim(self) -> int:
+        return self._mapped.shape[1] if len(self._mapped) else self._buffer.shape[1]
+
+    def vectors(self) -> np.ndarray:
+        """All vectors (a copy when some are memory-mapped and some buffered)"""
+        if not len(self._mapped):
+            return self._buffer[:self._count]
+        if not self._count:
+            return self._mapped
+        return np.concatenate([self._mapped, self._buffer[:self._count]])
+
+    def _rows(self, ids: np.ndarray) -> np.ndarray:
+        """Vectors of the rows, in the order of `ids`"""
+        mapped = len(self._mapped)
+        if not self._count:
+            return self._mapped[ids]
+        if not mapped:
+            return self._buffer[ids]
+        rows = np.empty((len(ids), self.dim), dtype=np.float32)
+        from_disk = ids < mapped
+        rows[from_disk] = self._mapped[ids[from_disk]]
+        rows[~from_disk] = self._buffer[ids[~from_disk] - mapped]
+        return rows
+
+    def add(self, vector: np.ndarray, key: str):
+        with self._lock:
+            if self._buffer.shape[1] != len(vector):
+                if len(self):
+                    raise ValueError(f"Vector has {len(vector)} dimensions, index has {self.dim}")
+                self._buffer = np.empty((0, len(vector)), dtype=np.float32)
+            if self._count == len(self._buffer):
+                grown = np.empty((max(64, 2 * len(self._buffer)), len(vector)), dtype=np.float32)
+                grown[:self._count] = self._buffer[:self._count]
+                self._buffer = grown
+            self._buffer[self._count] = vector
+            self._count += 1
+            self.keys.append(key)
+            row = len(self) - 1
+            if row >= len(self._alive):
+                grown = np.zeros(max(64, 2 * len(self._alive)), dtype=bool)
+                grown[:row] = self._alive
+                self._alive = grown
+            self._alive[row] = True
+
+            if self._centroids is not None:
+                self._lists[int(np.argmax(self._centroids @ vector))].append(row)
+            if len(self) > self.max_entries:
+                # A tenth at a time, so a full index doesn't compact on every add
+                self._drop_oldest(max(len(self) - self.max_entries, self.max_entries // 10))
+            if len(self) >= self.ann_threshold and len(self) >= 2 * max(self._built_size, self.ann_threshold // 2):
+                self._build_ivf()  # First time past the threshold, then whenever the size doubles
+
+    def remove(self, row: int):
+        """Forget a vector whose cache entry is gone"""
+        with self._lock:
+            if row < len(self):
+                self._alive[row] = False
+
+    def search(self, query: np.ndarray) -> Tuple[int, float]:
+        """Best live match: (row, similarity), or (-1, -1.0) when empty"""
+        with self._lock:
+            if not len(self) or not self._alive[:len(self)].any():
+                return -1, -1.0
+            if self._centroids is None:
+                candidates = None
+                scores = self.vectors() @ query
+            else:
+                probes = np.argsort(self._centroids @ query)[-self.nprobe:]
+                candidates = np.fromiter((row for probe in probes for row in self._lists[probe]), dtype=np.int64)
+                if not len(candidates):
+                    return -1, -1.0
+                scores = self._rows(candidates) @ query
+            alive = self._alive[:len(self)] if candidates is None else self._alive[candidates]
+            scores = np.where(alive, scores, -np.inf)
+            best = int(np.argmax(scores))
+            if not np.isfinite(scores[best]):
+                return -1, -1.0
+            row = best if candidates is None else int(candidates[best])
+            return row, float(scores[best])
+
+    def _build_ivf(self, iterations: int = 8, seed: int = 0):
+        """Cluster the vectors into about sqrt(n) lists with spherical k-means"""
+        vectors = self.vectors()
+        nlist = max(1, int(np.sqrt(len(vectors))))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = vectors[assignment == cluster]
+                if len(members):
+                    mean = members.sum(axis=0)
+                    centroids[cluster] = mean / (np.linalg.norm(mean) or 1.0)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        self._lists = [np.flatnonzero(assignment == cluster).tolist() for cluster in range(nlist)]
+        self._centroids = centroids
+        self._built_size = len(vectors)
+
+    def _drop_oldest(self, count: int):
+        """
+        Drop the oldest vectors (and dead ones) to stay within max_entries
+
+        The IVF lists are renumbered rather than rebuilt: the clusters
+        still fit the remaining vectors, and k-means only runs again when
+        the index doubles.
+        """
+        keep = np.flatnonzero(self._alive[:len(self)])
+        keep = keep[keep >= count]
+        vectors = self._rows(keep) if len(keep) else np.empty((0, self.dim), dtype=np.float32)
+        renumbered = np.full(len(self), -1, dtype=np.int64)
+        renumbered[keep] = np.arange(len(keep))
+        self.keys = [self.keys[row] for row in keep]
+        self._mapped = np.empty((0, 0), dtype=np.float32)
+        self._buffer, self._count = np.array(vectors, dtype=np.float32), len(keep)
+        self._alive = np.ones(len(keep), dtype=bool)
+        if self._centroids is not None:
+            lists = [renumbered[np.asarray(rows, dtype=np.int64)] for rows in self._lists]
+            self._lists = [rows[rows >= 0].tolist() for rows in lists]
+
+    def save(self, path: str):
+        """
+        Write live vectors (.npy) and keys (.json) atomically
+
+        Each worker process indexes its own additions and saves to the
+        same files, so a save holds an exclusive lock on `<path>.lock`
+        and merges in the entries other workers saved that this one
+        lacks (older first), keeping the newest `max_entries`.
+        """
+        with self._lock:
+            live = np.flatnonzero(self._alive[:len(self)])
+            vectors = self._rows(live) if len(live) else np.empty((0, max(self.dim, 0)), dtype=np.float32)
+            keys = [self.keys[row] for row in live]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # Released when the file is closed
+            if os.path.exists(f"{path}.npy"):
+                saved_vectors, saved_keys = self._read(path)
+                known = set(keys)
+                others = [row for row, key in enumerate(saved_keys) if key not in known]
+                if others and (not len(keys) or saved_vectors.shape[1] == vectors.shape[1]):
+                    vectors = np.concatenate([saved_vectors[others], vectors]) if len(keys) else saved_vectors[others]
+                    keys = [saved_keys[row] for row in others] + keys
+            vectors, keys = vectors[-self.max_entries:], keys[-self.max_entries:]
+            with open(f"{path}.npy.tmp", "wb") as file:
+                np.save(file, np.ascontiguousarray(vectors, dtype=np.float32))
+            with open(f"{path}.json.tmp", "w") as file:
+                json.dump(keys, file)
+            os.replace(f"{path}.npy.tmp", f"{path}.npy")
+            os.replace(f"{path}.json.tmp", f"{path}.json")
+
+    @staticmethod
+    def _read(path: str) -> Tuple[np.ndarray, List[str]]:
+        """Saved vectors (memory-mapped) and keys"""
+        with open(f"{path}.json") as file:
+            keys = json.load(file)
+        vectors = np.load(f"{path}.npy", mmap_mode="r")
+        if len(vectors) != len(keys):
+            raise ValueError(f"Index files at {path} don't match")
+        return vectors, keys
+
+    @classmethod
+    def load(cls, path: str, **settings) -> "VectorIndex":
+        """Open a saved index, memory-mapping its vectors"""
+        index = cls(**settings)
+        index._mapped, index.keys = cls._read(path)
+        index._buffer = np.empty((0, index._mapped.shape[1]), dtype=np.float32)
+        index._alive = np.ones(len(index.keys), dtype=bool)
+        if len(index) >= index.ann_threshold:
+            index._build_ivf()
+        return index
+
+
+class SemanticCache:
+    """
+    Find cached results of inputs similar to a new one.
+
+    There is one index per (service, model, options) namespace, since a
+    result only carries over between requests that differ in their text
+    alone. Indexes hold embeddings and exact cache keys; the results stay
+    in the cache backend, so an expired entry is simply dropped from the index.
+    """
+
+    def __init__(self, client=None, backend: Optional[CacheBackend] = None, settings: Optional[Dict[str, Any]] = None):
+        self.settings = {**config.semantic_cache, **(settings or {})}
+        self._client = client
+        self.backend = backend or get_cache_backend()
+        self._indexes: Dict[str, VectorIndex] = {}
+        self._added = 0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from src.inference.ollama_pool import get_ollama_pool  # The pool imports the cache layer's peers
+            self._client = get_ollama_pool()
+        return self._client
+
+    def enabled_for(self, service: str) -> bool:
+        return self.settings["enabled"] and service in self.settings["thresholds"]
+
+    @staticmethod
+    def namespace(service: str, options: Optional[Dict], model: str) -> str:
+        parts = [service, model] + [f"{k}:{v}" for k, v in sorted((options or {}).items())]
+        return f"{service}-{hashlib.md5('|'.join(parts).encode()).hexdigest()}"
+
+    def _index(self, namespace: str) -> VectorIndex:
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None:
+                settings = {k: self.settings[k] for k in ("ann_threshold", "nprobe", "max_entries")}
+                path = os.path.join(self.settings["path"], namespace)
+                try:
+                    index = VectorIndex.load(path, **settings) if os.path.exists(f"{path}.npy") else VectorIndex(**settings)
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable semantic index {path}: {str(e)}")
+                    index = VectorIndex(**settings)
+                self._indexes[namespace] = index
+            return index
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """Unit-length embedding of a text, or None if the embedding model is unavailable"""
+        try:
+            response = self.client.embed(model=self.settings["embedding_model"], input=text)
+            vector = np.asarray(response["embeddings"][0], dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {str(e)}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, service: str, text: str, options: Optional[Dict], model: str) -> Tuple[Optional[Dict], Optional[np.ndarray]]:
+        """
+        Cached result of the most similar earlier input above the service's threshold
+
+        Returns the result (None on a miss) and the input's embedding, to
+        be passed to `add` once the result is computed.
+        """
+        vector = self.embed(text)
+        if vector is None:
+            return None, None
+        index = self._index(self.namespace(service, options, model))
+        row, similarity = index.search(vector)
+        if row < 0 or similarity < self.settings["thresholds"][service]:
+            return None, vector
+        cached = self.backend.get(index.keys[row])
+        if not cached or cached.get("model") != model:
+            index.remove(row)  # Expired or replaced
+            return None, vector
+        return {**cached, "similarity": round(similarity, 4)}, vector
+
+    def add(self, service: str, options: Optional[Dict], model: str, vector: np.ndarray, cache_key: str):
+        """Index a newly cached result under its input's embedding"""
+        namespace = self.namespace(service, options, model)
+        self._index(namespace).add(vector, cache_key)
+        with self._lock:
+            self._added += 1
+            save = self._added % self.settings["save_every"] == 0
+        if save:
+            self.save()
+
+    def save(self):
+        """Persist every index"""
+        with self._lock:
+            indexes = dict(self._indexes)
+        for namespace, index in indexes.items():
+            try:
+                index.save(os.path.join(self.settings["path"], namespace))
+            except Exception as e:
+                logger.warning(f"Failed to save semantic index {namespace}: {str(e)}")
+
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Get the process-wide semantic cache built from config"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache()
+    return _semantic_cache
@@ -0,0 +1,93 @@
+"""Client-side sharding of the cache across Redis nodes"""
+
+import bisect
+import hashlib
+import itertools
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from redis import Redis
+
+
+def parse_node(node: str) -> Tuple[str, int]:
+    """Split "host:port" (port defaults to 6379)"""
+    host, _, port = node.strip().rpartition(":")
+    if not host:
+        return node.strip(), 6379
+    return host, int(port)
+
+
+class HashRing:
+    """
+    Consistent hashing of keys onto nodes.
+
+    Each node gets `virtual_nodes` points on the ring and a key goes to
+    the node owning the first point at or after the key's hash, so keys
+    spread evenly and adding or removing a node only moves about 1/n of
+    them.
+    """
+
+    def __init__(self, nodes: Iterable[str], virtual_nodes: int = 160):
+        self.nodes = list(nodes)
+        if not self.nodes:
+            raise ValueError("A hash ring needs at least one node")
+        points = sorted(
+            (self._hash(f"{node}#{i}"), node) for node in self.nodes for i in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+    def node_for(self, key: str) -> str:
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class ShardedRedis:
+    """
+    Redis nodes sharing the cache by consistent hashing, with optional read replicas.
+
+    Writes go to the key's node; reads go to one of that node's replicas
+    (round robin) when it has any. `group` splits keys by node so batch
+    operations take one round trip per shard.
+    """
+
+    def __init__(self, nodes: List[str], replicas: Optional[Dict[str, List[str]]] = None,
+                 password: Optional[str] = None, db: int = 0, virtual_nodes: int = 160, **connection):
+        def connect(node):
+            host, port = parse_node(node)
+            return Redis(host=host, port=port, db=db, password=password, decode_responses=True, **connection)
+
+        self.ring = HashRing(nodes, virtual_nodes)
+        self.primaries: Dict[str, Redis] = {node: connect(node) for node in nodes}
+        self.replicas: Dict[str, List[Redis]] = {
+            node: [connect(replica) for replica in (replicas or {}).get(node, [])] for node in nodes
+        }
+        self._turns = {node: itertools.count() for node in nodes}
+        self._lock = threading.Lock()
+
+    def primary(self, key: str) -> Redis:
+        return self.primaries[self.ring.node_for(key)]
+
+    def reader(self, key: str) -> Redis:
+        """A replica of the key's node, or the node itself without replicas"""
+        node = self.ring.node_for(key)
+        replicas = self.replicas[node]
+        if not replicas:
+            return self.primaries[node]
+        with self._lock:
+            turn = next(self._turns[node])
+        return replicas[turn % len(replicas)]
+
+    def group(self, keys: Iterable[str], read: bool = False) -> List[Tuple[Redis, List[str]]]:
+        """Keys grouped by the client that serves them"""
+        groups: Dict[str, List[str]] = {}
+        for key in keys:
+            groups.setdefault(self.ring.node_for(key), []).append(key)
+        return [(self.reader(keys[0]) if read else self.primaries[node], keys) for node, keys in groups.items()]
+
+    def ping(self) -> bool:
+        return all(client.ping() for client in self.primaries.values())
@@ -0,0 +1,131 @@
+"""Cross-process single-flight: one computation per cache key across all workers"""
+
+import logging
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.cache.backend import CacheBackend, get_cache_backend
+from src.config.config import config
+from src.utils.request_context import check_deadline, time_remaining
+
+logger = logging.getLogger(__name__)
+
+
+class LockRenewer:
+    """
+    Keep held locks alive from one background thread.
+
+    Locks are short-lived so a crashed holder's lock soon expires; while
+    the holder is alive and computing, its lock is extended every
+    `interval` seconds.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl_ms: int, interval: float):
+        self.backend = backend
+        self.ttl_ms = ttl_ms
+        self.interval = interval
+        self._held: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, key: str, token: str):
+        with self._lock:
+            self._held[key] = token
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="lock-renewer", daemon=True)
+                self._thread.start()
+
+    def remove(self, key: str):
+        with self._lock:
+            self._held.pop(key, None)
+
+    def _loop(self):
+        while not self._wake.wait(self.interval):
+            with self._lock:
+                held = list(self._held.items())
+            for key, token in held:
+                if not self.backend.extend_lock(key, token, self.ttl_ms):
+                    logger.warning(f"Lost single-flight lock {key}")
+
+
+class SingleFlight:
+    """
+    Make identical cache misses across processes wait for one computation.
+
+    The first process to miss takes a lock on the cache key (SET NX PX)
+    and computes; the others poll the cache with jittered exponential
+    backoff until the result appears. A lock whose holder died expires
+    after `lock_ttl_ms`, and the next poll takes it over; a holder that
+    failed releases it, so a waiter retries the work. Waiters give up
+    and compute themselves after `max_wait` seconds, and without Redis
+    everyone computes.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, settings: Optional[Dict[str, Any]] = None):
+        self.backend = backend or get_cache_backend()
+        self.settings = {**config.single_flight, **(settings or {})}
+        self.renewer = LockRenewer(self.backend, self.settings["lock_ttl_ms"], self.settings["renew_interval"])
+
+    def _compute_locked(self, lock_key: str, token: str, compute: Callable[[], Any]) -> Any:
+        self.renewer.add(lock_key, token)
+        try:
+            return compute()
+        finally:
+            self.renewer.remove(lock_key)
+            self.backend.release_lock(lock_key, token)
+
+    def run(self, cache_key: str, compute: Callable[[], Any], lookup: Callable[[], Optional[Any]]) -> Tuple[Any, str]:
+        """
+        Get a result computed once across processes
+
+        `compute` makes the result and stores it in the cache; `lookup`
+        returns the cached result or None. Returns the result and how it
+        was obtained: "computed" (under the lock), "coalesced" (computed
+        by another process) or "unlocked" (computed without the lock).
+        """
+        lock_key = f"lock:{cache_key}"
+        token = uuid.uuid4().hex
+        acquired = self.backend.acquire_lock(lock_key, token, self.settings["lock_ttl_ms"])
+        if acquired is None:
+            return compute(), "unlocked"
+        if acquired:
+            return self._compute_locked(lock_key, token, compute), "computed"
+
+        start = time.monotonic()
+        delay = self.settings["poll_initial"]
+        while True:
+            check_deadline("single-flight wait")
+            pause = random.uniform(delay / 2, delay)
+            remaining = time_remaining()
+            if remaining is not None:
+                pause = min(pause, max(remaining, 0))
+            time.sleep(pause)
+
+            cached = lookup()
+            if cached is not None:
+                return cached, "coalesced"
+            # Free lock and no result: the holder failed or died
+            acquired = self.backend.acquire_lock(lock_key, token, self.settings["lock_ttl_ms"])
+            if acquired:
+                return self._compute_locked(lock_key, token, compute), "computed"
+            if acquired is None or time.monotonic() - start > self.settings["max_wait"]:
+                return compute(), "unlocked"
+            delay = min(delay * 2, self.settings["poll_max"])
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide single-flight coordinator built from config"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
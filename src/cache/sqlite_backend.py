@@ -0,0 +1,243 @@
+"""Embedded cache backend on SQLite, for deployments without Redis"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.cache.backend import CacheBackend
+from src.utils.request_context import timed
+from src.utils.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at);
+CREATE TABLE IF NOT EXISTS locks (
+    key TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_key ON tags (key);
+"""
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache in a local SQLite database shared by all worker processes.
+
+    The database runs in WAL mode, so readers don't block the writer and
+    processes coordinate through SQLite's file locks. Entries expire like
+    Redis keys (expired rows are ignored, then deleted), and every
+    `evict_every` writes the least recently used entries are deleted
+    until the values fit in 90% of `max_bytes`. Each thread of each
+    process uses its own connection. Entry tags are rows of `tags`,
+    pruned with the entries they belong to.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, evict_every: int = 100,
+                 busy_timeout: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db().executescript(SCHEMA)
+        logger.info(f"Caching in SQLite at {path}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"backend": "sqlite", "state": "healthy", "path": self.path}
+
+    def _db(self) -> sqlite3.Connection:
+        # Connections can't be shared across threads, nor survive a fork
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from the cache"""
+        try:
+            now = time.time()
+            with timed("sqlite"), get_tracer().span("sqlite", operation="get") as span:
+                row = self._db().execute(
+                    "SELECT value, accessed_at FROM entries WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                span.set_attribute("found", row is not None)
+                if row is None:
+                    return None
+                if now - row[1] > 1.0:  # Recency for eviction, without a write on every read
+                    self._db().execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+        except Exception as e:
+            logger.error(f"Error retrieving from SQLite cache: {str(e)}")
+            return None
+
+    def set(self, key: str, value: Any, expire: int, tags: Optional[List[str]] = None) -> bool:
+        """Set value in the cache with expiration and tags"""
+        try:
+            payload = json.dumps(value)
+            now = time.time()
+            with timed("sqlite"), get_tracer().span("sqlite", operation="set", bytes=len(payload)):
+                self._db().execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now + expire, now)
+                )
+                if tags:
+                    self._db().executemany("INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)",
+                                           [(tag, key) for tag in tags])
+            with self._lock:
+                self._writes += 1
+                evict = self._writes % self.evict_every == 0
+            if evict:
+                self.evict()
+            return True
+        except Exception as e:
+            logger.error(f"Error setting SQLite cache key: {str(e)}")
+            return False
+
+    def delete(self, key: str) -> bool:
+        """Delete value from the cache"""
+        try:
+            with timed("sqlite"), get_tracer().span("sqlite", operation="delete"):
+                self._db().execute("DELETE FROM tags WHERE key = ?", (key,))
+                return self._db().execute("DELETE FROM entries WHERE key = ?", (key,)).rowcount > 0
+        except Exception as e:
+            logger.error(f"Error deleting SQLite cache key: {str(e)}")
+            return False
+
+    def evict(self) -> int:
+        """Delete expired entries, then least recently used ones beyond the size budget"""
+        db = self._db()
+        now = time.time()
+        removed = db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+        db.execute("DELETE FROM locks WHERE expires_at <= ?", (now,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            self._prune_tags(db)
+            return removed
+        excess = total - int(self.max_bytes * 0.9)
+        victims = []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        db.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._prune_tags(db)
+        return removed + len(victims)
+
+    @staticmethod
+    def _prune_tags(db: sqlite3.Connection):
+        """Drop the tags of entries that are gone"""
+        db.execute("DELETE FROM tags WHERE NOT EXISTS (SELECT 1 FROM entries WHERE entries.key = tags.key)")
+
+    def acquire_lock(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        """Take a lock unless another holder's is still live; None on database errors"""
+        try:
+            db = self._db()
+            now = time.time()
+            with timed("sqlite"), get_tracer().span("sqlite", operation="lock") as span:
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    held = db.execute("SELECT 1 FROM locks WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+                    if held is None:
+                        db.execute("INSERT OR REPLACE INTO locks (key, token, expires_at) VALUES (?, ?, ?)",
+                                   (key, token, now + ttl_ms / 1000))
+                    db.execute("COMMIT")
+                except Exception:
+                    db.execute("ROLLBACK")
+                    raise
+                span.set_attribute("acquired", held is None)
+            return held is None
+        except Exception as e:
+            logger.error(f"Error acquiring SQLite cache lock: {str(e)}")
+            return None
+
+    def release_lock(self, key: str, token: str) -> bool:
+        """Release a lock if it is still ours"""
+        try:
+            with timed("sqlite"), get_tracer().span("sqlite", operation="unlock"):
+                return self._db().execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token)).rowcount > 0
+        except Exception as e:
+            logger.error(f"Error releasing SQLite cache lock: {str(e)}")
+            return False
+
+    def extend_lock(self, key: str, token: str, ttl_ms: int) -> bool:
+        """Push back a lock's expiry if it is still ours"""
+        try:
+            now = time.time()
+            return self._db().execute(
+                "UPDATE locks SET expires_at = ? WHERE key = ? AND token = ? AND expires_at > ?",
+                (now + ttl_ms / 1000, key, token, now)
+            ).rowcount > 0
+        except Exception as e:
+            logger.error(f"Error extending SQLite cache lock: {str(e)}")
+            return False
+
+    def flush(self) -> bool:
+        """Clear all entries and locks"""
+        try:
+            db = self._db()
+            db.execute("DELETE FROM entries")
+            db.execute("DELETE FROM locks")
+            db.execute("DELETE FROM tags")
+            return True
+        except Exception as e:
+            logger.error(f"Error flushing SQLite cache: {str(e)}")
+            return False
+
+    def invalidate(self, tags: List[str], batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        """Delete the entries carrying all of the tags, one short transaction per batch"""
+        tags = list(dict.fromkeys(tags))
+        matching = (
+            f"SELECT key FROM tags WHERE tag IN ({', '.join('?' * len(tags))}) "
+            "GROUP BY key HAVING COUNT(*) = ?"
+        )
+        db = self._db()
+        counts = {"matched": 0, "deleted": 0, "batches": 0}
+        with timed("sqlite"), get_tracer().span("sqlite", operation="invalidate", tags=len(tags)) as span:
+            if dry_run:
+                counts["matched"] = db.execute(f"SELECT COUNT(*) FROM ({matching})", (*tags, len(tags))).fetchone()[0]
+                return counts
+            while True:
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    keys = [(row[0],) for row in db.execute(f"{matching} LIMIT ?", (*tags, len(tags), batch_size))]
+                    deleted = db.executemany("DELETE FROM entries WHERE key = ?", keys).rowcount
+                    db.executemany("DELETE FROM tags WHERE key = ?", keys)
+                    db.execute("COMMIT")
+                except Exception:
+                    db.execute("ROLLBACK")
+                    raise
+                if not keys:
+                    break
+                counts["matched"] += len(keys)
+                counts["deleted"] += deleted
+                counts["batches"] += 1
+            span.set_attribute("deleted", counts["deleted"])
+        return counts
@@ -0,0 +1,101 @@
+"""
+Command line tools for the NLP service
+
+    python -m src.cli batch reviews.parquet --task sentiment --output out/ --concurrency 8
+    python -m src.cli traces traces/spans.jsonl
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from src.config.config import config
+
+
+def _progress(report):
+    print(
+        f"rows={report['rows']} processed={report['processed']} duplicates={report['duplicates']} "
+        f"errors={report['errors']} cache_hit_ratio={report['cache_hit_ratio']:.2%} "
+        f"rows/s={report['rows_per_second']}",
+        file=sys.stderr
+    )
+
+
+def run_batch(args) -> int:
+    from src.api.router import LazyModelLoader, TASK_HANDLERS
+    from src.batch.io import PartWriter, detect_format, read_rows
+    from src.batch.runner import BatchRunner
+
+    options = json.loads(args.options) if args.options else None
+    model = config.resolve_model(args.model) if args.model else config.get_current_model()
+    if model is None:
+        print(f"Unknown model '{args.model}'", file=sys.stderr)
+        return 2
+
+    # Offline runs have the model to themselves, so --concurrency decides
+    # how many calls are in flight rather than the API's scheduler limits
+    config.scheduler["max_concurrency"] = args.concurrency
+    for settings in config.scheduler["classes"].values():
+        settings["max_concurrency"] = args.concurrency
+
+    models = LazyModelLoader()
+    runner = BatchRunner(
+        lambda text, options: TASK_HANDLERS[args.task](models, text, options, model),
+        args.task,
+        options,
+        PartWriter(args.output, args.output_format),
+        concurrency=args.concurrency,
+        chunk_size=args.chunk_size,
+        model=model
+    )
+    rows = read_rows(
+        args.input,
+        args.input_format or detect_format(args.input),
+        text_column=args.text_column,
+        id_column=args.id_column
+    )
+    report = runner.run(rows, source=args.input, progress=None if args.quiet else _progress)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def summarize_traces(args) -> int:
+    from src.utils.tracing import summarize_spans
+
+    with open(args.input) as file:
+        summary = summarize_spans(json.loads(line) for line in file if line.strip())
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="NLP service command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Run a task over a CSV, JSONL or Parquet file without the API")
+    batch.add_argument("input", help="Input file")
+    batch.add_argument("--task", required=True, choices=["sentiment", "ner", "classify", "summarize"])
+    batch.add_argument("--output", required=True, help="Output directory for part files, checkpoint and report")
+    batch.add_argument("--input-format", choices=["csv", "jsonl", "parquet"], help="Default: from the file extension")
+    batch.add_argument("--output-format", choices=["parquet", "arrow"], default="parquet")
+    batch.add_argument("--text-column", default="text")
+    batch.add_argument("--id-column", help="Column copied to the output to join results back")
+    batch.add_argument("--options", help="Task options as JSON, e.g. '{\"multi_label\": true}'")
+    batch.add_argument("--model", help="Model name or Ollama tag (default: the current model)")
+    batch.add_argument("--concurrency", type=int, default=4)
+    batch.add_argument("--chunk-size", type=int, default=1000, help="Rows per part file and checkpoint")
+    batch.add_argument("--quiet", action="store_true", help="No progress lines on stderr")
+    batch.set_defaults(func=run_batch)
+
+    traces = commands.add_parser("traces", help="Summarize spans written by the JSONL trace exporter")
+    traces.add_argument("input", help="Span file, e.g. traces/spans.jsonl")
+    traces.set_defaults(func=summarize_traces)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
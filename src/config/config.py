@@ -6,12 +6,27 @@
 """Configuration management for NLP service"""
 
 import os 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from src.config.default import (
     MODEL_PATHS,
     OLLAMA_HOST,
+    OLLAMA_POOL,
+    WARMUP_CONFIG,
+    CIRCUIT_BREAKER,
+    RETRY_CONFIG,
+    SCHEDULER,
+    PRIORITY_API_KEYS,
+    JOBS_CONFIG,
+    STREAM_CONFIG,
+    SENTIMENT_CONFIG,
+    SUMMARIZE_CONFIG,
+    TRACING_CONFIG,
     CACHE_TIMEOUT,
+    PROMPT_VERSIONS,
+    SINGLE_FLIGHT,
+    SEMANTIC_CACHE,
     API_CONFIG,
+    CACHE_BACKEND,
     REDIS_CONFIG, 
     AVAILABLE_MODELS
 )
@@ -32,22 +47,42 @@ class Config:
             
         self.model_paths = self._load_model_paths()
         self.current_model = AVAILABLE_MODELS["llama"]  # Set default model
-        self.ollama_host = self._get_env("OLLAMA_HOST", OLLAMA_HOST)
+        self.ollama_hosts = self._load_ollama_hosts()
+        self.ollama_host = self.ollama_hosts[0]
+        self.ollama_pool = self._load_ollama_pool_config()
+        self.warmup = self._load_warmup_config()
+        self.circuit_breaker = self._load_circuit_breaker_config()
+        self.retry = self._load_retry_config()
+        self.scheduler = self._load_scheduler_config()
         self.cache_timeouts = self._load_cache_timeouts()
+        self.prompt_versions = {**PROMPT_VERSIONS, **self._parse_mapping(self._get_env("PROMPT_VERSIONS", None), PROMPT_VERSIONS)}
+        self.single_flight = self._load_single_flight_config()
+        self.semantic_cache = self._load_semantic_cache_config()
+        self.cache_backend = self._load_cache_backend_config()
         self.redis = self._load_redis_config()
         self.api = self._load_api_config()
+        self.jobs = self._load_jobs_config()
+        self.stream = self._load_stream_config()
+        self.sentiment = self._load_sentiment_config()
+        self.summarize = self._load_summarize_config()
+        self.tracing = self._load_tracing_config()
         self._initialized = True
 
     def set_current_model(self, model_name: str):
-        """Set current model for all services"""
+        """Set the default model for requests that don't name one"""
         if model_name in AVAILABLE_MODELS:
             print(f"Setting model to: {AVAILABLE_MODELS[model_name]}")  # Debug
             self.current_model = AVAILABLE_MODELS[model_name]
-            # Update all service models
-            for service in self.model_paths:
-                self.model_paths[service] = self.current_model
             return True
         return False
+
+    def resolve_model(self, model_name: str) -> Optional[str]:
+        """Get the Ollama tag for a model name ("gemma") or tag ("gemma2:2b")"""
+        if model_name in AVAILABLE_MODELS:
+            return AVAILABLE_MODELS[model_name]
+        if model_name in AVAILABLE_MODELS.values():
+            return model_name
+        return None
     
     def get_current_model(self) -> str:
         """Get currently selected model"""
@@ -67,6 +102,69 @@ class Config:
             "classify": self._get_env("CLASSIFY_MODEL_PATH", MODEL_PATHS["classify"])
         }
     
+    def _load_ollama_hosts(self) -> List[str]:
+        """Load the comma-separated list of Ollama hosts"""
+        hosts = self._get_env("OLLAMA_HOST", OLLAMA_HOST)
+        return [host.strip().rstrip("/") for host in hosts.split(",") if host.strip()]
+
+    def _load_ollama_pool_config(self) -> Dict[str, Any]:
+        """Load Ollama host pool settings"""
+        return {
+            "routing": self._get_env("OLLAMA_ROUTING", OLLAMA_POOL["routing"]),
+            "health_interval": float(self._get_env("OLLAMA_HEALTH_INTERVAL", OLLAMA_POOL["health_interval"])),
+            "probe_timeout": float(self._get_env("OLLAMA_PROBE_TIMEOUT", OLLAMA_POOL["probe_timeout"])),
+            "connect_timeout": float(self._get_env("OLLAMA_CONNECT_TIMEOUT", OLLAMA_POOL["connect_timeout"])),
+            "unhealthy_threshold": int(self._get_env("OLLAMA_UNHEALTHY_THRESHOLD", OLLAMA_POOL["unhealthy_threshold"])),
+            "hash_replicas": int(self._get_env("OLLAMA_HASH_REPLICAS", OLLAMA_POOL["hash_replicas"])),
+            "hash_load_factor": float(self._get_env("OLLAMA_HASH_LOAD_FACTOR", OLLAMA_POOL["hash_load_factor"])),
+            "keep_alive": self._get_env("OLLAMA_KEEP_ALIVE", OLLAMA_POOL["keep_alive"])
+        }
+
+    def _load_warmup_config(self) -> Dict[str, Any]:
+        """Load startup warm-up settings"""
+        return {
+            "enabled": str(self._get_env("WARMUP_ENABLED", WARMUP_CONFIG["enabled"])).lower() == "true",
+            "prompt": self._get_env("WARMUP_PROMPT", WARMUP_CONFIG["prompt"]),
+            "timeout": float(self._get_env("WARMUP_TIMEOUT", WARMUP_CONFIG["timeout"]))
+        }
+    
+    def _load_circuit_breaker_config(self) -> Dict[str, Any]:
+        """Load circuit breaker settings"""
+        return {
+            "failure_threshold": int(self._get_env("BREAKER_FAILURE_THRESHOLD", CIRCUIT_BREAKER["failure_threshold"])),
+            "reset_timeout": float(self._get_env("BREAKER_RESET_TIMEOUT", CIRCUIT_BREAKER["reset_timeout"])),
+            "half_open_max_calls": int(self._get_env("BREAKER_HALF_OPEN_MAX_CALLS", CIRCUIT_BREAKER["half_open_max_calls"]))
+        }
+
+    def _load_retry_config(self) -> Dict[str, Any]:
+        """Load model call retry settings"""
+        return {
+            "max_retries": int(self._get_env("RETRY_MAX_RETRIES", RETRY_CONFIG["max_retries"])),
+            "backoff_base": float(self._get_env("RETRY_BACKOFF_BASE", RETRY_CONFIG["backoff_base"])),
+            "backoff_cap": float(self._get_env("RETRY_BACKOFF_CAP", RETRY_CONFIG["backoff_cap"])),
+            "budget_ratio": float(self._get_env("RETRY_BUDGET_RATIO", RETRY_CONFIG["budget_ratio"])),
+            "budget_min_per_second": float(self._get_env("RETRY_BUDGET_MIN_PER_SECOND", RETRY_CONFIG["budget_min_per_second"]))
+        }
+    
+    def _load_scheduler_config(self) -> Dict[str, Any]:
+        """Load priority scheduler settings"""
+        weights = self._parse_limits(self._get_env("SCHEDULER_WEIGHTS", None), {
+            name: settings["weight"] for name, settings in SCHEDULER["classes"].items()
+        })
+        limits = self._parse_limits(self._get_env("SCHEDULER_CLASS_LIMITS", None), {
+            name: settings["max_concurrency"] for name, settings in SCHEDULER["classes"].items()
+        })
+        max_concurrency = int(self._get_env("SCHEDULER_MAX_CONCURRENCY", SCHEDULER["max_concurrency"]))
+        return {
+            "max_concurrency": max_concurrency,
+            "default_class": self._get_env("SCHEDULER_DEFAULT_CLASS", SCHEDULER["default_class"]),
+            "classes": {
+                name: {"weight": weight, "max_concurrency": limits.get(name, max_concurrency)}
+                for name, weight in weights.items()
+            },
+            "api_keys": self._parse_mapping(self._get_env("PRIORITY_API_KEYS", None), PRIORITY_API_KEYS)
+        }
+
     def _load_cache_timeouts(self) -> Dict[str, int]:
         """Load cache timeouts settings"""
         return {
@@ -77,13 +175,71 @@ class Config:
             "classify": int(self._get_env("CACHE_CLASSIFY_TIMEOUT", CACHE_TIMEOUT["classify"]))
         }
     
+    def _load_single_flight_config(self) -> Dict[str, Any]:
+        """Load cross-process single-flight settings"""
+        return {
+            "enabled": str(self._get_env("CACHE_SINGLE_FLIGHT", SINGLE_FLIGHT["enabled"])).lower() == "true",
+            "lock_ttl_ms": int(self._get_env("CACHE_LOCK_TTL_MS", SINGLE_FLIGHT["lock_ttl_ms"])),
+            "renew_interval": float(self._get_env("CACHE_LOCK_RENEW_INTERVAL", SINGLE_FLIGHT["renew_interval"])),
+            "poll_initial": float(self._get_env("CACHE_LOCK_POLL_INITIAL", SINGLE_FLIGHT["poll_initial"])),
+            "poll_max": float(self._get_env("CACHE_LOCK_POLL_MAX", SINGLE_FLIGHT["poll_max"])),
+            "max_wait": float(self._get_env("CACHE_LOCK_MAX_WAIT", SINGLE_FLIGHT["max_wait"]))
+        }
+
+    def _load_semantic_cache_config(self) -> Dict[str, Any]:
+        """Load semantic cache settings"""
+        return {
+            "enabled": str(self._get_env("SEMANTIC_CACHE_ENABLED", SEMANTIC_CACHE["enabled"])).lower() == "true",
+            "embedding_model": self._get_env("SEMANTIC_CACHE_MODEL", SEMANTIC_CACHE["embedding_model"]),
+            "thresholds": {
+                name: float(threshold) for name, threshold in self._parse_mapping(
+                    self._get_env("SEMANTIC_CACHE_THRESHOLDS", None), SEMANTIC_CACHE["thresholds"]
+                ).items()
+            },
+            "ann_threshold": int(self._get_env("SEMANTIC_CACHE_ANN_THRESHOLD", SEMANTIC_CACHE["ann_threshold"])),
+            "nprobe": int(self._get_env("SEMANTIC_CACHE_NPROBE", SEMANTIC_CACHE["nprobe"])),
+            "max_entries": int(self._get_env("SEMANTIC_CACHE_MAX_ENTRIES", SEMANTIC_CACHE["max_entries"])),
+            "path": self._get_env("SEMANTIC_CACHE_PATH", SEMANTIC_CACHE["path"]),
+            "save_every": int(self._get_env("SEMANTIC_CACHE_SAVE_EVERY", SEMANTIC_CACHE["save_every"]))
+        }
+
+    def _load_cache_backend_config(self) -> Dict[str, Any]:
+        """Load cache storage backend settings"""
+        return {
+            "backend": self._get_env("CACHE_BACKEND", CACHE_BACKEND["backend"]),
+            "fallback": self._get_env("CACHE_FALLBACK", CACHE_BACKEND["fallback"]),
+            "sqlite_path": self._get_env("CACHE_SQLITE_PATH", CACHE_BACKEND["sqlite_path"]),
+            "max_bytes": int(self._get_env("CACHE_MAX_BYTES", CACHE_BACKEND["max_bytes"])),
+            "evict_every": int(self._get_env("CACHE_EVICT_EVERY", CACHE_BACKEND["evict_every"])),
+            "invalidate_batch": int(self._get_env("CACHE_INVALIDATE_BATCH", CACHE_BACKEND["invalidate_batch"]))
+        }
+
     def _load_redis_config(self) -> Dict[str, Any]:
         """Load redis configuration"""
         return {
             "host": self._get_env("REDIS_HOST", REDIS_CONFIG["host"]),
             "port": int(self._get_env("REDIS_PORT", REDIS_CONFIG["port"])),
             "db": int(self._get_env("REDIS_DB", REDIS_CONFIG["db"])),
-            "password": self._get_env("REDIS_PASSWORD", REDIS_CONFIG["password"])
+            "password": self._get_env("REDIS_PASSWORD", REDIS_CONFIG["password"]),
+            "cluster": str(self._get_env("REDIS_CLUSTER", REDIS_CONFIG["cluster"])).lower() == "true",
+            "nodes": [
+                node.strip() for node in self._get_env("REDIS_NODES", ",".join(REDIS_CONFIG["nodes"])).split(",")
+                if node.strip()
+            ],
+            "replicas": {
+                node: [replica for replica in replicas.split("|") if replica]
+                for node, replicas in self._parse_mapping(
+                    self._get_env("REDIS_REPLICAS", None), REDIS_CONFIG["replicas"]
+                ).items()
+            },
+            "virtual_nodes": int(self._get_env("REDIS_VIRTUAL_NODES", REDIS_CONFIG["virtual_nodes"])),
+            "connect_timeout": float(self._get_env("REDIS_CONNECT_TIMEOUT", REDIS_CONFIG["connect_timeout"])),
+            "socket_timeout": (
+                float(self._get_env("REDIS_SOCKET_TIMEOUT", REDIS_CONFIG["socket_timeout"]))
+                if self._get_env("REDIS_SOCKET_TIMEOUT", REDIS_CONFIG["socket_timeout"]) else None
+            ),
+            "reconnect_initial": float(self._get_env("REDIS_RECONNECT_INITIAL", REDIS_CONFIG["reconnect_initial"])),
+            "reconnect_max": float(self._get_env("REDIS_RECONNECT_MAX", REDIS_CONFIG["reconnect_max"]))
         }
     
     def _load_api_config(self) -> Dict[str, Any]:
@@ -91,8 +247,96 @@ class Config:
         return {
             "max_request_size": int(self._get_env("API_MAX_REQUEST_SIZE", API_CONFIG["max_request_size"])),
             "request_timeout": int(self._get_env("API_REQUEST_TIMEOUT", API_CONFIG["request_timeout"])),
-            "rate_limit": int(self._get_env("API_RATE_LIMIT", API_CONFIG["rate_limit"])) 
+            "max_request_timeout": int(self._get_env("API_MAX_REQUEST_TIMEOUT", API_CONFIG["max_request_timeout"])),
+            "rate_limit": int(self._get_env("API_RATE_LIMIT", API_CONFIG["rate_limit"])),
+            "rate_limit_enabled": str(self._get_env("API_RATE_LIMIT_ENABLED", API_CONFIG["rate_limit_enabled"])).lower() == "true",
+            "endpoint_rate_limits": self._parse_limits(
+                self._get_env("API_ENDPOINT_RATE_LIMITS", None), API_CONFIG["endpoint_rate_limits"]
+            ),
+            "server_timing": str(self._get_env("API_SERVER_TIMING", API_CONFIG["server_timing"])).lower() == "true",
+            "compression": str(self._get_env("API_COMPRESSION", API_CONFIG["compression"])).lower() == "true",
+            "compression_min_size": int(self._get_env("API_COMPRESSION_MIN_SIZE", API_CONFIG["compression_min_size"])),
+            "gzip_level": int(self._get_env("API_GZIP_LEVEL", API_CONFIG["gzip_level"])),
+            "brotli_quality": int(self._get_env("API_BROTLI_QUALITY", API_CONFIG["brotli_quality"])),
+            "admin_key": self._get_env("API_ADMIN_KEY", API_CONFIG["admin_key"])
+        }
+
+    def _load_jobs_config(self) -> Dict[str, Any]:
+        """Load asynchronous job settings"""
+        return {
+            "stream": self._get_env("JOBS_STREAM", JOBS_CONFIG["stream"]),
+            "group": self._get_env("JOBS_GROUP", JOBS_CONFIG["group"]),
+            "max_items": int(self._get_env("JOBS_MAX_ITEMS", JOBS_CONFIG["max_items"])),
+            "max_request_size": int(self._get_env("JOBS_MAX_REQUEST_SIZE", JOBS_CONFIG["max_request_size"])),
+            "priority": self._get_env("JOBS_PRIORITY", JOBS_CONFIG["priority"]),
+            "max_attempts": int(self._get_env("JOBS_MAX_ATTEMPTS", JOBS_CONFIG["max_attempts"])),
+            "item_timeout": float(self._get_env("JOBS_ITEM_TIMEOUT", JOBS_CONFIG["item_timeout"])),
+            "claim_idle": float(self._get_env("JOBS_CLAIM_IDLE", JOBS_CONFIG["claim_idle"])),
+            "batch_size": int(self._get_env("JOBS_BATCH_SIZE", JOBS_CONFIG["batch_size"])),
+            "block_ms": int(self._get_env("JOBS_BLOCK_MS", JOBS_CONFIG["block_ms"])),
+            "result_ttl": int(self._get_env("JOBS_RESULT_TTL", JOBS_CONFIG["result_ttl"])),
+            "page_size": int(self._get_env("JOBS_PAGE_SIZE", JOBS_CONFIG["page_size"]))
+        }
+
+    def _load_stream_config(self) -> Dict[str, Any]:
+        """Load NDJSON streaming settings"""
+        return {
+            "concurrency": int(self._get_env("STREAM_CONCURRENCY", STREAM_CONFIG["concurrency"])),
+            "max_line_size": int(self._get_env("STREAM_MAX_LINE_SIZE", STREAM_CONFIG["max_line_size"])),
+            "line_timeout": float(self._get_env("STREAM_LINE_TIMEOUT", STREAM_CONFIG["line_timeout"])),
+            "gzip_level": int(self._get_env("STREAM_GZIP_LEVEL", STREAM_CONFIG["gzip_level"]))
         }
+
+    def _load_sentiment_config(self) -> Dict[str, Any]:
+        """Load long-text sentiment settings"""
+        return {
+            "max_length": int(self._get_env("SENTIMENT_MAX_LENGTH", SENTIMENT_CONFIG["max_length"])),
+            "sentence_threshold": int(self._get_env("SENTIMENT_SENTENCE_THRESHOLD", SENTIMENT_CONFIG["sentence_threshold"])),
+            "max_sentences": int(self._get_env("SENTIMENT_MAX_SENTENCES", SENTIMENT_CONFIG["max_sentences"])),
+            "concurrency": int(self._get_env("SENTIMENT_CONCURRENCY", SENTIMENT_CONFIG["concurrency"])),
+            "neutral_band": float(self._get_env("SENTIMENT_NEUTRAL_BAND", SENTIMENT_CONFIG["neutral_band"]))
+        }
+
+    def _load_summarize_config(self) -> Dict[str, Any]:
+        """Load incremental summarization settings"""
+        return {
+            "min_chunk": int(self._get_env("SUMMARIZE_MIN_CHUNK", SUMMARIZE_CONFIG["min_chunk"])),
+            "avg_chunk": int(self._get_env("SUMMARIZE_AVG_CHUNK", SUMMARIZE_CONFIG["avg_chunk"])),
+            "max_chunk": int(self._get_env("SUMMARIZE_MAX_CHUNK", SUMMARIZE_CONFIG["max_chunk"])),
+            "chunk_summary_words": int(self._get_env("SUMMARIZE_CHUNK_SUMMARY_WORDS", SUMMARIZE_CONFIG["chunk_summary_words"])),
+            "concurrency": int(self._get_env("SUMMARIZE_CONCURRENCY", SUMMARIZE_CONFIG["concurrency"]))
+        }
+
+    def _load_tracing_config(self) -> Dict[str, Any]:
+        """Load trace span export settings"""
+        return {
+            "enabled": str(self._get_env("TRACING_ENABLED", TRACING_CONFIG["enabled"])).lower() == "true",
+            "exporter": self._get_env("TRACING_EXPORTER", TRACING_CONFIG["exporter"]),
+            "path": self._get_env("TRACING_PATH", TRACING_CONFIG["path"]),
+            "sample_rate": float(self._get_env("TRACING_SAMPLE_RATE", TRACING_CONFIG["sample_rate"]))
+        }
+
+    def _parse_limits(self, value: str, default: Dict[str, int]) -> Dict[str, int]:
+        """Parse 'name=limit,name=limit' overrides from env"""
+        if not value:
+            return dict(default)
+        limits = {}
+        for item in value.split(","):
+            name, _, limit = item.partition("=")
+            if name.strip() and limit.strip():
+                limits[name.strip()] = int(limit)
+        return limits
+
+    def _parse_mapping(self, value: str, default: Dict[str, str]) -> Dict[str, str]:
+        """Parse 'name=value,name=value' overrides from env"""
+        if not value:
+            return dict(default)
+        mapping = {}
+        for item in value.split(","):
+            name, _, target = item.partition("=")
+            if name.strip() and target.strip():
+                mapping[name.strip()] = target.strip()
+        return mapping
     
 # Create a singleton instance
 config = Config()
\ No newline at end of file
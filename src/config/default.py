@@ -18,7 +18,108 @@ MODEL_PATHS = {
     "classify": AVAILABLE_MODELS["llama"],
 }
 
-OLLAMA_HOST = "http://localhost:11434"
+OLLAMA_HOST = "http://localhost:11434"  # Comma-separated list for a multi-host pool
+
+# Ollama host pool settings
+OLLAMA_POOL = {
+    "routing": "least_outstanding",     # or "consistent_hash" to keep each host's prompt cache warm
+    "health_interval": 10,              # seconds between health/model probes
+    "probe_timeout": 2,                 # seconds
+    "connect_timeout": 5,               # seconds
+    "unhealthy_threshold": 2,           # consecutive failures before a host is ejected
+    "hash_replicas": 100,               # virtual nodes per host on the hash ring
+    "hash_load_factor": 1.25,           # max load vs. average before skipping the hashed host
+    "keep_alive": "30m"                 # how long Ollama keeps a model loaded after a call
+}
+
+# Startup warm-up (opt-in): build analyzers, connect to Redis and load every
+# configured model on every host so the first request isn't a cold start
+WARMUP_CONFIG = {
+    "enabled": False,
+    "prompt": "Hi",
+    "timeout": 120              # seconds per model load
+}
+
+# Circuit breaker per (Ollama host, model)
+CIRCUIT_BREAKER = {
+    "failure_threshold": 5,     # consecutive failures before opening
+    "reset_timeout": 30,        # seconds before a half-open trial call
+    "half_open_max_calls": 1
+}
+
+# Retries of failed model calls
+RETRY_CONFIG = {
+    "max_retries": 2,
+    "backoff_base": 0.2,        # seconds, doubled per attempt with full jitter
+    "backoff_cap": 2.0,         # seconds
+    "budget_ratio": 0.1,        # retries allowed as a fraction of requests
+    "budget_min_per_second": 1  # retries always allowed at this rate
+}
+
+# Priority scheduling of model calls
+SCHEDULER = {
+    "max_concurrency": 4,           # model calls in flight per API process
+    "default_class": "standard",
+    "classes": {                    # weight = share of slots under contention
+        "interactive": {"weight": 6, "max_concurrency": 4},
+        "standard": {"weight": 3, "max_concurrency": 3},
+        "bulk": {"weight": 1, "max_concurrency": 2}
+    }
+}
+
+# Priority class per API key, e.g. {"nightly-batch-key": "bulk"}
+PRIORITY_API_KEYS = {}
+
+# Asynchronous jobs (Redis Streams + worker processes)
+JOBS_CONFIG = {
+    "stream": "jobs:items",
+    "group": "nlp-workers",
+    "max_items": 10_000,        # items per job
+    "max_request_size": 10_000_000,  # bytes, replaces API max_request_size for POST /jobs
+    "priority": "bulk",         # scheduler class of model calls made by workers
+    "max_attempts": 3,          # tries per item before it is recorded as failed
+    "item_timeout": 120,        # seconds per item, same role as request_timeout
+    "claim_idle": 300,          # seconds before a crashed worker's items are reclaimed
+    "batch_size": 10,           # stream entries read per call
+    "block_ms": 5000,           # how long an idle worker blocks on the stream
+    "result_ttl": 86400,        # seconds job status and results are kept
+    "page_size": 100            # default results per GET /jobs/{id} page
+}
+
+# NDJSON streaming bulk endpoint
+STREAM_CONFIG = {
+    "concurrency": 8,           # lines processed at once per stream
+    "max_line_size": 100_000,   # bytes per input line
+    "line_timeout": 30,         # seconds per line
+    "gzip_level": 6
+}
+
+# Sentiment of long texts: scored sentence by sentence, then aggregated
+SENTIMENT_CONFIG = {
+    "max_length": 20_000,       # characters per request
+    "sentence_threshold": 500,  # longer texts are scored per sentence
+    "max_sentences": 200,       # adjacent sentences are merged beyond this
+    "concurrency": 8,           # sentences scored at once per text
+    "neutral_band": 0.25        # aggregate scores within +/- this are NEUTRAL
+}
+
+# Incremental summarization (options.mode = "incremental"): documents are
+# split into content-defined chunks, each summarized and cached on its own
+SUMMARIZE_CONFIG = {
+    "min_chunk": 500,           # characters
+    "avg_chunk": 1500,
+    "max_chunk": 4000,
+    "chunk_summary_words": 60,  # words per chunk summary fed to the reduce step
+    "concurrency": 4            # chunks summarized at once per document
+}
+
+# Trace spans for offline analysis
+TRACING_CONFIG = {
+    "enabled": False,
+    "exporter": "jsonl",            # or "package.module:ClassName" of a SpanExporter
+    "path": "traces/spans.jsonl",   # jsonl exporter output
+    "sample_rate": 1.0              # fraction of traces kept
+}
 
 # Cache Settings
 CACHE_TIMEOUT = {
@@ -29,17 +130,89 @@ CACHE_TIMEOUT = {
     "classify": 7200,
 }
 
+# Prompt version per service, recorded as a tag on every cache entry. Bump
+# one after changing its prompt, then invalidate the old version's tag
+PROMPT_VERSIONS = {
+    "sentiment": "1",
+    "ner": "1",
+    "summarize": "1",
+    "classify": "1"
+}
+
+# Cross-process single-flight of cache misses (opt-in): one worker computes,
+# the others wait for its result in the cache
+SINGLE_FLIGHT = {
+    "enabled": False,
+    "lock_ttl_ms": 10_000,      # lock expiry if its holder dies
+    "renew_interval": 3,        # seconds between lock extensions while computing
+    "poll_initial": 0.05,       # seconds, doubled per poll with jitter
+    "poll_max": 1.0,            # seconds
+    "max_wait": 120             # seconds before a waiter computes itself
+}
+
+# Semantic cache (opt-in): reuse results of near-duplicate inputs, found by
+# embedding similarity, for the listed services
+SEMANTIC_CACHE = {
+    "enabled": False,
+    "embedding_model": "nomic-embed-text",
+    "thresholds": {             # cosine similarity needed per service
+        "sentiment": 0.95,
+        "classify": 0.93
+    },
+    "ann_threshold": 20_000,    # vectors per index before switching from exact search to IVF
+    "nprobe": 8,                # IVF lists searched per lookup
+    "max_entries": 200_000,     # per index; the oldest are dropped beyond this
+    "path": "cache/semantic",   # memory-mapped index files
+    "save_every": 500           # additions between saves
+}
+
+# Cache Backend Settings
+# Cache storage: "redis", "sqlite" or "package.module:ClassName" of a
+# CacheBackend. With fallback "sqlite", an unreachable Redis is replaced by
+# the SQLite backend ("none" runs uncached instead)
+CACHE_BACKEND = {
+    "backend": "redis",
+    "fallback": "sqlite",
+    "sqlite_path": "cache/cache.db",
+    "max_bytes": 256 * 1024 * 1024,  # SQLite values, evicted least recently used first
+    "evict_every": 100,              # writes between eviction passes
+    "invalidate_batch": 500          # keys deleted per round trip by tag invalidation
+}
+
 # Redis Settings
 REDIS_CONFIG = {
     "host": "localhost",
     "port": 6379,
     "db": 0,
-    "password": "Say1234@"
+    "password": "Say1234@",
+    # Scaling the cache past one Redis: either a Redis Cluster reached
+    # through host/port, or client-side consistent hashing across "nodes"
+    # ("host:port" strings). Jobs and rate limits stay on the first node.
+    "cluster": False,
+    "nodes": [],
+    "replicas": {},       # node -> "host:port|host:port" replicas serving cache reads
+    "virtual_nodes": 160,     # hash ring points per node
+    "connect_timeout": 0.5,   # seconds
+    "socket_timeout": 1.0,    # per command, so a hung Redis is marked down (job reads block on their own connection)
+    "reconnect_initial": 0.5, # backoff between reconnect attempts while Redis is down
+    "reconnect_max": 30.0
 }
 
 # API Settings
 API_CONFIG = {
     "max_request_size": 1_00_000,   # 1 MB
     "request_timeout": 30,          # 30 seconds
-    "rate_limit": 50               # requests per minute
+    "max_request_timeout": 300,     # upper bound for X-Request-Timeout
+    "rate_limit": 50,              # requests per minute
+    "rate_limit_enabled": True,
+    "endpoint_rate_limits": {      # requests per minute per client, on top of rate_limit
+        "summarize": 10,
+        "analyze": 20
+    },
+    "server_timing": True,         # per-stage Server-Timing header (and metadata on X-Include-Timings)
+    "compression": True,           # brotli/gzip responses for clients that accept them
+    "compression_min_size": 1024,  # bytes; smaller bodies aren't worth compressing
+    "gzip_level": 6,
+    "brotli_quality": 4,           # 0-11; higher is smaller but slower
+    "admin_key": None              # X-Admin-Key required by /admin endpoints (disabled while unset)
 }
@@ -25,3 +25,23 @@ class JSONParsingError(NLPServiceException):
     def __init__(self, message: str = "Failed to parse JSON"):
         super().__init__(message, "JSON_PARSE_ERROR")
 
+
+
+class CircuitOpenError(ModelConnectionError):
+    """Raised when every host's circuit for a model is open"""
+    def __init__(self, message: str = "Model service is temporarily unavailable", retry_after: float = 1.0):
+        super().__init__(message)
+        self.error_code = "CIRCUIT_OPEN"
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(NLPServiceException):
+    """Raised when a request's deadline passes before its work is done"""
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(message, "DEADLINE_EXCEEDED")
+
+
+class JobNotFoundError(NLPServiceException):
+    """Raised when a job id is unknown or its results have expired"""
+    def __init__(self, message: str = "Job not found"):
+        super().__init__(message, "JOB_NOT_FOUND")
@@ -0,0 +1,155 @@
+"""Circuit breaker, retry budget and backoff for model calls"""
+
+import random
+import threading
+import time
+from typing import Any, Dict
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker for one (host, model) pair.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    rejects calls for `reset_timeout` seconds. It then lets up to
+    `half_open_max_calls` trial calls through: a success closes the circuit,
+    a failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def can_attempt(self) -> bool:
+        """Check whether a call would be let through, without claiming it"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.OPEN:
+                return False
+            if state == self.HALF_OPEN:
+                return self._half_open_calls < self.half_open_max_calls
+            return True
+
+    def try_acquire(self) -> bool:
+        """Claim permission for a call (a trial slot when half-open)"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.OPEN:
+                return False
+            if state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    return False
+                self._half_open_calls += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def record_ignored(self):
+        """Give back a claimed call whose outcome says nothing about the host"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_calls = 0
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a trial call through"""
+        with self._lock:
+            if self._current_state() != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._current_state(), "consecutive_failures": self._failures}
+
+
+class RetryBudget:
+    """
+    Cap retries to a fraction of traffic.
+
+    Every request deposits `ratio` tokens and every retry spends a whole
+    one, so retries stay below `ratio` of requests however many clients are
+    failing at once. `min_per_second` tokens trickle in regardless so
+    low-traffic processes can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        self._requests = 0
+        self._retries = 0
+        self._exhausted = 0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def deposit(self):
+        """Record a request"""
+        with self._lock:
+            self._refill()
+            self._requests += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        """Spend a token for a retry, if the budget allows it"""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1.0:
+                self._exhausted += 1
+                return False
+            self._tokens -= 1.0
+            self._retries += 1
+            return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            return {
+                "tokens": round(self._tokens, 3),
+                "requests": self._requests,
+                "retries": self._retries,
+                "exhausted": self._exhausted
+            }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (1-based)"""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
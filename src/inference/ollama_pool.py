@@ -0,0 +1,441 @@
+"""Pool of Ollama hosts with health probes and cache-affine routing"""
+
+import bisect
+import hashlib
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Union
+
+import httpx
+
+from src.config.config import config
+from src.exceptions.custom_exceptions import ModelConnectionError, CircuitOpenError, DeadlineExceededError
+from src.inference.circuit_breaker import CircuitBreaker, RetryBudget, backoff_delay
+from src.inference.scheduler import PriorityScheduler, get_scheduler
+from src.inference.usage import UsageStats, get_usage_stats
+from src.utils.request_context import (
+    routing_key, priority, service, time_remaining, check_deadline, timed, record_timing, record_model_usage
+)
+from src.utils.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+
+class _RetryableModelError(Exception):
+    """A model call failure worth retrying on another host"""
+
+
+class OllamaHost:
+    """State of a single Ollama host"""
+
+    def __init__(self, url: str, connect_timeout: float):
+        self.url = url
+        self.http = httpx.Client(base_url=url, timeout=httpx.Timeout(None, connect=connect_timeout))
+        self.healthy = True
+        self.models: Optional[set] = None  # None until the first successful probe
+        self.loaded: Optional[set] = None  # Models in memory, from /api/ps
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.last_probe: Optional[float] = None
+
+    def has_model(self, model: str) -> bool:
+        """Check whether the host serves a model (unknown counts as yes)"""
+        if self.models is None:
+            return True
+        return model in self.models or f"{model}:latest" in self.models
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "consecutive_failures": self.consecutive_failures,
+            "models": sorted(self.models) if self.models is not None else None,
+            "loaded": sorted(self.loaded) if self.loaded is not None else None,
+            "last_error": self.last_error,
+            "last_probe": self.last_probe
+        }
+
+
+class OllamaPool:
+    """
+    Route generate calls across several Ollama hosts.
+
+    Hosts are probed periodically via /api/tags for health and model
+    availability, and ejected after `unhealthy_threshold` consecutive
+    failures (probe or request). Each (host, model) pair also has a circuit
+    breaker, and failed calls are retried within a global retry budget.
+    Requests go to the healthy host serving the model with the fewest
+    outstanding requests, or, with consistent_hash routing, to the host
+    owning the request's cache key on a hash ring so repeated prompts hit a
+    warm prompt cache. With a scheduler, every call first waits for a slot
+    of the request's priority class. Token counts and durations Ollama
+    reports for each call are added to `usage`.
+    """
+
+    def __init__(self, hosts: List[str], settings: Optional[Dict[str, Any]] = None,
+                 breaker_settings: Optional[Dict[str, Any]] = None,
+                 retry_settings: Optional[Dict[str, Any]] = None,
+                 scheduler: Optional[PriorityScheduler] = None,
+                 usage: Optional[UsageStats] = None):
+        if not hosts:
+            raise ModelConnectionError("No Ollama hosts configured")
+
+        self.settings = {**config.ollama_pool, **(settings or {})}
+        self.breaker_settings = {**config.circuit_breaker, **(breaker_settings or {})}
+        self.retry_settings = {**config.retry, **(retry_settings or {})}
+        self.retry_budget = RetryBudget(
+            ratio=self.retry_settings["budget_ratio"],
+            min_per_second=self.retry_settings["budget_min_per_second"]
+        )
+        self.scheduler = scheduler
+        self.usage = usage if usage is not None else get_usage_stats()
+        self._breakers: Dict[tuple, CircuitBreaker] = {}
+        self.hosts = [OllamaHost(url, self.settings["connect_timeout"]) for url in hosts]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._prober: Optional[threading.Thread] = None
+        self._ring, self._ring_hosts = self._build_ring()
+
+    def _build_ring(self):
+        """Build the consistent-hash ring with virtual nodes per host"""
+        ring = []
+        for host in self.hosts:
+            for replica in range(self.settings["hash_replicas"]):
+                ring.append((self._hash(f"{host.url}#{replica}"), host))
+        ring.sort(key=lambda item: item[0])
+        return [point for point, _ in ring], [host for _, host in ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+    # Health probing ---------------------------------------------------------
+
+    def start(self):
+        """Start the background health prober"""
+        if self._prober is not None and self._prober.is_alive():
+            return
+        self._stop.clear()
+        self._prober = threading.Thread(target=self._probe_loop, name="ollama-pool-prober", daemon=True)
+        self._prober.start()
+
+    def stop(self):
+        """Stop the background health prober"""
+        self._stop.set()
+        if self._prober is not None:
+            self._prober.join(timeout=self.settings["probe_timeout"] + 1)
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.settings["health_interval"])
+
+    def _list_models(self, host: OllamaHost, path: str) -> set:
+        response = host.http.get(path, timeout=self.settings["probe_timeout"])
+        response.raise_for_status()
+        return {entry.get("name") or entry.get("model") for entry in response.json().get("models", [])}
+
+    def probe(self):
+        """Probe every host once for health, available and loaded models"""
+        for host in self.hosts:
+            try:
+                models = self._list_models(host, "/api/tags")
+            except Exception as e:
+                self._record_failure(host, f"Health probe failed: {str(e)}")
+            else:
+                try:
+                    loaded = self._list_models(host, "/api/ps")
+                except Exception:
+                    loaded = None  # Older Ollama versions have no /api/ps
+                with self._lock:
+                    host.models = models
+                    host.loaded = loaded
+                    host.consecutive_failures = 0
+                    host.last_error = None
+                    if not host.healthy:
+                        logger.info(f"Ollama host {host.url} is healthy again")
+                    host.healthy = True
+            host.last_probe = time.time()
+
+    def _record_failure(self, host: OllamaHost, error: str):
+        with self._lock:
+            host.consecutive_failures += 1
+            host.last_error = error
+            if host.healthy and host.consecutive_failures >= self.settings["unhealthy_threshold"]:
+                logger.warning(f"Ejecting Ollama host {host.url}: {error}")
+                host.healthy = False
+
+    # Routing ----------------------------------------------------------------
+
+    def breaker(self, host: OllamaHost, model: str) -> CircuitBreaker:
+        """Get the circuit breaker for a (host, model) pair"""
+        key = (host.url, model)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers.setdefault(key, CircuitBreaker(**self.breaker_settings))
+        return breaker
+
+    def _candidates(self, model: str) -> List[OllamaHost]:
+        return [host for host in self.hosts if host.healthy and host.has_model(model)]
+
+    def _circuits_open(self, model: str, serving: List[OllamaHost]) -> CircuitOpenError:
+        retry_after = min(self.breaker(host, model).retry_after() for host in serving)
+        return CircuitOpenError(
+            f"Circuit open for model '{model}' on every host",
+            retry_after=max(1.0, retry_after)
+        )
+
+    def check_circuits(self, model: str):
+        """Raise CircuitOpenError if no host serving a model would let a call through"""
+        with self._lock:
+            serving = self._candidates(model)
+            if serving and not any(self.breaker(host, model).can_attempt() for host in serving):
+                raise self._circuits_open(model, serving)
+
+    def _pick(self, model: str, key: Optional[str], exclude: Set[str]) -> OllamaHost:
+        """Pick a host for a request; caller must hold the lock"""
+        serving = self._candidates(model)
+        if not serving:
+            raise ModelConnectionError(f"No healthy Ollama host serves model '{model}'")
+
+        candidates = [host for host in serving if self.breaker(host, model).can_attempt()]
+        if not candidates:
+            raise self._circuits_open(model, serving)
+        # Prefer hosts this request hasn't failed on yet
+        candidates = [host for host in candidates if host.url not in exclude] or candidates
+
+        if key is not None and self.settings["routing"] == "consistent_hash":
+            # Consistent hashing with bounded load: walk the ring from the key's
+            # position and take the first eligible host that isn't overloaded
+            total = sum(host.outstanding for host in candidates) + 1
+            limit = max(1, self.settings["hash_load_factor"] * total / len(candidates))
+            eligible = set(map(id, candidates))
+            start = bisect.bisect(self._ring, self._hash(key))
+            for i in range(len(self._ring_hosts)):
+                host = self._ring_hosts[(start + i) % len(self._ring_hosts)]
+                if id(host) in eligible and host.outstanding + 1 <= limit:
+                    return host
+
+        fewest = min(host.outstanding for host in candidates)
+        return random.choice([host for host in candidates if host.outstanding == fewest])
+
+    def acquire(self, model: str, key: Optional[str] = None, exclude: Optional[Set[str]] = None) -> OllamaHost:
+        """Pick a host and count the request against it"""
+        with self._lock:
+            host = self._pick(model, key, exclude or set())
+            if not self.breaker(host, model).try_acquire():
+                raise CircuitOpenError(f"Circuit open for model '{model}' on {host.url}")
+            host.outstanding += 1
+            return host
+
+    def release(self, host: OllamaHost, error: Optional[str] = None):
+        """Release a host after a request, recording connection failures"""
+        with self._lock:
+            host.outstanding -= 1
+            if error is None:
+                host.consecutive_failures = 0
+        if error is not None:
+            self._record_failure(host, error)
+
+    # Model calls ------------------------------------------------------------
+
+    def _call(self, host: OllamaHost, model: str, payload: Dict[str, Any], path: str = "/api/generate") -> Dict[str, Any]:
+        """Make one /api/generate (or /api/embed) call, feeding the host state and circuit breaker"""
+        breaker = self.breaker(host, model)
+        # Give the call only what is left of the request's time budget
+        remaining = time_remaining()
+        timeout = {}
+        if remaining is not None:
+            timeout["timeout"] = httpx.Timeout(remaining, connect=min(self.settings["connect_timeout"], remaining))
+        try:
+            response = host.http.post(path, json=payload, **timeout)
+        except httpx.TimeoutException as e:
+            if remaining is not None and time_remaining() <= 0:
+                # Our own deadline ran out, which says nothing about the host
+                breaker.record_ignored()
+                self.release(host)
+                raise DeadlineExceededError(f"Request deadline exceeded waiting for {host.url}")
+            breaker.record_failure()
+            self.release(host, f"Request timed out: {str(e)}")
+            raise _RetryableModelError(f"Timed out waiting for model response from {host.url}: {str(e)}")
+        except httpx.HTTPError as e:
+            breaker.record_failure()
+            self.release(host, f"Request failed: {str(e)}")
+            raise _RetryableModelError(f"Failed to get model response from {host.url}: {str(e)}")
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+            self.release(host, f"HTTP {response.status_code}")
+            raise _RetryableModelError(
+                f"Ollama host {host.url} returned {response.status_code}: {response.text}"
+            )
+        breaker.record_success()
+        self.release(host)
+        if response.status_code == 404:
+            # Model was removed from the host since the last probe
+            with self._lock:
+                if host.models is not None:
+                    host.models.discard(model)
+        if response.status_code != 200:
+            raise ModelConnectionError(
+                f"Ollama host {host.url} returned {response.status_code}: {response.text}"
+            )
+
+        result = response.json()
+        result["host"] = host.url
+        return result
+
+    def generate(self, model: str, prompt: str, stream: bool = False, **kwargs) -> Dict[str, Any]:
+        """
+        Call /api/generate on the best host for this request
+
+        Accepts the same keyword arguments as ollama.Client.generate
+        (format, options, keep_alive, ...) and returns the response JSON.
+        Connection errors and 5xx responses are retried on another host with
+        jittered backoff while the retry budget allows it. When every
+        circuit for the model is open, CircuitOpenError is raised at once,
+        before waiting for a scheduler slot. Calls get only the time left
+        before the request's deadline, and with a scheduler wait for a slot
+        of the request's priority class.
+        """
+        if stream:
+            raise ValueError("Streaming is not supported by the Ollama pool")
+
+        self.start()
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if self.settings.get("keep_alive"):
+            payload["keep_alive"] = self.settings["keep_alive"]
+        payload.update({k: v for k, v in kwargs.items() if v is not None})
+        with get_tracer().span("model.generate", model=model, priority=priority.get()):
+            if self.scheduler is None:
+                return self._generate(model, payload)
+            # Fail fast rather than queue for a slot no host could use
+            self.check_circuits(model)
+            check_deadline("scheduling")
+            with self.scheduler.slot(priority.get()):
+                return self._generate(model, payload)
+
+    def embed(self, model: str, input: Union[str, List[str]]) -> Dict[str, Any]:
+        """
+        Call /api/embed on the best host for this request
+
+        Routed, retried, scheduled and time-limited like generate; the
+        response holds one vector per input in `embeddings`.
+        """
+        self.start()
+        payload = {"model": model, "input": input}
+        if self.settings.get("keep_alive"):
+            payload["keep_alive"] = self.settings["keep_alive"]
+        with get_tracer().span("model.embed", model=model, priority=priority.get()):
+            if self.scheduler is None:
+                return self._generate(model, payload, path="/api/embed", stage="embed")
+            # Fail fast rather than queue for a slot no host could use
+            self.check_circuits(model)
+            check_deadline("scheduling")
+            with self.scheduler.slot(priority.get()):
+                return self._generate(model, payload, path="/api/embed", stage="embed")
+
+    def _generate(self, model: str, payload: Dict[str, Any], path: str = "/api/generate",
+                  stage: str = "ollama") -> Dict[str, Any]:
+        """Run a model call with retries on other hosts, timed as `stage`"""
+        key = routing_key.get()
+        self.retry_budget.deposit()
+
+        tried: Set[str] = set()
+        attempt = 0
+        while True:
+            check_deadline("model call")
+            host = self.acquire(model, key, exclude=tried)
+            try:
+                with timed(stage), get_tracer().span("ollama.call", host=host.url, model=model, path=path,
+                                                     attempt=attempt) as span:
+                    result = self._call(host, model, payload, path)
+                    span.set_attributes({
+                        "prompt_tokens": result.get("prompt_eval_count"),
+                        "completion_tokens": result.get("eval_count")
+                    })
+                # Ollama's own breakdown of the call, in nanoseconds
+                for part, field in (("model_load", "load_duration"), ("prompt_eval", "prompt_eval_duration"),
+                                    ("generation", "eval_duration")):
+                    if stage == "ollama" and result.get(field):
+                        record_timing(part, result[field] / 1e9)
+                record_model_usage(self.usage.record(service.get(), model, host.url, result))
+                return result
+            except _RetryableModelError as e:
+                tried.add(host.url)
+                attempt += 1
+                delay = backoff_delay(
+                    attempt,
+                    self.retry_settings["backoff_base"],
+                    self.retry_settings["backoff_cap"]
+                )
+                remaining = time_remaining()
+                if remaining is not None and delay >= remaining:
+                    raise ModelConnectionError(str(e))
+                if attempt > self.retry_settings["max_retries"] or not self.retry_budget.try_withdraw():
+                    raise ModelConnectionError(str(e))
+                logger.warning(f"Retrying model call (attempt {attempt}): {str(e)}")
+                time.sleep(delay)
+
+    def warm_up(self, model: str, prompt: str, timeout: float) -> Dict[str, Any]:
+        """
+        Load a model on every healthy host serving it with a one-token generation
+
+        Bypasses routing, so each host gets the model into memory (kept for
+        `keep_alive`). Returns per-host load time or error.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": {"num_predict": 1}}
+        if self.settings.get("keep_alive"):
+            payload["keep_alive"] = self.settings["keep_alive"]
+
+        results = {}
+        for host in self.hosts:
+            if not (host.healthy and host.has_model(model)):
+                continue
+            start = time.perf_counter()
+            try:
+                response = host.http.post("/api/generate", json=payload, timeout=timeout)
+                response.raise_for_status()
+            except Exception as e:
+                results[host.url] = {"ok": False, "error": str(e)}
+            else:
+                results[host.url] = {"ok": True, "seconds": round(time.perf_counter() - start, 3)}
+                with self._lock:
+                    if host.loaded is not None:
+                        host.loaded.add(model)
+        return results
+
+    def serving_hosts(self, model: str) -> List[str]:
+        """Healthy hosts known (from a probe) to serve a model"""
+        with self._lock:
+            return [
+                host.url for host in self.hosts
+                if host.healthy and host.models is not None and host.has_model(model)
+            ]
+
+    def breaker_snapshot(self) -> Dict[str, Any]:
+        """Circuit state per host and model"""
+        return {f"{url}|{model}": breaker.snapshot() for (url, model), breaker in list(self._breakers.items())}
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Current state of every host"""
+        with self._lock:
+            return [host.snapshot() for host in self.hosts]
+
+
+_pool: Optional[OllamaPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ollama_pool() -> OllamaPool:
+    """Get the process-wide Ollama pool built from config"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OllamaPool(config.ollama_hosts, scheduler=get_scheduler())
+    return _pool
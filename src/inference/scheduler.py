@@ -0,0 +1,176 @@
+"""Weighted-fair priority scheduling of model calls"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Optional
+
+from src.config.config import config
+from src.exceptions.custom_exceptions import DeadlineExceededError
+from src.utils.request_context import time_remaining, timed
+from src.utils.tracing import get_tracer
+
+
+class _Waiter:
+    __slots__ = ("event", "granted", "enqueued_at")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class _PriorityClass:
+    """Queue, limits and metrics of one priority class"""
+
+    def __init__(self, name: str, weight: float, max_concurrency: int, sample_size: int = 1000):
+        self.name = name
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.queue: Deque[_Waiter] = deque()
+        self.in_flight = 0
+        self.pass_value = 0.0  # Stride-scheduling virtual time
+        self.dispatched = 0
+        self.expired = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_samples: Deque[float] = deque(maxlen=sample_size)
+
+    def record_wait(self, wait: float):
+        self.dispatched += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.wait_samples.append(wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = sorted(self.wait_samples)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 4)
+
+        return {
+            "weight": self.weight,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": len(self.queue),
+            "in_flight": self.in_flight,
+            "dispatched": self.dispatched,
+            "expired": self.expired,
+            "wait_seconds": {
+                "mean": round(self.wait_total / self.dispatched, 4) if self.dispatched else 0.0,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(self.wait_max, 4)
+            }
+        }
+
+
+class PriorityScheduler:
+    """
+    Admit model calls by priority class.
+
+    At most `max_concurrency` calls run at once overall, and each class is
+    capped at its own `max_concurrency`. When a slot frees up, the class
+    with waiters and the lowest stride-scheduling pass value goes next, so
+    over time classes share slots in proportion to their weights and bulk
+    traffic can't crowd out interactive requests. Waiting respects the
+    request deadline.
+    """
+
+    def __init__(self, max_concurrency: int, classes: Dict[str, Dict[str, Any]], default_class: str):
+        self.max_concurrency = max_concurrency
+        self.default_class = default_class
+        self.classes = {
+            name: _PriorityClass(name, float(settings["weight"]), int(settings["max_concurrency"]))
+            for name, settings in classes.items()
+        }
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def resolve(self, name: Optional[str]) -> _PriorityClass:
+        return self.classes.get(name or self.default_class, self.classes[self.default_class])
+
+    def _dispatch(self):
+        """Hand free slots to waiting classes; caller must hold the lock"""
+        while self.in_flight < self.max_concurrency:
+            eligible = [
+                cls for cls in self.classes.values()
+                if cls.queue and cls.in_flight < cls.max_concurrency
+            ]
+            if not eligible:
+                return
+            cls = min(eligible, key=lambda c: c.pass_value)
+            waiter = cls.queue.popleft()
+            cls.pass_value += 1.0 / cls.weight
+            cls.in_flight += 1
+            self.in_flight += 1
+            waiter.granted = True
+            cls.record_wait(time.monotonic() - waiter.enqueued_at)
+            waiter.event.set()
+
+    def acquire(self, name: Optional[str] = None) -> _PriorityClass:
+        """Block until a slot is granted to the given class"""
+        waiter = _Waiter()
+        with self._lock:
+            cls = self.resolve(name)
+            if not cls.queue and cls.in_flight == 0:
+                # A class coming back from idle doesn't get to spend saved-up credit
+                active = [c.pass_value for c in self.classes.values() if c.queue or c.in_flight]
+                cls.pass_value = max(cls.pass_value, min(active, default=cls.pass_value))
+            cls.queue.append(waiter)
+            self._dispatch()
+
+        waiter.event.wait(timeout=time_remaining())
+        if not waiter.granted:
+            with self._lock:
+                if not waiter.granted:
+                    cls.queue.remove(waiter)
+                    cls.expired += 1
+                    raise DeadlineExceededError("Request deadline exceeded while queued for the model")
+        return cls
+
+    def release(self, cls: _PriorityClass):
+        with self._lock:
+            cls.in_flight -= 1
+            self.in_flight -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, name: Optional[str] = None):
+        """Hold a model-call slot for the given priority class"""
+        with timed("queue"), get_tracer().span("scheduler.wait", priority=name) as span:
+            cls = self.acquire(name)
+            span.set_attribute("class", cls.name)
+        try:
+            yield cls
+        finally:
+            self.release(cls)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "classes": {name: cls.snapshot() for name, cls in self.classes.items()}
+            }
+
+
+_scheduler: Optional[PriorityScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> PriorityScheduler:
+    """Get the process-wide scheduler built from config"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = PriorityScheduler(
+                    config.scheduler["max_concurrency"],
+                    config.scheduler["classes"],
+                    config.scheduler["default_class"]
+                )
+    return _scheduler
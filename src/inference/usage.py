@@ -0,0 +1,96 @@
+"""Token and time accounting of Ollama calls, per service, model and host"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ollama's per-call statistics (durations in nanoseconds) and our names for them
+USAGE_FIELDS = (
+    ("prompt_tokens", "prompt_eval_count"),
+    ("completion_tokens", "eval_count"),
+    ("load_ns", "load_duration"),
+    ("prompt_eval_ns", "prompt_eval_duration"),
+    ("generation_ns", "eval_duration"),
+    ("total_ns", "total_duration"),
+)
+
+
+def call_usage(result: Dict[str, Any]) -> Dict[str, int]:
+    """The statistics of one /api/generate response (missing fields count as 0)"""
+    return {name: int(result.get(field) or 0) for name, field in USAGE_FIELDS}
+
+
+def _rate(tokens: int, nanoseconds: int) -> Optional[float]:
+    return round(tokens / (nanoseconds / 1e9), 2) if nanoseconds else None
+
+
+class UsageStats:
+    """
+    Running totals of Ollama call statistics.
+
+    Calls are grouped by (service, model, host). The snapshot turns the
+    totals into prompt and generation throughput (tokens/s), average
+    tokens per call, and how each call's time splits between model
+    loading, prompt evaluation and generation, so prompt changes and
+    model choices can be compared by what they actually cost.
+    """
+
+    def __init__(self):
+        self._groups: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, service: Optional[str], model: str, host: str, result: Dict[str, Any]) -> Dict[str, int]:
+        """Add one call's statistics, returning them"""
+        usage = call_usage(result)
+        key = (service or "unknown", model, host)
+        with self._lock:
+            group = self._groups.setdefault(key, {"calls": 0, **{name: 0 for name, _ in USAGE_FIELDS}})
+            group["calls"] += 1
+            for name, value in usage.items():
+                group[name] += value
+        return usage
+
+    def reset(self):
+        with self._lock:
+            self._groups.clear()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            groups = {key: dict(group) for key, group in self._groups.items()}
+
+        snapshot = []
+        for (service, model, host), group in sorted(groups.items()):
+            calls = group["calls"]
+            timed_ns = group["load_ns"] + group["prompt_eval_ns"] + group["generation_ns"]
+            snapshot.append({
+                "service": service,
+                "model": model,
+                "host": host,
+                "calls": calls,
+                "prompt_tokens": group["prompt_tokens"],
+                "completion_tokens": group["completion_tokens"],
+                "avg_prompt_tokens": round(group["prompt_tokens"] / calls, 1),
+                "avg_completion_tokens": round(group["completion_tokens"] / calls, 1),
+                "prompt_tokens_per_second": _rate(group["prompt_tokens"], group["prompt_eval_ns"]),
+                "generation_tokens_per_second": _rate(group["completion_tokens"], group["generation_ns"]),
+                "avg_total_ms": round(group["total_ns"] / calls / 1e6, 2),
+                "time_split": {
+                    stage: round(group[field] / timed_ns, 4) if timed_ns else None
+                    for stage, field in (("load", "load_ns"), ("prompt_eval", "prompt_eval_ns"),
+                                         ("generation", "generation_ns"))
+                }
+            })
+        return snapshot
+
+
+_usage: Optional[UsageStats] = None
+_usage_lock = threading.Lock()
+
+
+def get_usage_stats() -> UsageStats:
+    """Get the process-wide usage totals"""
+    global _usage
+    if _usage is None:
+        with _usage_lock:
+            if _usage is None:
+                _usage = UsageStats()
+    return _usage
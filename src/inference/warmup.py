@@ -0,0 +1,128 @@
+"""Startup warm-up and readiness checks"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.cache.redis_client import RedisClient
+from src.config.config import config
+from src.inference.ollama_pool import OllamaPool, get_ollama_pool
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    """Progress of the startup warm-up, reported by /ready"""
+
+    def __init__(self):
+        self.status = "pending"
+        self.steps: Dict[str, Any] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+    def finish(self, ok: bool, steps: Dict[str, Any]):
+        with self._lock:
+            self.status = "ready" if ok else "failed"
+            self.steps = steps
+            self.finished_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "status": self.status,
+                "steps": self.steps,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at
+            }
+
+
+warmup_state = WarmupState()
+
+
+def configured_models() -> List[str]:
+    """Every model a service may call"""
+    return sorted(set(config.model_paths.values()) | {config.get_current_model()})
+
+
+def run_warmup(models, state: WarmupState = warmup_state, pool: Optional[OllamaPool] = None):
+    """
+    Get the instance ready for its first request
+
+    Builds the analyzers, connects to Redis, and loads every configured
+    model on every Ollama host with a one-token generation kept alive for
+    the pool's `keep_alive`. Each step's outcome is kept in `state`.
+    """
+    state.start()
+    steps: Dict[str, Any] = {}
+
+    try:
+        models.load_all()
+        steps["analyzers"] = {"ok": True}
+    except Exception as e:
+        steps["analyzers"] = {"ok": False, "error": str(e)}
+
+    try:
+        RedisClient().ping()
+        steps["redis"] = {"ok": True}
+    except Exception as e:
+        steps["redis"] = {"ok": False, "error": str(e)}
+
+    pool = pool or get_ollama_pool()
+    pool.probe()
+    pool.start()
+    steps["models"] = {}
+    for model in configured_models():
+        hosts = pool.warm_up(model, config.warmup["prompt"], config.warmup["timeout"])
+        steps["models"][model] = {"ok": any(host["ok"] for host in hosts.values()), "hosts": hosts}
+
+    ok = (
+        steps["analyzers"]["ok"]
+        and steps["redis"]["ok"]
+        and all(step["ok"] for step in steps["models"].values())
+    )
+    state.finish(ok, steps)
+    logger.info(f"Warm-up finished: {state.status}")
+
+
+def check_readiness(state: WarmupState = warmup_state, pool: Optional[OllamaPool] = None) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Check whether this instance should get traffic
+
+    Ready means the warm-up (when enabled) has succeeded, Redis answers,
+    and every configured model is served by at least one healthy host.
+    """
+    checks: Dict[str, Any] = {}
+    if config.warmup["enabled"]:
+        checks["warmup"] = {"ok": state.status == "ready", "status": state.status}
+
+    try:
+        RedisClient().ping()
+        checks["redis"] = {"ok": True}
+    except Exception as e:
+        checks["redis"] = {"ok": False, "error": str(e)}
+
+    pool = pool or get_ollama_pool()
+    pool.start()  # Host state comes from the background prober
+    loaded = {host["url"]: host["loaded"] for host in pool.snapshot()}
+    checks["models"] = {}
+    for model in configured_models():
+        hosts = pool.serving_hosts(model)
+        checks["models"][model] = {
+            "ok": bool(hosts),
+            "hosts": hosts,
+            "loaded_on": [url for url in hosts if model in (loaded[url] or ())]
+        }
+
+    ready = (
+        checks.get("warmup", {"ok": True})["ok"]
+        and checks["redis"]["ok"]
+        and all(check["ok"] for check in checks["models"].values())
+    )
+    return ready, checks
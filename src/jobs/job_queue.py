@@ -0,0 +1,218 @@
+"""Redis Streams job queue shared by the API and the workers"""
+
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis import Redis
+from redis.exceptions import ResponseError
+
+from src.cache.redis_client import RedisClient
+from src.config.config import config
+from src.exceptions.custom_exceptions import JobNotFoundError
+
+# Store an item's result once and count it towards the job's progress.
+# KEYS: job hash, results hash
+# ARGV: item index, result JSON, counter field (succeeded/failed), now, ttl
+# Returns the number of finished items, -1 for a duplicate, -2 for an expired job
+RECORD_RESULT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -2
+end
+if redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[2]) == 0 then
+    return -1
+end
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+redis.call('HINCRBY', KEYS[1], ARGV[3], 1)
+local done = redis.call('HINCRBY', KEYS[1], 'done', 1)
+if done >= tonumber(redis.call('HGET', KEYS[1], 'total')) then
+    redis.call('HSETNX', KEYS[1], 'finished_at', ARGV[4])
+end
+return done
+"""
+
+StreamEntry = Tuple[str, Dict[str, str]]
+
+
+class JobQueue:
+    """
+    Jobs of many items processed by a pool of worker processes.
+
+    Every item is a Redis Stream entry read through a consumer group, so
+    any number of workers share the load and an item is only removed once
+    a worker acknowledges it. Entries left pending by a crashed worker are
+    reclaimed after `claim_idle` seconds. Job state lives in a hash
+    (`job:{id}`) and item results in a second hash keyed by item index
+    (`job:{id}:results`); both expire after `result_ttl`.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None, settings: Optional[Dict[str, Any]] = None):
+        self.settings = {**config.jobs, **(settings or {})}
+        self.redis = redis if redis is not None else RedisClient().client
+        # Blocking stream reads outlast the command timeout, so they get a connection without one
+        self._blocking = redis if redis is not None else RedisClient().connection(socket_timeout=None)
+        self.stream = self.settings["stream"]
+        self.group = self.settings["group"]
+        self._record_result = self.redis.register_script(RECORD_RESULT_SCRIPT)
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    @staticmethod
+    def _results_key(job_id: str) -> str:
+        return f"job:{job_id}:results"
+
+    # API side ---------------------------------------------------------------
+
+    def create(self, task: str, items: List[str], options: Optional[Dict] = None, model: Optional[str] = None) -> str:
+        """Store a job and enqueue one stream entry per item"""
+        job_id = uuid.uuid4().hex
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(self._job_key(job_id), mapping={
+            "task": task,
+            "options": json.dumps(options or {}),
+            # Fixed at submission so every item runs on the same model
+            "model": model or config.get_current_model(),
+            "total": len(items),
+            "done": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "created_at": time.time()
+        })
+        pipe.expire(self._job_key(job_id), self.settings["result_ttl"])
+        for index, text in enumerate(items):
+            pipe.xadd(self.stream, {"job_id": job_id, "index": index, "text": text, "attempt": 1})
+        pipe.execute()
+        return job_id
+
+    def get(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Job status with a page of results ordered by item index"""
+        meta = self.redis.hgetall(self._job_key(job_id))
+        if not meta:
+            raise JobNotFoundError(f"Job '{job_id}' not found or expired")
+
+        total = int(meta["total"])
+        limit = self.settings["page_size"] if limit is None else limit
+        end = min(offset + limit, total)
+        results = []
+        if end > offset:
+            values = self.redis.hmget(self._results_key(job_id), list(range(offset, end)))
+            results = [json.loads(value) for value in values if value is not None]
+
+        done = int(meta["done"])
+        return {
+            "job_id": job_id,
+            "task": meta["task"],
+            "model": meta.get("model"),
+            "status": self._status(meta),
+            "total": total,
+            "completed": done,
+            "succeeded": int(meta["succeeded"]),
+            "failed": int(meta["failed"]),
+            "progress": round(done / total, 4) if total else 1.0,
+            "created_at": float(meta["created_at"]),
+            "started_at": self._timestamp(meta, "started_at"),
+            "finished_at": self._timestamp(meta, "finished_at"),
+            "cancelled_at": self._timestamp(meta, "cancelled_at"),
+            "results": results,
+            "next_offset": end if end < total else None
+        }
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """Stop a job; workers drop its remaining items"""
+        meta = self.redis.hmget(self._job_key(job_id), ["total", "finished_at"])
+        if meta[0] is None:
+            raise JobNotFoundError(f"Job '{job_id}' not found or expired")
+        if meta[1] is None:
+            self.redis.hsetnx(self._job_key(job_id), "cancelled_at", time.time())
+        return self.get(job_id, limit=0)
+
+    @staticmethod
+    def _status(meta: Dict[str, str]) -> str:
+        if "finished_at" in meta:
+            return "completed"
+        if "cancelled_at" in meta:
+            return "cancelled"
+        if "started_at" in meta:
+            return "running"
+        return "queued"
+
+    @staticmethod
+    def _timestamp(meta: Dict[str, str], field: str) -> Optional[float]:
+        return float(meta[field]) if field in meta else None
+
+    # Worker side ------------------------------------------------------------
+
+    def ensure_group(self):
+        """Create the stream and consumer group if they don't exist yet"""
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def read(self, consumer: str, count: int, block_ms: Optional[int] = None) -> List[StreamEntry]:
+        """Read new entries for this consumer, blocking up to block_ms"""
+        response = self._blocking.xreadgroup(
+            self.group, consumer, {self.stream: ">"}, count=count, block=block_ms
+        )
+        return [entry for _, entries in response or [] for entry in entries if entry[1]]
+
+    def claim_stale(self, consumer: str, count: int) -> List[StreamEntry]:
+        """Take over entries another consumer has left pending for too long"""
+        response = self.redis.xautoclaim(
+            self.stream, self.group, consumer,
+            min_idle_time=int(self.settings["claim_idle"] * 1000),
+            start_id="0-0", count=count
+        )
+        return [entry for entry in response[1] if entry[1]]
+
+    def job_info(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Task, options, model and cancellation state of a job, None once expired"""
+        task, options, model, cancelled_at = self.redis.hmget(
+            self._job_key(job_id), ["task", "options", "model", "cancelled_at"]
+        )
+        if task is None:
+            return None
+        self.redis.hsetnx(self._job_key(job_id), "started_at", time.time())
+        return {"task": task, "options": json.loads(options), "model": model, "cancelled": cancelled_at is not None}
+
+    def record(self, job_id: str, index: int, result: Dict[str, Any], succeeded: bool) -> int:
+        """Store an item's result; duplicates from reclaimed entries are ignored"""
+        return self._record_result(
+            keys=[self._job_key(job_id), self._results_key(job_id)],
+            args=[index, json.dumps(result), "succeeded" if succeeded else "failed",
+                  time.time(), self.settings["result_ttl"]]
+        )
+
+    def ack(self, entry_id: str):
+        """Acknowledge and remove a processed entry"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xack(self.stream, self.group, entry_id)
+        pipe.xdel(self.stream, entry_id)
+        pipe.execute()
+
+    def retry(self, entry_id: str, fields: Dict[str, str]):
+        """Requeue an entry at the back of the stream with its attempt count bumped"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(self.stream, {**fields, "attempt": int(fields.get("attempt", 1)) + 1})
+        pipe.xack(self.stream, self.group, entry_id)
+        pipe.xdel(self.stream, entry_id)
+        pipe.execute()
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
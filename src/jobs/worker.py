@@ -0,0 +1,153 @@
+"""
+Worker process for asynchronous jobs
+
+Run one or more of these next to the API; they share the work through the
+stream's consumer group:
+
+    python -m src.jobs.worker --concurrency 4
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Optional
+
+from src.exceptions.custom_exceptions import (
+    NLPServiceException,
+    ModelConnectionError,
+    CircuitOpenError,
+    InvalidModelResponseError,
+    JSONParsingError,
+    DeadlineExceededError
+)
+from src.api.router import LazyModelLoader, TASK_HANDLERS
+from src.jobs.job_queue import JobQueue, StreamEntry
+from src.utils.request_context import deadline, priority
+from src.utils.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+# Failures that may go away on another attempt
+RETRYABLE_ERRORS = (ModelConnectionError, DeadlineExceededError, InvalidModelResponseError, JSONParsingError)
+
+
+class JobWorker:
+    """
+    Process job items from the stream as one consumer of the group.
+
+    Each item runs with the job's options under its own deadline
+    (`item_timeout`) and the configured scheduler priority. Retryable
+    failures are requeued until `max_attempts`, after which the error is
+    stored as the item's result. Items of cancelled or expired jobs are
+    dropped.
+    """
+
+    def __init__(self, queue: JobQueue, models, consumer: str):
+        self.queue = queue
+        self.models = models
+        self.consumer = consumer
+        self.settings = queue.settings
+
+    def run(self, stop: threading.Event):
+        """Process items until stop is set"""
+        logger.info(f"Job worker {self.consumer} started")
+        while not stop.is_set():
+            try:
+                self.run_once(stop)
+            except Exception as e:
+                logger.error(f"Job worker {self.consumer} failed to read from Redis: {str(e)}")
+                stop.wait(1.0)
+        logger.info(f"Job worker {self.consumer} stopped")
+
+    def run_once(self, stop: Optional[threading.Event] = None, block_ms: Optional[int] = None) -> int:
+        """Process stale and new entries once, returning how many were handled"""
+        entries = self.queue.claim_stale(self.consumer, self.settings["batch_size"])
+        if not entries:
+            entries = self.queue.read(
+                self.consumer,
+                self.settings["batch_size"],
+                self.settings["block_ms"] if block_ms is None else block_ms
+            )
+        for entry in entries:
+            if stop is not None and stop.is_set():
+                break  # Unprocessed entries stay pending and are reclaimed later
+            self.process(entry)
+        return len(entries)
+
+    def process(self, entry: StreamEntry):
+        entry_id, fields = entry
+        job_id, index = fields["job_id"], int(fields["index"])
+        attempt = int(fields.get("attempt", 1))
+
+        job = self.queue.job_info(job_id)
+        if job is None or job["cancelled"]:
+            self.queue.ack(entry_id)
+            return
+
+        deadline_token = deadline.set(time.monotonic() + self.settings["item_timeout"])
+        priority_token = priority.set(self.settings["priority"])
+        try:
+            with get_tracer().span("job.item", job_id=job_id, index=index, task=job["task"], attempt=attempt):
+                result = TASK_HANDLERS[job["task"]](self.models, fields["text"], job["options"] or None, job["model"])
+        except NLPServiceException as e:
+            if isinstance(e, RETRYABLE_ERRORS) and attempt < self.settings["max_attempts"]:
+                logger.warning(f"Retrying item {index} of job {job_id} (attempt {attempt}): {str(e)}")
+                if isinstance(e, CircuitOpenError):
+                    time.sleep(min(e.retry_after, 5.0))  # Don't spin on a model that is down
+                self.queue.retry(entry_id, fields)
+                return
+            self.queue.record(job_id, index, {
+                "index": index,
+                "error": {"code": e.error_code, "message": str(e)}
+            }, succeeded=False)
+        except Exception as e:
+            logger.error(f"Item {index} of job {job_id} failed: {str(e)}")
+            self.queue.record(job_id, index, {
+                "index": index,
+                "error": {"code": "INTERNAL_ERROR", "message": str(e)}
+            }, succeeded=False)
+        else:
+            self.queue.record(job_id, index, {"index": index, "result": result}, succeeded=True)
+        finally:
+            priority.reset(priority_token)
+            deadline.reset(deadline_token)
+        self.queue.ack(entry_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process NLP jobs from the Redis stream")
+    parser.add_argument("--concurrency", type=int, default=1, help="Consumer threads in this process")
+    parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}", help="Consumer name prefix")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    queue = JobQueue()
+    queue.ensure_group()
+    models = LazyModelLoader()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    threads = [
+        threading.Thread(
+            target=JobWorker(queue, models, f"{args.name}-{i}").run,
+            args=(stop,),
+            name=f"job-worker-{i}"
+        )
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    get_tracer().shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,33 @@
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from src.api.router import router
+from src.api.router import router, models
+from src.inference.warmup import run_warmup
+from src.utils.tracing import set_tracer
+from src.cache.semantic_cache import get_semantic_cache
 from src.exceptions.custom_exceptions import NLPServiceException
 from src.api.error_handler import nlp_exception_handler
+from src.api.middleware import (
+    RateLimitMiddleware, RequestSizeLimitMiddleware, DeadlineMiddleware, PriorityMiddleware, ServerTimingMiddleware,
+    CompressionMiddleware
+)
+from src.api.rate_limiter import RateLimiter
+from src.config.config import config
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: /health answers straight away while
+    # /ready reports 503 until the models are loaded
+    if config.warmup["enabled"]:
+        threading.Thread(target=run_warmup, args=(models,), name="warmup", daemon=True).start()
+    yield
+    # Persist the semantic cache indexes for the next start
+    if config.semantic_cache["enabled"]:
+        get_semantic_cache().save()
+    # Flush exported spans
+    tracer = set_tracer(None)
+    if tracer is not None:
+        tracer.shutdown()
 
 app = FastAPI(
     title="Multi-Purpose NLP service",
@@ -34,12 +60,59 @@ app = FastAPI(
     },
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/api/v1/openapi.json"
+    openapi_url="/api/v1/openapi.json",
+    lifespan=lifespan
 )
 
 # Register exception handler
 app.add_exception_handler(NLPServiceException, nlp_exception_handler)
 
+# Deadline for the whole request, inherited by cache lookups and model calls
+app.add_middleware(
+    DeadlineMiddleware,
+    default_timeout=config.api["request_timeout"],
+    max_timeout=config.api["max_request_timeout"]
+)
+
+# Priority class for the model-call scheduler
+app.add_middleware(
+    PriorityMiddleware,
+    classes=config.scheduler["classes"],
+    default_class=config.scheduler["default_class"],
+    api_keys=config.scheduler["api_keys"]
+)
+
+# Admission control: oversized bodies are refused before parsing, then
+# rate limits are applied (the last middleware added runs first)
+if config.api["rate_limit_enabled"]:
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=RateLimiter(config.api["rate_limit"], config.api["endpoint_rate_limits"]),
+        exempt_paths=["/", "/docs", "/redoc", "/api/v1/openapi.json", "/api/v1/health", "/api/v1/ready", "/api/v1/metrics"]
+    )
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_size=config.api["max_request_size"],
+    path_limits={
+        "/api/v1/jobs": config.jobs["max_request_size"],
+        # NDJSON streams are read line by line with a per-line limit instead
+        **{f"/api/v1/stream/{task}": None for task in ("sentiment", "ner", "classify", "summarize")}
+    }
+)
+
+# Compresses whole bodies only, so it sits outside everything producing them
+if config.api["compression"]:
+    app.add_middleware(
+        CompressionMiddleware,
+        min_size=config.api["compression_min_size"],
+        gzip_level=config.api["gzip_level"],
+        brotli_quality=config.api["brotli_quality"]
+    )
+
+# Outermost, so the Server-Timing total covers admission control too
+if config.api["server_timing"]:
+    app.add_middleware(ServerTimingMiddleware)
+
 # Add router
 app.include_router(router=router,
     prefix="/api/v1",
@@ -0,0 +1,346 @@
+import sys
+import time
+from typing import Dict, Optional
+from src.exceptions.custom_exceptions import (
+    NLPServiceException,
+    ModelConnectionError,
+    InvalidModelResponseError,
+    ValidationError,
+    JSONParsingError,
+    DeadlineExceededError
+)
+from src.cache.cache_manager import CacheManager, CacheConfig, cache_tags
+from src.config.config import config
+from src.inference.ollama_pool import get_ollama_pool
+from src.utils.json_utils import extract_json_object
+from src.utils.request_context import routing_key, service, timed
+from src.utils.tracing import get_tracer
+
+# Cache expiry per task, mirroring the expire passed to each analyzer's @cache_response
+TASK_EXPIRE = {
+    "sentiment": CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.SENTIMENT_EXPIRE,
+    "ner": CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.NER_EXPIRE,
+    "classify": CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.CLASSIFY_EXPIRE,
+    "summarize": CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.SUMMARIZE_EXPIRE,
+}
+
+
+class JointAnalyzer:
+    """
+    Run several NLP tasks on the same text with a single model call.
+
+    The per-service analyzers are only used for their prompt fragments and
+    result formatting, so every task result has exactly the shape (and cache
+    entry) the single-service endpoint would have produced.
+    """
+
+    TASKS = ("sentiment", "ner", "classify", "summarize")
+
+    def __init__(self, models):
+        try:
+            self.client = get_ollama_pool()
+            self.model = config.get_current_model()
+            self._models = models
+            self._cache_manager = None
+        except Exception as e:
+            raise ModelConnectionError(f"Failed to initialize Ollama client: {str(e)}")
+
+    def _analyzer_for(self, task: str):
+        """Get the single-service analyzer owning a task"""
+        return {
+            "sentiment": lambda: self._models.sentiment_analyzer,
+            "ner": lambda: self._models.ner_analyzer,
+            "classify": lambda: self._models.classifier,
+            "summarize": lambda: self._models.summarizer,
+        }[task]()
+
+    def _get_cache(self) -> Optional[CacheManager]:
+        """Get the cache manager, or None when Redis is unavailable"""
+        if self._cache_manager is None:
+            try:
+                self._cache_manager = CacheManager()
+            except Exception as e:
+                print(f"Cache error: {str(e)}")  # Debug
+                return None
+        return self._cache_manager
+
+    def _runs_alone(self, task: str, text: str, options: Dict) -> bool:
+        """
+        Whether a task needs its analyzer's own pipeline rather than a
+        section of the joint prompt: long texts (or `"mode": "sentences"`)
+        are scored sentence by sentence, and incremental summaries are built
+        from per-chunk summaries, each with their own cache entries
+        """
+        if task == "sentiment":
+            return options.get("mode") == "sentences" or len(text.strip('"')) > config.sentiment["sentence_threshold"]
+        if task == "summarize":
+            return options.get("mode") == "incremental"
+        return False
+
+    def _run_alone(self, task: str, text: str, options: Dict, model: str) -> dict:
+        """Run a task exactly as its single-service endpoint would"""
+        if task == "summarize":
+            return self._analyzer_for(task).summarize(text, options or None, model)
+        return self._analyzer_for(task).analyze(text.strip('"'), options or None, model)
+
+    def _task_instructions(self, task: str, options: Dict) -> str:
+        """Prompt section describing one task"""
+        if task == "sentiment":
+            return """"sentiment": Overall sentiment of the text.
+   - sentiment MUST be EXACTLY one of: POSITIVE, NEGATIVE, NEUTRAL
+   - Genuine enthusiasm is NOT sarcasm; only treat praise as sarcastic when it is followed by clear negative context
+   - Balanced positive and negative elements -> NEUTRAL
+   - confidence is a number between 0 and 1, explanation is one SHORT sentence"""
+
+        if task == "ner":
+            entity_types = self._analyzer_for("ner")._entity_type_definitions(options)
+            return f""""ner": Named entities found in the text.
+    {entity_types}
+   - ONLY extract entities from the types defined above
+   - Entity text MUST match the input text exactly, start/end are character positions
+   - Skip single pronouns, articles, and common words"""
+
+        if task == "classify":
+            categories = options.get('categories', self._analyzer_for("classify").default_categories)
+            multi_label_str = "multiple categories" if options.get('multi_label', False) else "single category"
+            return f""""classify": Topic classification of the text.
+   - Classify into these categories ONLY: {categories}, NEVER create your own category
+   - Return {multi_label_str} in all_categories
+   - Main category: 0.7-0.9 confidence, related categories: 0.4-0.8 confidence
+   - explanation is a brief reason for the classification"""
+
+        max_length = options.get('max_length', 150)
+        sum_type = options.get('type', 'abstractive')
+        return f""""summarize": Summary of the text.
+   - Generate a {sum_type} summary of EXACTLY {max_length} words
+   - Include 3 key points that capture the main ideas"""
+
+    def _task_schema(self, task: str, options: Dict) -> Dict:
+        """JSON schema for one task's section of the joint output"""
+        if task == "sentiment":
+            return {
+                "type": "object",
+                "properties": {
+                    "sentiment": {"type": "string", "enum": ["POSITIVE", "NEGATIVE", "NEUTRAL"]},
+                    "confidence": {"type": "number"},
+                    "explanation": {"type": "string"}
+                },
+                "required": ["sentiment", "confidence", "explanation"]
+            }
+
+        if task == "ner":
+            allowed_types = sorted(self._analyzer_for("ner")._allowed_types(options))
+            return {
+                "type": "object",
+                "properties": {
+                    "entities": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "text": {"type": "string"},
+                                "type": {"type": "string", "enum": allowed_types},
+                                "start": {"type": "integer"},
+                                "end": {"type": "integer"},
+                                "confidence": {"type": "number"}
+                            },
+                            "required": ["text", "type", "start", "end", "confidence"]
+                        }
+                    }
+                },
+                "required": ["entities"]
+            }
+
+        if task == "classify":
+            categories = list(options.get('categories', self._analyzer_for("classify").default_categories))
+            return {
+                "type": "object",
+                "properties": {
+                    "primary_category": {"type": "string", "enum": categories},
+                    "confidence": {"type": "number"},
+                    "all_categories": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "category": {"type": "string", "enum": categories},
+                                "confidence": {"type": "number"}
+                            },
+                            "required": ["category", "confidence"]
+                        }
+                    },
+                    "explanation": {"type": "string"}
+                },
+                "required": ["primary_category", "confidence", "all_categories", "explanation"]
+            }
+
+        return {
+            "type": "object",
+            "properties": {
+                "summary": {"type": "string"},
+                "key_points": {"type": "array", "items": {"type": "string"}}
+            },
+            "required": ["summary", "key_points"]
+        }
+
+    def _build_prompt(self, text: str, tasks: Dict[str, Dict]) -> str:
+        """Build one prompt covering every requested task"""
+        task_names = ", ".join(f'"{task}"' for task in tasks)
+        instructions = "\n\n".join(
+            f"{i}. {self._task_instructions(task, options)}"
+            for i, (task, options) in enumerate(tasks.items(), start=1)
+        )
+        return f"""You are an expert text analyst performing several analyses of the SAME text at once. Return ONLY a valid JSON object.
+
+The JSON object MUST have exactly these keys: {task_names}
+Each key holds the result of that analysis, following the JSON schema you were given.
+
+TASKS:
+{instructions}
+
+RULES:
+1. Analyze the text once and answer every task from that reading
+2. Confidence values must be numbers between 0 and 1
+3. Return ONLY the JSON object, nothing else
+
+Text to analyze: "{text}"
+"""
+
+    def _build_schema(self, tasks: Dict[str, Dict]) -> Dict:
+        """Joint JSON schema constraining the model output"""
+        return {
+            "type": "object",
+            "properties": {task: self._task_schema(task, options) for task, options in tasks.items()},
+            "required": list(tasks)
+        }
+
+    def _format_task(self, task: str, text: str, result: Dict, options: Dict, processing_time: float) -> dict:
+        """Shape one task's section with the owning analyzer's formatter"""
+        analyzer = self._analyzer_for(task)
+        if task == "sentiment":
+            return analyzer._format_result(text, result, options, processing_time=processing_time)
+        return analyzer._format_result(text, result, options)
+
+    def analyze(self, text: str, tasks: Dict[str, Optional[Dict]], model: Optional[str] = None) -> dict:
+        """
+        Analyze text with several tasks in one model call
+
+        Args:
+            text (str): Input text
+            tasks (dict): Task name -> options for that task (or None)
+            model (str, optional): Ollama model tag, defaults to the current model
+
+        Returns:
+            dict: Per-task results in the single-service response shapes,
+                plus per-task errors for sections the model got wrong
+        """
+        try:
+            start_time = time.time()
+            model = model or config.get_current_model()
+            print(f'Using model: {model}')  # Debug
+
+            cache = self._get_cache()
+            results, errors, cache_keys, pending = {}, {}, {}, {}
+
+            # Tasks the joint prompt can't do as their endpoint would run
+            # through their analyzers, so both give (and cache) the same result
+            alone = [task for task in self.TASKS if task in tasks and self._runs_alone(task, text, tasks[task] or {})]
+            for task in alone:
+                try:
+                    results[task] = self._run_alone(task, text, tasks[task] or {}, model)
+                except (ModelConnectionError, DeadlineExceededError):
+                    raise
+                except Exception as e:
+                    errors[task] = str(e)
+            tasks = {task: options for task, options in tasks.items() if task not in alone}
+
+            # Serve what we can from each service's own cache entry,
+            # looked up together (one round trip per cache shard)
+            if cache is not None:
+                for task in self.TASKS:
+                    if task in tasks:
+                        task_text = text.strip('"') if task == "sentiment" else text
+                        cache_keys[task] = cache.generate_key(task, task_text, tasks[task], model=model)
+                cached = cache.get_many(list(cache_keys.values()))
+            for task in self.TASKS:
+                if task not in tasks:
+                    continue
+                options = tasks[task] or {}
+
+                if cache is not None:
+                    cached_result = cached.get(cache_keys[task])
+                    if cached_result and cached_result.get('model') == model:
+                        print(f"Cache hit for task: {task}")  # Debug
+                        results[task] = cached_result
+                        continue
+                pending[task] = options
+
+            if pending:
+                token = routing_key.set(f"analyze:{','.join(pending)}:{text}")
+                service_token = service.set("analyze")
+                try:
+                    with get_tracer().span("service", service="analyze", model=model,
+                                           tasks=list(pending), cached_tasks=list(results)):
+                        response = self.client.generate(
+                            model=model,
+                            prompt=self._build_prompt(text, pending),
+                            format=self._build_schema(pending),
+                            stream=False
+                        )
+                except (ModelConnectionError, DeadlineExceededError):
+                    raise
+                except Exception as e:
+                    raise ModelConnectionError(f"Failed to get model response: {str(e)}")
+                finally:
+                    service.reset(service_token)
+                    routing_key.reset(token)
+
+                with timed("parse"):
+                    raw_result = extract_json_object(response['response'])
+                processing_time = round(time.time() - start_time, 3)
+
+                for task, options in pending.items():
+                    task_text = text.strip('"') if task == "sentiment" else text
+                    try:
+                        if not isinstance(raw_result.get(task), dict):
+                            raise InvalidModelResponseError(f"Missing '{task}' section in model response")
+                        with timed("parse"):
+                            result = self._format_task(task, task_text, raw_result[task], options, processing_time)
+                    except Exception as e:
+                        errors[task] = str(e)
+                        continue
+
+                    result['model'] = model
+                    results[task] = result
+                    if cache is not None:
+                        cache.set(cache_keys[task], result, TASK_EXPIRE[task], tags=cache_tags(task, model, options))
+
+            if not results:
+                raise InvalidModelResponseError(
+                    "; ".join(f"{task}: {error}" for task, error in errors.items())
+                )
+
+            analysis = {
+                "text": text,
+                **results,
+                "model": model,
+                "metadata": {
+                    "cached_tasks": [task for task in results if task not in pending and task not in alone],
+                    "computed_tasks": [task for task in pending if task in results] + [task for task in alone if task in results],
+                    "processing_time_seconds": round(time.time() - start_time, 3)
+                }
+            }
+            if errors:
+                analysis["errors"] = errors
+            print(f"Analysis: {analysis}")
+
+            return analysis
+
+        except Exception as e:
+            # If it's our custom exception re-raise it
+            if isinstance(e, (ValidationError, ModelConnectionError,
+                              InvalidModelResponseError, JSONParsingError,
+                              DeadlineExceededError)):
+                raise
+            # Otherwise wrap it in a general error
+            raise NLPServiceException(f"Unexpected error in joint analysis: {str(e)}")
@@ -1,22 +1,27 @@
-from ollama import Client
-import json
 import sys
 from src.exceptions.custom_exceptions import ModelConnectionError, JSONParsingError, NLPServiceException
 from src.cache.cache_manager import cache_response, CacheConfig
 from src.config.config import config
+from src.inference.ollama_pool import get_ollama_pool
+from src.utils.json_utils import extract_json_object
+from src.utils.request_context import timed
 from typing import Optional, Dict
 from src.exceptions.custom_exceptions import (
     NLPServiceException,
     JSONParsingError,
     ValidationError,
     ModelConnectionError,
-    InvalidModelResponseError
+    InvalidModelResponseError,
+    DeadlineExceededError
 )
 
+ENTITY_FIELDS = frozenset(("text", "type", "start", "end", "confidence"))
+
+
 class NERAnalyzer:
     def __init__(self):
         try:
-            self.client = Client(host=config.ollama_host)
+            self.client = get_ollama_pool()
             self.model = config.model_paths["ner"]
         except Exception as e:
             raise ModelConnectionError(f"Failed to initialize Ollama client: {str(e)}")
@@ -44,43 +49,74 @@ class NERAnalyzer:
                 entity['confidence'] = 0.85
             else:
                 entity['confidence'] = round(entity['confidence'], 2)
-            
+
+            # Only the response fields, so cached results need no re-validation
+            # (copied only when the model added others, which is rare)
+            if not entity.keys() <= ENTITY_FIELDS:
+                entity = {field: value for field, value in entity.items() if field in ENTITY_FIELDS}
             validated.append(entity)
         return validated
 
+    def _allowed_types(self, options: Optional[Dict] = None) -> set:
+        """Entity types to keep for the given options"""
+        options = options or {}
+
+        # Base entity types we always want
+        allowed_types = {'PERSON', 'ORG', 'LOC'}
+
+        # Add optional types based on options
+        if options.get('extract_time', False):
+            allowed_types.add('TIME')
+        if options.get('extract_numerical', False):
+            allowed_types.add('NUMBER')
+        if options.get('extract_email', False):
+            allowed_types.add('EMAIL')
+        return allowed_types
+
+    def _entity_type_definitions(self, options: Optional[Dict] = None) -> str:
+        """Build the entity type section of the prompt"""
+        options = options or {}
+
+        entity_types = """ENTITY DEFINITIONS AND EXTRACTION RULES:
+    - PERSON: Full names of people only (e.g., John Smith, Mary Johnson)
+    - ORG: Organizations, companies, institutions, brands (e.g., Microsoft, NASA,)
+    - LOC: Places, cities, countries, locations (e.g., New York, Mount Everest, Japan)"""
+
+        if options.get('extract_time', False):
+            entity_types += "\n- TIME: Time expressions, clock times, periods (e.g., 2:30 PM, morning, 9AM)"
+        if options.get('extract_numerical', False):
+            entity_types += "\n- NUMBER: Numerical values, quantities, measurements (e.g., 42, million, 12.5)"
+        if options.get('extract_email', False):
+            entity_types += "\n- EMAIL: Valid email addresses (e.g., user@example.com)"
+        return entity_types
+
+    def _format_result(self, text: str, result: Dict, options: Optional[Dict] = None,
+                       model: Optional[str] = None) -> dict:
+        """Filter and validate the parsed model output into the NER response"""
+        allowed_types = self._allowed_types(options)
+
+        # Filter entities by allowed types
+        entities = [
+            entity for entity in result.get("entities", [])
+            if entity.get('type') in allowed_types
+        ]
+
+        return {
+            "text": text,
+            "entities": self._validate_entities(text, entities),
+            "model": model or self.model
+        }
+
     @cache_response(prefix="ner", expire=CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.NER_EXPIRE)
-    def analyze(self, text: str, options: Optional[Dict] = None) -> dict:
+    def analyze(self, text: str, options: Optional[Dict] = None, model: Optional[str] = None) -> dict:
         try:
-            current_model = config.get_current_model()
-            self.model = current_model
-            print(f'Using model: {self.model}')  # Debug 
+            model = model or config.get_current_model()
+            print(f'Using model: {model}')  # Debug 
             # Initialize options
             if options is None:
                 options = {}
                 
-            # Base entity types we always want
-            allowed_types = {'PERSON', 'ORG', 'LOC'}
-            
-            # Add optional types based on options
-            if options.get('extract_time', False):
-                allowed_types.add('TIME')
-            if options.get('extract_numerical', False):
-                allowed_types.add('NUMBER')
-            if options.get('extract_email', False):
-                allowed_types.add('EMAIL')
-
-            # Build entity type definitions
-            entity_types = """ENTITY DEFINITIONS AND EXTRACTION RULES:
-    - PERSON: Full names of people only (e.g., John Smith, Mary Johnson)
-    - ORG: Organizations, companies, institutions, brands (e.g., Microsoft, NASA,)
-    - LOC: Places, cities, countries, locations (e.g., New York, Mount Everest, Japan)"""
-
-            if options.get('extract_time', False):
-                entity_types += "\n- TIME: Time expressions, clock times, periods (e.g., 2:30 PM, morning, 9AM)"
-            if options.get('extract_numerical', False):
-                entity_types += "\n- NUMBER: Numerical values, quantities, measurements (e.g., 42, million, 12.5)"
-            if options.get('extract_email', False):
-                entity_types += "\n- EMAIL: Valid email addresses (e.g., user@example.com)"
+            entity_types = self._entity_type_definitions(options)
 
             prompt = f"""You are a precise Named Entity Recognition (NER) expert. Return ONLY a valid JSON object.
 
@@ -115,49 +151,23 @@ class NERAnalyzer:
     """
             # Get response from model
             response = self.client.generate(
-                model=self.model,
+                model=model,
                 prompt=prompt,
                 stream=False
             )
             print(f"Raw Reponse: {response}")
-            try: 
-                # Process response
-                raw_text = response['response']
-                start = raw_text.find('{')
-                end = raw_text.rfind('}') + 1
-                
-                if start == -1 or end == 0:
-                    raise JSONParsingError("No JSON object found in response")
-                    
-                result = json.loads(raw_text[start:end])
-
-                # print(f"Response: {result}")   # Debug
-
-                # Filter entities by allowed types
-                result["entities"] = [
-                    entity for entity in result["entities"]
-                    if entity.get('type') in allowed_types
-                ]
-                
-                # Validate entities
-                result["entities"] = self._validate_entities(text, result["entities"])
-                
-                analysis =  {
-                    "text": text,
-                    "entities": result["entities"],
-                    "model": self.model
-                }
-                print(f"Analysis: {analysis}")
-
-                return analysis
-            
-            except json.JSONDecodeError as e:
-                raise JSONParsingError(f"Failed to parse model response: {str(e)}")
+
+            with timed("parse"):
+                analysis = self._format_result(text, extract_json_object(response['response']), options, model=model)
+            print(f"Analysis: {analysis}")
+
+            return analysis
             
         except Exception as e:
             # If it's our custom exception re-raise it
             if isinstance(e, (ValidationError, ModelConnectionError,
-                              InvalidModelResponseError, JSONParsingError)):
+                              InvalidModelResponseError, JSONParsingError,
+                              DeadlineExceededError)):
                 raise 
             # Otherwise wrap it in a general error
             raise NLPServiceException(f"Unexpected error in sentiment analysis: {str(e)}")
\ No newline at end of file
@@ -1,22 +1,29 @@
-from ollama import Client
-import json
+import contextvars
 import sys
 import time
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from src.exceptions.custom_exceptions import (
     NLPServiceException,
     ModelConnectionError,
     InvalidModelResponseError,
     ValidationError,
-    JSONParsingError
+    JSONParsingError,
+    DeadlineExceededError
 )
 from src.cache.cache_manager import cache_response, CacheConfig
 from src.config.config import config
+from src.inference.ollama_pool import get_ollama_pool
+from src.utils.json_utils import extract_json_object
+from src.utils.request_context import timed
+from src.utils.text_utils import group_spans, split_sentences
+
+SENTIMENT_SCORES = {"POSITIVE": 1.0, "NEUTRAL": 0.0, "NEGATIVE": -1.0}
 
 class SentimentAnalyzer:
     def __init__(self):
         try:
-            self.client = Client(host=config.ollama_host)
+            self.client = get_ollama_pool()
             self.model = config.model_paths["sentiment"]
         except Exception as e:
             raise ModelConnectionError(f"Failed to initialize Ollama client: {str(e)}")
@@ -43,16 +50,133 @@ class SentimentAnalyzer:
             "intensifiers": found_intensifiers
         }
         
+    def _format_result(self, text: str, result: Dict, options: Optional[Dict] = None,
+                       processing_time: float = 0, model: Optional[str] = None) -> dict:
+        """Shape the parsed model output into the sentiment response"""
+        include_metadata = options.get('include_metadata', False) if options else False
+
+        analysis = {
+            "text": text,
+            "sentiment": result["sentiment"],
+            "confidence": round(float(result["confidence"]), 4),
+            "explanation": str(result["explanation"]),
+            "model": model or self.model
+        }
+        if include_metadata:
+            # Extract sentiment features
+            sentiment_features = self._extract_sentiment_features(text=text)
+
+            analysis["metadata"] = {
+                "sentiment_breakdown": sentiment_features,
+                "processing_time_seconds": processing_time
+            }
+        return analysis
+
+    def analyze(self, text: str, options: Optional[Dict] = None, model: Optional[str] = None) -> dict:
+        """
+        Analyze the sentiment of a text
+
+        Texts longer than the sentence threshold (or with the option
+        `"mode": "sentences"`) are scored sentence by sentence and
+        aggregated; shorter ones take a single model call.
+        """
+        options = options or {}
+        if options.get("mode") == "sentences" or len(text) > config.sentiment["sentence_threshold"]:
+            return self._analyze_document(text, options or None, model)
+        return self._analyze_text(text, options or None, model)
+
+    def _aggregate(self, scored: List[Dict]) -> Dict:
+        """
+        Combine sentence results into one document-level sentiment
+
+        Each sentence votes with its score (+1, 0, -1) weighted by its
+        confidence. The document confidence is the share of the total
+        confidence behind the winning label.
+        """
+        total = sum(sentence["confidence"] for sentence in scored)
+        if total == 0:
+            return {"sentiment": "NEUTRAL", "confidence": 0.0, "score": 0.0}
+        score = sum(SENTIMENT_SCORES[sentence["sentiment"]] * sentence["confidence"] for sentence in scored) / total
+        band = config.sentiment["neutral_band"]
+        label = "POSITIVE" if score > band else "NEGATIVE" if score < -band else "NEUTRAL"
+        agreeing = sum(sentence["confidence"] for sentence in scored if sentence["sentiment"] == label)
+        return {"sentiment": label, "confidence": round(agreeing / total, 4), "score": round(score, 4)}
+
+    @cache_response(prefix="sentiment_document", expire=CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.SENTIMENT_EXPIRE)
+    def _analyze_document(self, text: str, options: Optional[Dict] = None, model: Optional[str] = None) -> dict:
+        """Score each sentence concurrently (each cached on its own) and aggregate"""
+        start_time = time.time()
+        model = model or config.get_current_model()
+        with timed("segment"):
+            spans = group_spans(
+                split_sentences(text, max_chars=config.sentiment["sentence_threshold"]),
+                config.sentiment["max_sentences"]
+            )
+
+        # Sentences are scored without the request's options so identical
+        # sentences share cache entries across documents
+        def score(span):
+            return self._analyze_text(text[span[0]:span[1]].strip('"'), None, model)
+
+        workers = max(1, min(config.sentiment["concurrency"], len(spans)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each sentence runs in a copy of the request context (deadline, priority, timings)
+            futures = [executor.submit(contextvars.copy_context().run, score, span) for span in spans]
+
+        scored, failed, first_error = [], [], None
+        for span, future in zip(spans, futures):
+            try:
+                result = future.result()
+            except (ModelConnectionError, DeadlineExceededError):
+                raise
+            except Exception as e:
+                failed.append({"start": span[0], "end": span[1], "error": str(e)})
+                first_error = first_error or e
+                continue
+            scored.append({
+                "text": text[span[0]:span[1]],
+                "start": span[0],
+                "end": span[1],
+                "sentiment": result["sentiment"],
+                "confidence": result["confidence"],
+                "explanation": result["explanation"]
+            })
+        if not scored:
+            raise first_error
+
+        aggregate = self._aggregate(scored)
+        counts = {label: sum(1 for s in scored if s["sentiment"] == label) for label in SENTIMENT_SCORES}
+        metadata = {
+            "mode": "sentences",
+            "score": aggregate["score"],
+            "sentence_counts": counts,
+            "sentences": scored,
+            "processing_time_seconds": round(time.time() - start_time, 3)
+        }
+        if failed:
+            metadata["failed_sentences"] = failed
+        if options and options.get("include_metadata"):
+            metadata["sentiment_breakdown"] = self._extract_sentiment_features(text=text)
+
+        return {
+            "text": text,
+            "sentiment": aggregate["sentiment"],
+            "confidence": aggregate["confidence"],
+            "explanation": (f"{counts['POSITIVE']} positive, {counts['NEGATIVE']} negative and "
+                            f"{counts['NEUTRAL']} neutral of {len(scored)} sentences"),
+            "model": model,
+            "metadata": metadata
+        }
+
     @cache_response(prefix="sentiment", expire=CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.SENTIMENT_EXPIRE)
-    def analyze(self, text: str, options: Optional[Dict] = None) -> dict:
+    def _analyze_text(self, text: str, options: Optional[Dict] = None, model: Optional[str] = None) -> dict:
+        """Sentiment of a short text in a single model call"""
         try:
             start_time = time.time()
-            # Get current model from config
-            current_model = config.get_current_model()
-            self.model = current_model
-            print(f'Using model: {self.model}')  # Debug 
+            # The request's model, or the configured default
+            model = model or config.get_current_model()
+            print(f'Using model: {model}')  # Debug 
 
-            include_metadata = options.get('include_metadata', False) if options else False
             prompt = f"""You are an expert sentiment analyzer with advanced capabilities in detecting genuine emotions and sarcasm. Return ONLY a valid JSON object.
 
 Format EXACTLY like this (including the curly braces):
@@ -123,58 +247,33 @@ Analyze this text: "{text}"
 """
             try:
                 response = self.client.generate(
-                    model=self.model,
+                    model=model,
                     prompt=prompt,
                     stream=False
                 )
-                print(f"Using Model: {self.model}")
+                print(f"Using Model: {model}")
+            except (ModelConnectionError, DeadlineExceededError):
+                raise
             except Exception as e:
                 raise ModelConnectionError(f"Failed to get model response: {str(e)}")
                 
-            try:
-                # Extract JSON object
-                raw_text = response['response']
-                
-                # Find the JSON part
-                start = raw_text.find('{')
-                end = raw_text.rfind('}') + 1
-                
-                if start == -1 or end == 0:
-                    raise JSONParsingError("No JSON object found in response")
-                
-                json_str = raw_text[start:end]
-                result = json.loads(json_str)
-                
-                processing_time = int((time.time() - start_time))
-
-                # Format the final response
-                analysis = {
-                    "text": text,
-                    "sentiment": result["sentiment"],
-                    "confidence": round(float(result["confidence"]), 4),
-                    "explanation": str(result["explanation"]),
-                    "model": self.model
-                }
-                if include_metadata:
-                    # Extract sentiment features
-                    sentiment_features = self._extract_sentiment_features(text=text)
-                    
-                    analysis["metadata"] = {
-                        "sentiment_breakdown": sentiment_features,
-                        "processing_time_seconds": processing_time
-                    }
-                    
-                print(f"Resonse: {analysis}")
-                
-                return analysis
-                
-            except json.JSONDecodeError as e:
-                raise JSONParsingError(f"Failed to parse model response: {str(e)}")
+            with timed("parse"):
+                analysis = self._format_result(
+                    text,
+                    extract_json_object(response['response']),
+                    options,
+                    processing_time=round(time.time() - start_time, 3),
+                    model=model
+                )
+            print(f"Resonse: {analysis}")
+
+            return analysis
             
         except Exception as e:
             # If it's our custom exception re-raise it
             if isinstance(e, (ValidationError, ModelConnectionError,
-                              InvalidModelResponseError, JSONParsingError)):
+                              InvalidModelResponseError, JSONParsingError,
+                              DeadlineExceededError)):
                 raise 
             # Otherwise wrap it in a general error
             raise NLPServiceException(f"Unexpected error in sentiment analysis: {str(e)}")
\ No newline at end of file
@@ -1,28 +1,61 @@
-from ollama import Client
-import json
 import sys
 from src.cache.cache_manager import CacheConfig, cache_response
 from src.config.config import config
+from src.inference.ollama_pool import get_ollama_pool
+from src.utils.json_utils import extract_json_object
+from src.utils.request_context import timed
 from src.exceptions.custom_exceptions import (
     NLPServiceException,
     JSONParsingError,
     ValidationError,
     ModelConnectionError,
-    InvalidModelResponseError
+    InvalidModelResponseError,
+    DeadlineExceededError
 )
 
 
 class TextClassifier:
     def __init__(self):
-        self.client = Client(host=config.ollama_host)
+        self.client = get_ollama_pool()
         self.model = config.model_paths["classify"]
         self.default_categories = [
             "Business", "Technology", "Politics", "Sports",
             "Entertainment", "Science", "Health", "Education"
         ]
         
+    def _format_result(self, text: str, result: dict, options: dict = None, model: str = None) -> dict:
+        """Validate the parsed model output against the requested categories"""
+        categories = (options or {}).get('categories', self.default_categories)
+
+        # Validate response
+        if not result.get("primary_category") in categories:
+            raise ValueError(f"Invalid primary category: {result.get('primary_category')}")
+        
+        if not result.get("explanation"):
+            raise InvalidModelResponseError("Missing explanation in model response")
+            
+        for cat in result.get("all_categories", []):
+            if not cat.get("category") in categories:
+                raise ValueError(f"Invalid category: {cat.get('category')}")
+        
+        # Format the final response
+        return {
+            "text": text,
+            "primary_category": result["primary_category"],
+            "confidence": round(float(result["confidence"]), 3),
+            "all_categories": [
+                {
+                    "category": cat["category"],
+                    "confidence": round(float(cat["confidence"]), 3)
+                }
+                for cat in result["all_categories"]
+            ],
+            "explanation": result["explanation"],
+            "model": model or self.model
+        }
+        
     @cache_response(prefix="classify", expire=CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.CLASSIFY_EXPIRE)
-    def classify(self, text: str, options: dict = None) -> dict:
+    def classify(self, text: str, options: dict = None, model: str = None) -> dict:
         """
         Classify text into predefined categories
         
@@ -31,13 +64,14 @@ class TextClassifier:
             options (dict, optional): Configuration options including:
                 - categories (list): Custom categories to classify into
                 - multi_label (bool): Allow multiple category assignments
+            model (str, optional): Ollama model tag, defaults to the current model
         
         Returns:
             dict: Contains predicted categories and confidence scores
         """
         try:
-            # Get the current model
-            self.model = config.get_current_model()
+            # The request's model, or the configured default
+            model = model or config.get_current_model()
             if options is None:
                 options = {}
                 
@@ -121,60 +155,19 @@ Output: {{
 Text to classify: "{text}"
 """
             response = self.client.generate(
-                model=self.model,
+                model=model,
                 prompt=prompt,
                 stream=False
             )
             
-            try:
-                # Extract JSON object
-                raw_text = response['response']
-                start = raw_text.find('{')
-                end = raw_text.rfind('}') + 1
-                
-                if start == -1 or end == 0:
-                    raise Exception("No JSON object found in response")
-                
-                json_str = raw_text[start:end]
-                result = json.loads(json_str)
-                
-                
-                # Validate response
-                if not result.get("primary_category") in categories:
-                    raise ValueError(f"Invalid primary category: {result['primary_category']}")
-                
-                if not result.get("explanation"):
-                    raise InvalidModelResponseError("Missing explanation in model response")
-                    
-                for cat in result.get("all_categories", []):
-                    if not cat.get("category") in categories:
-                        raise ValueError(f"Invalid category: {cat.get('category')}")
-                
-                # Format the final response
-                analysis = {
-                    "text": text,
-                    "primary_category": result["primary_category"],
-                    "confidence": round(float(result["confidence"]), 3),
-                    "all_categories": [
-                        {
-                            "category": cat["category"],
-                            "confidence": round(float(cat["confidence"]), 3)
-                        }
-                        for cat in result["all_categories"]
-                    ],
-                    "explanation": result["explanation"],
-                    "model": self.model
-                }
-                
-                return analysis
-                
-            except json.JSONDecodeError as e:
-                raise JSONParsingError(f"Failed to parse model response: {str(e)}")
+            with timed("parse"):
+                return self._format_result(text, extract_json_object(response['response']), options, model=model)
             
         except Exception as e:
             # If it's our custom exception re-raise it
             if isinstance(e, (ValidationError, ModelConnectionError,
-                              InvalidModelResponseError, JSONParsingError)):
+                              InvalidModelResponseError, JSONParsingError,
+                              DeadlineExceededError)):
                 raise 
             # Otherwise wrap it in a general error
             raise NLPServiceException(f"Unexpected error in sentiment analysis: {str(e)}")
\ No newline at end of file
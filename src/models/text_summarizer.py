@@ -1,20 +1,27 @@
-from ollama import Client
-import json
+import contextvars
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 from src.cache.cache_manager import CacheConfig, cache_response
 from src.config.config import config
+from src.inference.ollama_pool import get_ollama_pool
+from src.utils.json_utils import extract_json_object
+from src.utils.request_context import cache_stats, timed
+from src.utils.text_utils import content_defined_chunks
 from src.exceptions.custom_exceptions import (
     NLPServiceException,
     ModelConnectionError,
     InvalidModelResponseError,
     ValidationError,
-    JSONParsingError
+    JSONParsingError,
+    DeadlineExceededError
 )
 
 
 class TextSummarizer:
     def __init__(self):
-        self.client = Client(host=config.ollama_host)
+        self.client = get_ollama_pool()
         self.model = config.model_paths["summarize"]
 
 
@@ -34,10 +41,111 @@ class TextSummarizer:
         
         return text 
         
+    def _format_result(self, text: str, result: dict, options: dict = None, model: str = None) -> dict:
+        """Validate the parsed model output and attach length metadata"""
+        sum_type = (options or {}).get('type', 'abstractive')
+
+        # Validate response
+        if not result.get("summary"):
+            raise InvalidModelResponseError("Missing summary in model response")
+        
+        if not result.get("key_points"):
+            raise InvalidModelResponseError("Missing Key points in model response")
+
+        # Clean currency and numbers
+        result['summary'] = self.clean_currency_numbers(result['summary'])
+
+        # Calculate original text length
+        original_length = len(text.split())
+        summary_length = len(result['summary'].split())
+        compression_ratio = round(1 - (summary_length/original_length), 2) if original_length > 0 else 0
+
+        print(f"Response after validation: {result}")
+        return {
+            "original_text": text,
+            "summary": result['summary'],
+            "metadata": {
+                "original_length": original_length,
+                "summary_length": summary_length,
+                "compression_ratio": compression_ratio,
+                "summary_type": sum_type
+            },
+            "key_points": result['key_points'],
+            "model": model or self.model
+        }
+        
+    def summarize(self, text: str, options: dict = None, model: str = None) -> dict:
+        """
+        Summarize a text
+
+        With the option `"mode": "incremental"` the text is summarized
+        chunk by chunk and the chunk summaries are merged, so re-submitting
+        an edited document only re-summarizes the chunks the edit touched.
+        """
+        options = options or {}
+        if options.get("mode") == "incremental":
+            return self._summarize_incremental(text, options, model)
+        return self._summarize_text(text, options or None, model)
+
+    @cache_response(prefix="summarize_chunk", expire=CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.SUMMARIZE_EXPIRE)
+    def _summarize_chunk(self, text: str, options: Optional[Dict] = None, model: Optional[str] = None) -> dict:
+        """Summary of one chunk, cached by the chunk's content"""
+        return self._generate_summary(text, options, model)
+
+    @cache_response(prefix="summarize_document", expire=CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.SUMMARIZE_EXPIRE)
+    def _summarize_incremental(self, text: str, options: Optional[Dict] = None, model: Optional[str] = None) -> dict:
+        """Summarize content-defined chunks concurrently (each cached on its own), then reduce"""
+        start_time = time.time()
+        model = model or config.get_current_model()
+        settings = config.summarize
+        with timed("segment"):
+            spans = content_defined_chunks(text, settings["min_chunk"], settings["avg_chunk"], settings["max_chunk"])
+
+        reduce_options = {k: v for k, v in options.items() if k != "mode"} if options else None
+
+        # Chunks are summarized with fixed options so an unchanged chunk
+        # hits the cache whatever the request asks of the final summary
+        chunk_options = {"max_length": settings["chunk_summary_words"], "type": "abstractive"}
+
+        def summarize_chunk(span):
+            stats = {}
+            cache_stats.set(stats)  # Runs in its own context copy
+            result = self._summarize_chunk(text[span[0]:span[1]].strip(), chunk_options, model)
+            return result, stats.get("hit", 0) > 0
+
+        if len(spans) == 1:
+            # Nothing to reuse: summarize the text itself as the request
+            # asked, the same as without incremental mode
+            chunks = []
+            reduced = self._summarize_text(text, reduce_options or None, model)
+        else:
+            workers = max(1, min(settings["concurrency"], len(spans)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, summarize_chunk, span) for span in spans]
+            chunks = [future.result() for future in futures]
+
+            # Reduce: summarize the chunk summaries as the request asked
+            merged = "\n\n".join(result["summary"] for result, _ in chunks)
+            reduced = self._summarize_text(merged, reduce_options or None, model)
+
+        result = self._format_result(text, {"summary": reduced["summary"], "key_points": reduced["key_points"]},
+                                     options, model=model)
+        result["metadata"].update({
+            "mode": "incremental",
+            "chunks": len(spans),
+            "chunks_reused": sum(1 for _, reused in chunks if reused),
+            "processing_time_seconds": round(time.time() - start_time, 3)
+        })
+        return result
+
     @cache_response(prefix="summarize", expire=CacheConfig.TEST_EXPIRE if "pytest" in sys.modules else CacheConfig.SUMMARIZE_EXPIRE)
-    def summarize(self, text: str, options: dict = None) -> dict:
+    def _summarize_text(self, text: str, options: Optional[Dict] = None, model: Optional[str] = None) -> dict:
+        """Summary of a whole text in a single model call"""
+        return self._generate_summary(text, options, model)
+
+    def _generate_summary(self, text: str, options: Optional[Dict] = None, model: Optional[str] = None) -> dict:
         try:
-            self.model = config.get_current_model()
+            model = model or config.get_current_model()
             # Set default options 
             if options is None:
                 options = {}
@@ -83,62 +191,22 @@ Text to summarize: {text}
 """
             response = self.client.generate(
                 prompt=prompt,
-                model=self.model,
+                model=model,
                 stream=False
             )
             print(f"Raw Reponse: {response}")
-            try:
-                # Extract the JSON object
-                raw_text = response['response']
-                start = raw_text.find('{')
-                end = raw_text.rfind('}') + 1
-
-                if start == -1 or end == 0:
-                    raise Exception("No JSON object found in response")
-                
-                json_str = raw_text[start:end]
-                result = json.loads(json_str)
-
-                # Clean currency and numbers
-                result['summary'] = self.clean_currency_numbers(result['summary'])
-
-                # Validate response
-                if not result.get("summary"):
-                    raise InvalidModelResponseError("Missing summary in model response")
-                
-                if not result.get("key_points"):
-                    raise InvalidModelResponseError("Missing Key points in model response")
-
-                # Calculate original text length
-                original_length = len(text.split())
-                summary_length = len(result['summary'].split())
-                compression_ratio = round(1 - (summary_length/original_length), 2) if original_length > 0 else 0
-
-                print(f"Response after validation: {result}")
-                analysis = {
-                    "original_text": text,
-                    "summary": result['summary'],
-                    "metadata": {
-                        "original_length": original_length,
-                        "summary_length": summary_length,
-                        "compression_ratio": compression_ratio,
-                        "summary_type": sum_type
-                    },
-                    "key_points": result['key_points'],
-                    "model": self.model
-                }
-
-                print(f"Analysis: {analysis}")
-
-                return analysis
-            
-            except json.JSONDecodeError as e:
-                raise JSONParsingError(f"Failed to parse model response: {str(e)}")
+
+            with timed("parse"):
+                analysis = self._format_result(text, extract_json_object(response['response']), options, model=model)
+            print(f"Analysis: {analysis}")
+
+            return analysis
             
         except Exception as e:
             # If it's our custom exception re-raise it
             if isinstance(e, (ValidationError, ModelConnectionError,
-                              InvalidModelResponseError, JSONParsingError)):
+                              InvalidModelResponseError, JSONParsingError,
+                              DeadlineExceededError)):
                 raise 
             # Otherwise wrap it in a general error
-            raise NLPServiceException(f"Unexpected error in sentiment analysis: {str(e)}")
\ No newline at end of file
+            raise NLPServiceException(f"Unexpected error in summarization: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""Helpers for pulling JSON out of raw model output"""
+
+import json
+from typing import Any, Dict
+from src.exceptions.custom_exceptions import JSONParsingError
+
+
+def extract_json_object(raw_text: str) -> Dict[str, Any]:
+    """
+    Extract the outermost JSON object from raw model output.
+
+    Models often wrap the JSON in prose or markdown fences, so everything
+    before the first '{' and after the last '}' is ignored.
+    """
+    start = raw_text.find('{')
+    end = raw_text.rfind('}') + 1
+
+    if start == -1 or end == 0:
+        raise JSONParsingError("No JSON object found in response")
+
+    try:
+        return json.loads(raw_text[start:end])
+    except json.JSONDecodeError as e:
+        raise JSONParsingError(f"Failed to parse model response: {str(e)}")
@@ -0,0 +1,116 @@
+"""Request-scoped state shared between the API, cache and model layers"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from src.exceptions.custom_exceptions import DeadlineExceededError
+
+# Key used for cache-affine routing to Ollama hosts, set by cache_response
+routing_key: ContextVar[Optional[str]] = ContextVar("routing_key", default=None)
+
+# Service making the current model call ("sentiment", "analyze", ...), for usage accounting
+service: ContextVar[Optional[str]] = ContextVar("service", default=None)
+
+# Absolute time.monotonic() by which the request must finish, set by DeadlineMiddleware
+deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+# Priority class of the request, set by PriorityMiddleware
+priority: ContextVar[Optional[str]] = ContextVar("priority", default=None)
+
+# Cache outcome counters ("hit", "semantic_hit", "miss", "error", ...) for callers that want them
+cache_stats: ContextVar[Optional[Dict[str, int]]] = ContextVar("cache_stats", default=None)
+
+
+class StageTimings:
+    """
+    Time spent per stage of one request, in seconds.
+
+    A stage recorded more than once (several Redis round trips, one
+    Ollama call per streamed line) accumulates. Stages may nest, e.g.
+    `ollama` contains `prompt_eval` and `generation`. Token counts of
+    the request's model calls are summed in `usage`.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.usage: Dict[str, int] = {}
+        self.include_in_metadata = False
+        self._lock = threading.Lock()  # Threadpool work of one request shares this
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_usage(self, usage: Dict[str, int]):
+        with self._lock:
+            self.usage["model_calls"] = self.usage.get("model_calls", 0) + 1
+            for name in ("prompt_tokens", "completion_tokens"):
+                self.usage[name] = self.usage.get(name, 0) + usage.get(name, 0)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def milliseconds(self) -> Dict[str, float]:
+        with self._lock:
+            return {stage: round(seconds * 1000, 2) for stage, seconds in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. `redis;dur=1.2, ollama;dur=812.4`"""
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.milliseconds().items())
+
+
+# Per-stage timings of the current request, set by ServerTimingMiddleware
+timings: ContextVar[Optional[StageTimings]] = ContextVar("timings", default=None)
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, None without one"""
+    current = deadline.get()
+    if current is None:
+        return None
+    return current - time.monotonic()
+
+
+def check_deadline(stage: str):
+    """Drop work whose deadline has already passed"""
+    remaining = time_remaining()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError(f"Request deadline exceeded before {stage}")
+
+
+def record_cache_outcome(outcome: str):
+    """Count a cache hit/miss/error if the caller is collecting cache stats"""
+    stats = cache_stats.get()
+    if stats is not None:
+        stats[outcome] = stats.get(outcome, 0) + 1
+
+
+def record_timing(stage: str, seconds: float):
+    """Add time to a stage if the current request is being timed"""
+    current = timings.get()
+    if current is not None:
+        current.add(stage, seconds)
+
+
+def record_model_usage(usage: Dict[str, int]):
+    """Add a model call's token counts if the current request is being timed"""
+    current = timings.get()
+    if current is not None:
+        current.add_usage(usage)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the time spent in the block as a stage of the current request"""
+    if timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(stage, time.perf_counter() - start)
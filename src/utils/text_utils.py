@@ -0,0 +1,142 @@
+"""Sentence segmentation and content-defined chunking for piecewise analysis of long texts"""
+
+import re
+from typing import List, Tuple
+
+# Words whose trailing period doesn't end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc", "eg", "ie", "inc", "ltd",
+    "co", "corp", "dept", "no", "fig", "approx", "est", "jan", "feb", "mar", "apr", "jun", "jul",
+    "aug", "sep", "sept", "oct", "nov", "dec", "us", "uk", "a.m", "p.m"
+}
+
+# Sentence-ending punctuation with any closing quotes/brackets, followed by whitespace
+_BOUNDARY = re.compile(r"[.!?…]+[\"'”’)\]]*(?=\s)|\n")
+_WORD_BEFORE = re.compile(r"([\w.]+)\.$")
+
+
+def _is_boundary(text: str, match: re.Match) -> bool:
+    if match.group(0) == "\n":
+        return True
+    # The next sentence should start like one
+    rest = text[match.end():].lstrip()
+    if rest and not (rest[0].isupper() or rest[0].isdigit() or rest[0] in "\"'“‘([-*•"):
+        return False
+    if match.group(0).rstrip("\"'”’)]") != ".":
+        return True  # "!", "?", "..." always end a sentence here
+    word = _WORD_BEFORE.search(text[:match.start() + 1])
+    if word is None:
+        return True
+    token = word.group(1).lower().strip(".")
+    # Abbreviations and initials ("J. Smith")
+    return token not in ABBREVIATIONS and token.replace(".", "") not in ABBREVIATIONS and not (
+        len(token) == 1 and token.isalpha()
+    )
+
+
+def _split_long(text: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
+    """Break a run-on sentence at clause punctuation, or whitespace, to fit max_chars"""
+    spans = []
+    while end - start > max_chars:
+        window = text[start:start + max_chars]
+        cut = max(window.rfind(sep) for sep in ("; ", ", ", ": ", " - "))
+        if cut <= max_chars // 4:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = max_chars - 1
+        spans.append((start, start + cut + 1))
+        start += cut + 1
+        while start < end and text[start].isspace():
+            start += 1
+    spans.append((start, end))
+    return spans
+
+
+def split_sentences(text: str, max_chars: int = 500, min_words: int = 3) -> List[Tuple[int, int]]:
+    """
+    Split text into sentences, returned as (start, end) offsets.
+
+    Splits at sentence-ending punctuation (not after common abbreviations,
+    initials or decimals) and at line breaks. Fragments shorter than
+    `min_words` are merged into the previous sentence, and sentences
+    longer than `max_chars` are broken at clause boundaries.
+    """
+    spans: List[Tuple[int, int]] = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        if _is_boundary(text, match):
+            spans.append((start, match.end()))
+            start = match.end()
+    spans.append((start, len(text)))
+
+    sentences: List[Tuple[int, int]] = []
+    for start, end in spans:
+        # Trim surrounding whitespace
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start == end:
+            continue
+        if sentences and len(text[start:end].split()) < min_words:
+            sentences[-1] = (sentences[-1][0], end)
+        else:
+            sentences.append((start, end))
+
+    result = []
+    for start, end in sentences:
+        result.extend(_split_long(text, start, end, max_chars))
+    return result
+
+
+def group_spans(spans: List[Tuple[int, int]], max_groups: int) -> List[Tuple[int, int]]:
+    """Merge adjacent spans evenly so there are at most max_groups"""
+    if len(spans) <= max_groups:
+        return spans
+    size = -(-len(spans) // max_groups)
+    return [(spans[i][0], spans[min(i + size, len(spans)) - 1][1]) for i in range(0, len(spans), size)]
+
+
+# Rolling hash over a window of characters, modulo a Mersenne prime
+_HASH_BASE = 257
+_HASH_MOD = (1 << 61) - 1
+
+
+def content_defined_chunks(text: str, min_size: int = 500, avg_size: int = 1500, max_size: int = 4000,
+                           window: int = 32) -> List[Tuple[int, int]]:
+    """
+    Split text into chunks at content-defined boundaries, as (start, end) offsets.
+
+    A rolling hash of the last `window` characters picks cut points: past
+    `min_size` characters, a chunk ends at the first whitespace after a
+    position whose hash is 0 modulo `avg_size - min_size`. Since a cut
+    depends only on nearby text, an edit moves at most the boundaries
+    around it and the other chunks come out identical. Chunks without a
+    cut point by `max_size` end at their last whitespace. The chunks
+    cover the text exactly.
+    """
+    divisor = max(1, avg_size - min_size)
+    drop = pow(_HASH_BASE, window, _HASH_MOD)  # Weight of the character leaving the window
+    spans: List[Tuple[int, int]] = []
+    start, value, cut_pending = 0, 0, False
+    for i, char in enumerate(text):
+        value = (value * _HASH_BASE + ord(char)) % _HASH_MOD
+        if i >= window:
+            value = (value - ord(text[i - window]) * drop) % _HASH_MOD
+
+        length = i + 1 - start
+        if length < min_size:
+            continue
+        if value % divisor == 0:
+            cut_pending = True
+        if cut_pending and char.isspace():
+            spans.append((start, i + 1))
+            start, cut_pending = i + 1, False
+        elif length >= max_size:
+            space = max(text.rfind(" ", start + min_size, i + 1), text.rfind("\n", start + min_size, i + 1))
+            end = space + 1 if space >= 0 else i + 1
+            spans.append((start, end))
+            start, cut_pending = end, False
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
@@ -0,0 +1,259 @@
+"""Trace spans across the API, cache, Redis and model layers"""
+
+import importlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.config.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    sampled = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.start = time.time()
+        self._start = time.perf_counter()
+        self.duration = 0.0
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def end(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stands in for spans that are not recorded (tracing off or trace not sampled)"""
+
+    sampled = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+# Innermost open span of the current request, parent of the next one
+current_span: ContextVar[Optional[Any]] = ContextVar("current_span", default=None)
+
+
+class SpanExporter:
+    """
+    Where finished spans go.
+
+    `sample` is asked once per trace, when its root span starts; every
+    span of a sampled trace is then exported, so traces are kept whole.
+    """
+
+    def sample(self, trace_id: str) -> bool:
+        return True
+
+    def export(self, span: Dict[str, Any]):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class JSONLExporter(SpanExporter):
+    """Append spans as JSON lines to a local file, keeping `sample_rate` of traces"""
+
+    def __init__(self, path: str, sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", buffering=1)  # Line buffered: complete spans survive a crash
+        self._lock = threading.Lock()
+
+    def sample(self, trace_id: str) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def export(self, span: Dict[str, Any]):
+        line = json.dumps(span, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Open spans nested under the current one, handing finished spans to the exporter"""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None):
+        self.exporter = exporter
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Any]:
+        """
+        Record the block as a span, yielding it so attributes can be added.
+
+        Exceptions mark the span as an error and propagate.
+        """
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+
+        parent = current_span.get()
+        if parent is NOOP_SPAN:
+            yield NOOP_SPAN  # Somewhere inside an unsampled trace
+            return
+        if parent is None:
+            trace_id = os.urandom(16).hex()
+            if not self.exporter.sample(trace_id):
+                token = current_span.set(NOOP_SPAN)
+                try:
+                    yield NOOP_SPAN
+                finally:
+                    current_span.reset(token)
+                return
+            span = Span(name, trace_id, None, attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attributes)
+
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set_attribute("error", f"{type(e).__name__}: {str(e)}")
+            raise
+        finally:
+            current_span.reset(token)
+            span.end()
+            try:
+                self.exporter.export(span.to_dict())
+            except Exception as e:
+                logger.warning(f"Failed to export span {name}: {str(e)}")
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+def load_exporter(settings: Dict[str, Any]) -> Optional[SpanExporter]:
+    """
+    Build the configured exporter
+
+    `exporter` is "jsonl" or an import path ("package.module:ClassName")
+    to a SpanExporter subclass, which gets the tracing settings as
+    keyword arguments.
+    """
+    if not settings["enabled"]:
+        return None
+    name = settings["exporter"]
+    if name == "jsonl":
+        return JSONLExporter(settings["path"], settings["sample_rate"])
+    module_name, _, class_name = name.partition(":")
+    exporter_class = getattr(importlib.import_module(module_name), class_name)
+    return exporter_class(**{k: v for k, v in settings.items() if k not in ("enabled", "exporter")})
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer, built from config on first use"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(load_exporter(config.tracing))
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """Replace the process-wide tracer (None: rebuild from config), returning the previous one"""
+    global _tracer
+    with _tracer_lock:
+        previous, _tracer = _tracer, tracer
+    return previous
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize_spans(spans: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate exported spans for offline analysis
+
+    Spans are grouped by name and the attribute telling instances apart
+    (service, host or Redis operation). Each group gets its count, error
+    count, latency percentiles, total time, share of the time spent in
+    root spans, and cache hit ratio for cached services.
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    traces, root_ms = set(), 0.0
+    for span in spans:
+        attributes = span.get("attributes") or {}
+        key = span["name"]
+        for attribute in ("service", "host", "operation"):
+            if attribute in attributes:
+                key = f"{key}[{attributes[attribute]}]"
+                break
+        group = groups.setdefault(key, {"durations": [], "errors": 0, "cache": {}})
+        group["durations"].append(span["duration_ms"])
+        group["errors"] += span.get("status") == "error"
+        if "cache" in attributes:
+            group["cache"][attributes["cache"]] = group["cache"].get(attributes["cache"], 0) + 1
+        traces.add(span["trace_id"])
+        if span.get("parent_id") is None:
+            root_ms += span["duration_ms"]
+
+    summary = {}
+    for key, group in sorted(groups.items()):
+        durations = sorted(group["durations"])
+        total = sum(durations)
+        summary[key] = {
+            "count": len(durations),
+            "errors": group["errors"],
+            "p50_ms": _percentile(durations, 0.50),
+            "p95_ms": _percentile(durations, 0.95),
+            "p99_ms": _percentile(durations, 0.99),
+            "total_ms": round(total, 3),
+            "share_of_root": round(total / root_ms, 4) if root_ms else None
+        }
+        if group["cache"]:
+            looked_up = sum(group["cache"].values())
+            summary[key]["cache_hit_ratio"] = round(group["cache"].get("hit", 0) / looked_up, 4)
+    return {"traces": len(traces), "root_ms": round(root_ms, 3), "spans": summary}
@@ -16,9 +16,9 @@ def client():
 def clear_cache():
     """Clear cache before and after each test"""
     cache_manager = CacheManager()
-    cache_manager.redis.flush()
+    cache_manager.backend.flush()
     yield
-    cache_manager.redis.flush()
+    cache_manager.backend.flush()
 
 @pytest.fixture(autouse=True)
 def cleanup_models():
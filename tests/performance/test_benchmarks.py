@@ -0,0 +1,24 @@
+import json
+
+from performance_tests.benchmarks import build_benchmarks, compare, main
+
+
+def test_every_benchmark_runs_without_services():
+    """The suite needs neither Ollama nor Redis"""
+    for name, func in build_benchmarks().items():
+        assert func() is not None, name
+
+def test_compare_flags_regressions():
+    results = {"a": {"min_us": 13.0}, "b": {"min_us": 5.0}, "c": {"min_us": 1.0}}
+    baseline = {"a": {"min_us": 10.0}, "b": {"min_us": 10.0}}
+    lines, regressions = compare(results, baseline, threshold=1.25)
+    assert regressions == ["a"]
+    assert "faster" in lines[1]
+    assert "(new)" in lines[2]
+
+def test_save_baseline(tmp_path):
+    path = tmp_path / "baseline.json"
+    assert main(["--filter", "generate_key/short", "--repeat", "2", "--min-time", "0.01", "--save", str(path)]) == 0
+    saved = json.loads(path.read_text())
+    assert list(saved["results"]) == ["generate_key/short"]
+    assert saved["results"]["generate_key/short"]["min_us"] > 0
@@ -0,0 +1,111 @@
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from performance_tests.ollama_stub import embed, parse_latency, start_stub
+from src.api.models import NERResponse, SentimentResponse, SummarizationResponse, TextClassificationResponse
+from src.config.config import config
+from src.inference.ollama_pool import OllamaPool
+from src.models.joint_analyzer import JointAnalyzer
+from src.models.ner_analyzer import NERAnalyzer
+from src.models.sentiment_analyzer import SentimentAnalyzer
+from src.models.text_classifier import TextClassifier
+from src.models.text_summarizer import TextSummarizer
+
+TEXT = "Satya Nadella said Microsoft had a great quarter. Revenue grew in Seattle and Berlin. Investors love it."
+
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = start_stub(seed=1)
+    yield server
+    stop(server)
+
+@pytest.fixture
+def pool(stub):
+    pool = OllamaPool([stub.url], settings={"health_interval": 3600})
+    yield pool
+    pool.stop()
+
+
+def with_pool(analyzer, pool):
+    analyzer.client = pool
+    return analyzer
+
+
+def test_service_prompts_get_valid_results(pool):
+    """Every analyzer accepts the stub's generations as real model output"""
+    sentiment = with_pool(SentimentAnalyzer(), pool).analyze(TEXT[:500])
+    ner = with_pool(NERAnalyzer(), pool).analyze(TEXT)
+    classify = with_pool(TextClassifier(), pool).classify(TEXT, {"categories": ["Business", "Sports"]})
+    summary = with_pool(TextSummarizer(), pool).summarize(TEXT * 3)
+
+    SentimentResponse.model_validate(sentiment)
+    NERResponse.model_validate(ner)
+    TextClassificationResponse.model_validate(classify)
+    SummarizationResponse.model_validate(summary)
+    assert sentiment["sentiment"] == "POSITIVE"
+    assert {"Microsoft", "Seattle"} <= {entity["text"] for entity in ner["entities"]}
+    assert classify["primary_category"] in ("Business", "Sports")
+
+def test_joint_prompt_answers_every_task(pool):
+    analyzers = SimpleNamespace(sentiment_analyzer=SentimentAnalyzer(), ner_analyzer=NERAnalyzer(),
+                                classifier=TextClassifier(), summarizer=TextSummarizer())
+    joint = with_pool(JointAnalyzer(analyzers), pool)
+    result = joint.analyze(TEXT, {"sentiment": None, "ner": None, "classify": {"categories": ["Business", "Sports"]}})
+    assert not result.get("errors")
+    assert result["metadata"]["computed_tasks"] == ["sentiment", "ner", "classify"]
+
+def test_latency_and_token_durations(stub):
+    stub.latency = parse_latency("fixed:0.05")
+    stub.tokens_per_second = 1000
+    body = {"model": config.get_current_model(), "prompt": "x" * 400, "stream": False}
+    response = httpx.post(f"{stub.url}/api/generate", json=body, timeout=5).json()
+
+    assert response["load_duration"] == 50_000_000
+    assert response["eval_count"] > 0
+    assert response["eval_duration"] == pytest.approx(response["eval_count"] / 1000 * 1e9, rel=0.01)
+    assert response["prompt_eval_count"] == 100
+
+def test_failure_injection(stub):
+    stub.error_rate = 1.0
+    body = {"model": config.get_current_model(), "prompt": "hi"}
+    assert httpx.post(f"{stub.url}/api/generate", json=body).status_code == 500
+
+    stub.error_rate, stub.malformed_rate = 0.0, 1.0
+    response = httpx.post(f"{stub.url}/api/generate", json={**body, "prompt": "Analyze this text: \"good\" sentiment analyzer"})
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(response.json()["response"])
+    assert stub.stats["errors"] == 1 and stub.stats["malformed"] == 1
+
+def test_embeddings_are_deterministic_and_similar_for_similar_text(stub):
+    response = httpx.post(f"{stub.url}/api/embed", json={"model": "nomic-embed-text", "input": ["great phone", "great phone", "bad weather"]}).json()
+    first, again, other = response["embeddings"]
+    assert first == again == embed("great phone", 256)
+    assert sum(a * b for a, b in zip(first, embed("a great phone", 256))) > sum(a * b for a, b in zip(first, other))
+
+def test_record_then_replay(tmp_path, stub):
+    """Responses recorded through an upstream are served back without it"""
+    recording = tmp_path / "recording.jsonl"
+    body = {"model": config.get_current_model(), "prompt": "Analyze this text: \"I love it\" sentiment analyzer"}
+    recorder = start_stub(upstream=stub.url, record=str(recording))
+    try:
+        recorded = httpx.post(f"{recorder.url}/api/generate", json=body).json()
+    finally:
+        stop(recorder)
+
+    replayer = start_stub(replay=str(recording), seed=99)
+    try:
+        replayed = httpx.post(f"{replayer.url}/api/generate", json={**body, "keep_alive": "5m"}).json()
+    finally:
+        stop(replayer)
+    assert replayed == recorded
+    assert replayer.stats["replayed"] == 1
+    assert stub.stats["generate"] == 1
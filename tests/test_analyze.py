@@ -0,0 +1,97 @@
+from tests.conftest import client
+
+def test_empty_tasks(client):
+    """Test request without any task"""
+    response = client.post(
+        "/api/v1/analyze",
+        json={"text": "Tesla opens a new factory in Berlin", "tasks": []}
+    )
+    assert response.status_code == 422
+
+def test_unknown_task(client):
+    """Test request with an unsupported task"""
+    response = client.post(
+        "/api/v1/analyze",
+        json={"text": "Tesla opens a new factory in Berlin", "tasks": ["translate"]}
+    )
+    assert response.status_code == 422
+
+def test_per_task_validation(client):
+    """Test that each task's own input rules are applied"""
+    response = client.post(
+        "/api/v1/analyze",
+        json={"text": "Tesla", "tasks": ["sentiment", "ner"]}
+    )
+    assert response.status_code == 422
+    data = response.json()
+    assert any("two words" in str(error).lower() for error in data["detail"])
+
+def test_options_for_unrequested_task(client):
+    """Test options given for a task that was not requested"""
+    response = client.post(
+        "/api/v1/analyze",
+        json={
+            "text": "Tesla opens a new factory in Berlin",
+            "tasks": ["sentiment"],
+            "options": {"classify": {"multi_label": True}}
+        }
+    )
+    assert response.status_code == 422
+
+def test_successful_joint_analysis(client):
+    """Test sentiment, NER and classification in one call"""
+    test_text = "Tesla opens a new factory in Berlin and investors love it"
+    response = client.post(
+        "/api/v1/analyze",
+        json={"text": test_text, "tasks": ["sentiment", "ner", "classify"]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["text"] == test_text
+    assert data["summarize"] is None
+
+    assert data["sentiment"]["sentiment"] in ["POSITIVE", "NEGATIVE", "NEUTRAL"]
+    assert 0 <= data["sentiment"]["confidence"] <= 1
+    for entity in data["ner"]["entities"]:
+        assert all(k in entity for k in ["text", "type", "start", "end"])
+    assert isinstance(data["classify"]["primary_category"], str)
+    assert sorted(data["metadata"]["computed_tasks"]) == ["classify", "ner", "sentiment"]
+
+def test_joint_analysis_fills_service_caches(client):
+    """Test that single-service calls after a joint call are cache hits"""
+    test_text = "Microsoft announces record profits for the quarter"
+    response = client.post(
+        "/api/v1/analyze",
+        json={
+            "text": test_text,
+            "tasks": ["sentiment", "classify"],
+            "options": {"classify": {"multi_label": True}}
+        }
+    )
+    assert response.status_code == 200
+    data = response.json()
+
+    sentiment = client.post("/api/v1/sentiment", json={"text": test_text})
+    assert sentiment.status_code == 200
+    assert sentiment.json() == data["sentiment"]
+
+    classify = client.post(
+        "/api/v1/classify",
+        json={"text": test_text, "options": {"multi_label": True}}
+    )
+    assert classify.status_code == 200
+    assert classify.json() == data["classify"]
+
+def test_cached_tasks_are_not_recomputed(client):
+    """Test that tasks already cached by a single-service call are reused"""
+    test_text = "Apple unveils a new iPhone in California"
+    client.post("/api/v1/sentiment", json={"text": test_text})
+
+    response = client.post(
+        "/api/v1/analyze",
+        json={"text": test_text, "tasks": ["sentiment", "ner"]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["metadata"]["cached_tasks"] == ["sentiment"]
+    assert data["metadata"]["computed_tasks"] == ["ner"]
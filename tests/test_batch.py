@@ -0,0 +1,122 @@
+import csv
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.batch.io import PartWriter, read_rows
+from src.batch.runner import BatchRunner
+from src.exceptions.custom_exceptions import ModelConnectionError
+from src.utils.request_context import record_cache_outcome
+
+TEXTS = ["Phones are getting faster", "The striker scored twice", "Phones are getting faster", "Rates went up again"]
+
+
+class Crash(BaseException):
+    """Simulates the process dying mid-run"""
+
+
+class FakeHandler:
+    def __init__(self, crash_after=None, fail_on=None, cached=()):
+        self.calls = []
+        self.crash_after = crash_after
+        self.fail_on = fail_on
+        self.cached = set(cached)
+
+    def __call__(self, text, options):
+        if self.crash_after is not None and len(self.calls) >= self.crash_after:
+            raise Crash()
+        self.calls.append(text)
+        if text == self.fail_on:
+            raise ModelConnectionError("host down")
+        record_cache_outcome("hit" if text in self.cached else "miss")
+        return {"text": text, "categories": [{"category": "tech", "confidence": 0.9}]}
+
+
+def write_input(tmp_path, fmt, texts=TEXTS):
+    path = tmp_path / f"input.{fmt}"
+    records = [{"id": f"r{i}", "text": text} for i, text in enumerate(texts)]
+    if fmt == "csv":
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=["id", "text"])
+            writer.writeheader()
+            writer.writerows(records)
+    elif fmt == "jsonl":
+        path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    else:
+        pq.write_table(pa.Table.from_pylist(records), path)
+    return str(path)
+
+def read_output(output_dir, fmt="parquet"):
+    writer = PartWriter(str(output_dir), fmt)
+    rows = []
+    part = 0
+    while (output_dir / f"part-{part:05d}.{fmt}").exists():
+        rows.extend(zip(*(writer.read_column(part, column) for column in ("row", "id", "duplicate", "result", "error_code"))))
+        part += 1
+    return rows
+
+def make_runner(handler, output_dir, fmt="parquet", chunk_size=2):
+    return BatchRunner(handler, "classify", None, PartWriter(str(output_dir), fmt), concurrency=2, chunk_size=chunk_size)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "parquet"])
+def test_readers_stream_rows(tmp_path, fmt):
+    path = write_input(tmp_path, fmt)
+    rows = list(read_rows(path, fmt, id_column="id"))
+    assert rows == [(i, f"r{i}", text) for i, text in enumerate(TEXTS)]
+
+def test_duplicates_processed_once(tmp_path):
+    """Repeated texts are written as duplicates without another model call"""
+    handler = FakeHandler(cached={"Rates went up again"})
+    output = tmp_path / "out"
+    report = make_runner(handler, output).run(read_rows(write_input(tmp_path, "csv"), "csv", id_column="id"), "input.csv")
+
+    assert len(handler.calls) == 3
+    rows = read_output(output)
+    assert [row[0] for row in rows] == [0, 1, 2, 3]
+    assert [row[2] for row in rows] == [False, False, True, False]
+    assert rows[2][3] is None
+    assert json.loads(rows[0][3])["text"] == TEXTS[0]
+    assert report["rows"] == 4
+    assert report["duplicates"] == 1
+    assert report["cache_hits"] == 1
+    assert report["cache_hit_ratio"] == round(1 / 3, 4)
+
+def test_errors_recorded_per_row(tmp_path):
+    handler = FakeHandler(fail_on="The striker scored twice")
+    output = tmp_path / "out"
+    report = make_runner(handler, output, fmt="arrow").run(
+        read_rows(write_input(tmp_path, "jsonl"), "jsonl"), "input.jsonl"
+    )
+    rows = read_output(output, "arrow")
+    assert rows[1][4] == "MODEL_CONNECTION ERROR"
+    assert report["errors"] == 1
+
+def test_resume_after_crash(tmp_path):
+    """A restarted run continues after the last checkpointed part"""
+    path = write_input(tmp_path, "parquet", TEXTS + ["Inflation eased in May", "The striker scored twice"])
+    output = tmp_path / "out"
+
+    with pytest.raises(Crash):
+        make_runner(FakeHandler(crash_after=3), output).run(read_rows(path, "parquet"), path)
+    assert len(read_output(output)) == 4  # Two complete parts of two rows
+
+    handler = FakeHandler()
+    report = make_runner(handler, output).run(read_rows(path, "parquet"), path)
+
+    assert handler.calls == ["Inflation eased in May"]  # The last row is a duplicate of an earlier part
+    rows = read_output(output)
+    assert [row[0] for row in rows] == [0, 1, 2, 3, 4, 5]
+    assert rows[5][2] is True
+    assert report["rows"] == 6
+
+def test_checkpoint_from_other_run_rejected(tmp_path):
+    path = write_input(tmp_path, "csv")
+    output = tmp_path / "out"
+    make_runner(FakeHandler(), output).run(read_rows(path, "csv"), path)
+
+    runner = BatchRunner(FakeHandler(), "sentiment", None, PartWriter(str(output)), chunk_size=2)
+    with pytest.raises(ValueError, match="different run"):
+        runner.run(read_rows(path, "csv"), path)
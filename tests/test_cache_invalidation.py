@@ -0,0 +1,138 @@
+import json
+import shutil
+import time
+
+import pytest
+
+from tests.conftest import client
+from tests.test_redis_sharding import cluster, free_port, start_redis
+from src.api.router import models
+from src.cache.cache_manager import cache_tags
+from src.cache.redis_client import RedisClient
+from src.cache.sqlite_backend import SQLiteCache
+from src.config.config import config
+
+needs_redis = pytest.mark.skipif(shutil.which("redis-server") is None, reason="redis-server not installed")
+
+CLASSIFICATION = {
+    "primary_category": "Technology",
+    "confidence": 0.9,
+    "all_categories": [{"category": "Technology", "confidence": 0.9}],
+    "explanation": "About software"
+}
+SENTIMENT = {"sentiment": "POSITIVE", "confidence": 0.9, "explanation": "Likes it"}
+
+
+class CountingClient:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def generate(self, model, prompt, **kwargs):
+        self.calls += 1
+        return {"response": json.dumps(self.response)}
+
+
+@pytest.fixture(params=["sqlite", pytest.param("redis", marks=needs_redis), pytest.param("sharded", marks=needs_redis)])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        yield SQLiteCache(str(tmp_path / "cache.db"))
+    elif request.param == "redis":
+        port = free_port()
+        server = start_redis(tmp_path, port)
+        yield RedisClient({"port": port, "password": None})
+        server.terminate()
+        server.wait()
+    else:
+        nodes, _ = request.getfixturevalue("cluster")
+        sharded = RedisClient({"nodes": nodes, "password": None})
+        yield sharded
+        sharded.flush()
+
+
+def fill(store, count=25):
+    for model in ("qwen2.5:3b", "llama3.2:3b"):
+        for prefix in ("classify", "sentiment"):
+            for i in range(count):
+                assert store.set(f"{prefix}:{model}:{i}", {"i": i}, 60, tags=cache_tags(prefix, model))
+
+
+def test_tags():
+    assert cache_tags("summarize_chunk", "gemma2:2b") == ["service:summarize", "model:gemma2:2b", "prompt:summarize:1"]
+    default = cache_tags("classify", "qwen2.5:3b")
+    assert default[-1] == "categories:default"
+    custom = cache_tags("classify", "qwen2.5:3b", {"categories": ["Sports", "Politics"]})
+    assert custom[-1] == cache_tags("classify", "qwen2.5:3b", {"categories": ["Politics", "Sports"]})[-1]
+    assert custom[-1] != default[-1]
+
+def test_invalidates_only_entries_with_every_tag(store):
+    fill(store)
+    counts = store.invalidate(["service:classify", "model:qwen2.5:3b"], batch_size=10)
+    assert counts["matched"] == counts["deleted"] == 25
+    assert counts["batches"] >= 3  # At most 10 keys each
+
+    assert not store.get_many([f"classify:qwen2.5:3b:{i}" for i in range(25)])
+    for key in ("classify:llama3.2:3b", "sentiment:qwen2.5:3b", "sentiment:llama3.2:3b"):
+        assert len(store.get_many([f"{key}:{i}" for i in range(25)])) == 25
+    assert store.invalidate(["service:classify", "model:qwen2.5:3b"])["matched"] == 0
+
+def test_batch_writes_are_tagged(store):
+    items = {f"classify:qwen2.5:3b:{i}": {"i": i} for i in range(20)}
+    assert store.set_many(items, 60, tags=cache_tags("classify", "qwen2.5:3b"))
+    assert store.invalidate(["service:classify", "model:qwen2.5:3b"])["deleted"] == 20
+    assert not store.get_many(list(items))
+
+@needs_redis
+def test_expired_members_trimmed_from_tag_sets(tmp_path):
+    port = free_port()
+    server = start_redis(tmp_path, port)
+    try:
+        redis = RedisClient({"port": port, "password": None})
+        for i in range(10):
+            redis.set(f"sentiment:m:{i}", {"i": i}, 1, tags=["service:sentiment"])
+        time.sleep(1.1)
+        redis.set("sentiment:m:live", {"i": 10}, 60, tags=["service:sentiment"])
+        assert redis.client.zrange("tag:service:sentiment", 0, -1) == ["sentiment:m:live"]
+        assert redis.invalidate(["service:sentiment"]) == {"matched": 1, "deleted": 1, "batches": 1}
+    finally:
+        server.terminate()
+        server.wait()
+
+def test_dry_run_only_counts(store):
+    fill(store, count=5)
+    assert store.invalidate(["prompt:sentiment:1"], dry_run=True) == {"matched": 10, "deleted": 0, "batches": 0}
+    assert store.get("sentiment:qwen2.5:3b:0") == {"i": 0}
+
+def test_admin_endpoint_keeps_sentiment_cache(client, monkeypatch):
+    monkeypatch.setitem(config.api, "admin_key", "secret")
+    models.classifier.client = CountingClient(CLASSIFICATION)
+    models.sentiment_analyzer.client = CountingClient(SENTIMENT)
+    for model in ("qwen2.5:3b", "llama3.2:3b"):
+        models.classifier.classify("A new release of the compiler", model=model)
+        models.sentiment_analyzer.analyze("I love it", model=model)
+
+    response = client.post("/api/v1/admin/cache/invalidate", json={"tags": ["service:classify", "model:qwen2.5:3b"]},
+                           headers={"X-Admin-Key": "secret"})
+    assert response.status_code == 200
+    assert response.json()["deleted"] == 1 and response.json()["dry_run"] is False
+
+    for model in ("qwen2.5:3b", "llama3.2:3b"):
+        models.classifier.classify("A new release of the compiler", model=model)
+        models.sentiment_analyzer.analyze("I love it", model=model)
+    assert models.classifier.client.calls == 3  # Only the invalidated entry was recomputed
+    assert models.sentiment_analyzer.client.calls == 2
+
+def test_admin_key_required_when_configured(client, monkeypatch):
+    monkeypatch.setitem(config.api, "admin_key", "secret")
+    body = {"tags": ["service:classify"]}
+    assert client.post("/api/v1/admin/cache/invalidate", json=body).status_code == 403
+    response = client.post("/api/v1/admin/cache/invalidate", json=body, headers={"X-Admin-Key": "secret"})
+    assert response.status_code == 200
+    assert client.post("/api/v1/admin/cache/invalidate", json={"tags": []}).status_code == 422
+
+def test_admin_endpoint_disabled_without_key(client, monkeypatch):
+    monkeypatch.setitem(config.api, "admin_key", None)
+    body = {"tags": ["service:classify"]}
+    assert client.post("/api/v1/admin/cache/invalidate", json=body).status_code == 403
+    response = client.post("/api/v1/admin/cache/invalidate", json=body, headers={"X-Admin-Key": ""})
+    assert response.status_code == 403
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+
+from src.api.error_handler import nlp_exception_handler
+from src.exceptions.custom_exceptions import CircuitOpenError, ModelConnectionError
+from src.inference.circuit_breaker import CircuitBreaker, RetryBudget, backoff_delay
+from src.inference.ollama_pool import OllamaPool
+from tests.test_ollama_pool import start_stub
+
+
+def test_breaker_opens_after_threshold():
+    """Consecutive failures open the circuit"""
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.try_acquire()
+    assert 0 < breaker.retry_after() <= 60
+
+def test_breaker_half_open_trial():
+    """After the reset timeout one trial call decides the next state"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1, half_open_max_calls=1)
+    breaker.record_failure()
+    time.sleep(0.15)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.try_acquire()
+    assert not breaker.try_acquire()  # Only one trial call at a time
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.15)
+    assert breaker.try_acquire()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_retry_budget_caps_retries():
+    """Retries stay within the configured fraction of requests"""
+    budget = RetryBudget(ratio=0.25, min_per_second=0, max_tokens=100)
+    for _ in range(40):
+        budget.deposit()
+
+    retries = 0
+    while budget.try_withdraw():
+        retries += 1
+    assert retries == 10
+
+def test_backoff_delay_is_capped():
+    """Jittered backoff never exceeds the cap"""
+    assert all(0 <= backoff_delay(attempt, 0.1, 1.0) <= 1.0 for attempt in range(1, 20))
+
+
+@pytest.fixture
+def failing_stubs():
+    servers = [start_stub(["llama3.2:3b"]) for _ in range(2)]
+    for server in servers:
+        server.healthy = False  # 503 on every generate call
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def make_pool(servers, max_retries=2):
+    return OllamaPool(
+        [server.url for server in servers],
+        settings={"health_interval": 3600, "unhealthy_threshold": 100},
+        breaker_settings={"failure_threshold": 2, "reset_timeout": 30},
+        retry_settings={"max_retries": max_retries, "backoff_base": 0.01, "backoff_cap": 0.02,
+                        "budget_ratio": 0.1, "budget_min_per_second": 0}
+    )
+
+def test_failed_call_retries_on_other_host(failing_stubs):
+    """A failed call is retried on another host while the budget allows"""
+    pool = make_pool(failing_stubs)
+    pool.retry_budget._tokens = 1.0
+    with pytest.raises(ModelConnectionError):
+        pool.generate(model="llama3.2:3b", prompt="hi")
+    assert pool.retry_budget.snapshot()["retries"] == 1
+    assert pool.retry_budget.snapshot()["exhausted"] == 1
+    pool.stop()
+
+def test_open_circuits_fail_fast(failing_stubs):
+    """Once every circuit is open, calls fail immediately with a retry hint"""
+    pool = make_pool(failing_stubs, max_retries=0)
+    for _ in range(4):
+        with pytest.raises(ModelConnectionError):
+            pool.generate(model="llama3.2:3b", prompt="hi")
+
+    start = time.time()
+    with pytest.raises(CircuitOpenError) as exc_info:
+        pool.generate(model="llama3.2:3b", prompt="hi")
+    assert time.time() - start < 0.1
+    assert exc_info.value.retry_after >= 1
+    assert all(state["state"] == "open" for state in pool.breaker_snapshot().values())
+    pool.stop()
+
+def test_circuit_open_response_has_retry_after():
+    """Open circuits are reported as 503 with Retry-After"""
+    response = asyncio.run(nlp_exception_handler(None, CircuitOpenError(retry_after=12.3)))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "13"
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from tests.conftest import client
+from tests.test_ollama_pool import start_stub
+from src.api.router import models
+from src.inference.ollama_pool import OllamaPool
+
+
+@pytest.fixture
+def slow_model():
+    """Point the sentiment analyzer at a stub Ollama that takes 2s per call"""
+    server = start_stub(["llama3.2:3b"], delay=2.0)
+    pool = OllamaPool([server.url], settings={"health_interval": 3600})
+    models.sentiment_analyzer.client = pool
+    yield server
+    pool.stop()
+    server.shutdown()
+    server.server_close()
+
+
+def test_model_call_uses_remaining_budget(client, slow_model):
+    """A slow model call is cut off at the request deadline"""
+    start = time.time()
+    response = client.post(
+        "/api/v1/sentiment",
+        json={"text": "The battery life is decent"},
+        headers={"X-Request-Timeout": "0.5"}
+    )
+    elapsed = time.time() - start
+
+    assert response.status_code == 504
+    assert response.json()["error"]["code"] == "DEADLINE_EXCEEDED"
+    assert elapsed < 1.5
+
+def test_expired_request_never_reaches_model(client, slow_model):
+    """Work whose deadline already passed is dropped before the model call"""
+    response = client.post(
+        "/api/v1/sentiment",
+        json={"text": "The screen is bright and sharp"},
+        headers={"X-Request-Timeout": "0"}
+    )
+    assert response.status_code == 504
+    assert slow_model.hits == 0
+
+def test_invalid_timeout_header_uses_default(client, slow_model):
+    """A malformed header falls back to the configured timeout"""
+    slow_model.delay = 0
+    response = client.post(
+        "/api/v1/sentiment",
+        json={"text": "Shipping was fast"},
+        headers={"X-Request-Timeout": "soon"}
+    )
+    assert response.status_code == 400  # Stub output isn't a sentiment, but the call went through
+    assert slow_model.hits == 1
@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import pytest
+
+from tests.conftest import client
+from src.exceptions.custom_exceptions import ModelConnectionError
+from src.jobs.job_queue import JobQueue
+from src.jobs.worker import JobWorker
+
+
+class FakeClassifier:
+    """Stands in for TextClassifier so jobs run without a model"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+        self.models = []
+
+    def classify(self, text, options=None, model=None):
+        self.calls.append(text)
+        self.models.append(model)
+        if self.error is not None:
+            raise self.error
+        return {"text": text, "categories": [{"category": "tech", "confidence": 0.9}], "model": "stub"}
+
+
+def make_worker(classifier, consumer="worker-0", **settings):
+    queue = JobQueue(settings=settings)
+    queue.ensure_group()
+    return JobWorker(queue, SimpleNamespace(classifier=classifier), consumer)
+
+
+def create_job(client, items):
+    response = client.post("/api/v1/jobs", json={"task": "classify", "items": items})
+    assert response.status_code == 202
+    return response.json()
+
+def test_job_processed_by_worker(client):
+    """Workers fill in results and the job reports progress and pages"""
+    classifier = FakeClassifier()
+    worker = make_worker(classifier)
+    job = create_job(client, ["Phones are getting faster", "The striker scored twice", "Rates went up again"])
+    assert job["status"] == "queued"
+    assert job["total"] == 3
+
+    assert worker.run_once(block_ms=100) == 3
+    assert set(classifier.models) == {job["model"]}
+
+    response = client.get(f"/api/v1/jobs/{job['job_id']}", params={"limit": 2})
+    body = response.json()
+    assert body["status"] == "completed"
+    assert body["progress"] == 1.0
+    assert body["succeeded"] == 3
+    assert [item["index"] for item in body["results"]] == [0, 1]
+    assert body["results"][0]["result"]["text"] == "Phones are getting faster"
+    assert body["next_offset"] == 2
+
+    body = client.get(f"/api/v1/jobs/{job['job_id']}", params={"offset": 2}).json()
+    assert [item["index"] for item in body["results"]] == [2]
+    assert body["next_offset"] is None
+
+def test_failed_item_retried_then_recorded(client):
+    """Retryable failures are requeued until max_attempts, then stored as errors"""
+    classifier = FakeClassifier(error=ModelConnectionError("host down"))
+    worker = make_worker(classifier, max_attempts=2)
+    job = create_job(client, ["Phones are getting faster"])
+
+    worker.run_once(block_ms=100)
+    assert client.get(f"/api/v1/jobs/{job['job_id']}").json()["status"] == "running"
+
+    worker.run_once(block_ms=100)
+    body = client.get(f"/api/v1/jobs/{job['job_id']}").json()
+    assert len(classifier.calls) == 2
+    assert body["status"] == "completed"
+    assert body["failed"] == 1
+    assert body["results"][0]["error"]["code"] == "MODEL_CONNECTION ERROR"
+
+def test_cancelled_job_items_dropped(client):
+    """Workers skip items of a cancelled job"""
+    classifier = FakeClassifier()
+    worker = make_worker(classifier)
+    job = create_job(client, ["Phones are getting faster", "The striker scored twice"])
+
+    response = client.delete(f"/api/v1/jobs/{job['job_id']}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+
+    worker.run_once(block_ms=100)
+    body = client.get(f"/api/v1/jobs/{job['job_id']}").json()
+    assert classifier.calls == []
+    assert body["status"] == "cancelled"
+    assert body["completed"] == 0
+
+def test_stale_items_reclaimed(client):
+    """Items a crashed worker never acknowledged are taken over by another"""
+    classifier = FakeClassifier()
+    crashed = make_worker(classifier, consumer="crashed")
+    job = create_job(client, ["Phones are getting faster"])
+    assert len(crashed.queue.read("crashed", count=10, block_ms=100)) == 1  # Read, never acked
+
+    survivor = make_worker(classifier, consumer="survivor", claim_idle=0)
+    assert survivor.run_once(block_ms=100) == 1
+    assert client.get(f"/api/v1/jobs/{job['job_id']}").json()["succeeded"] == 1
+
+def test_unknown_job(client):
+    response = client.get("/api/v1/jobs/does-not-exist")
+    assert response.status_code == 404
+    assert response.json()["error"]["code"] == "JOB_NOT_FOUND"
+
+def test_invalid_item_rejected(client):
+    """Every item is validated like the single-service request"""
+    response = client.post("/api/v1/jobs", json={"task": "classify", "items": ["Fine text here", "   "]})
+    assert response.status_code == 422
+    assert "Invalid item 1" in response.text
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from tests.conftest import client
+from src.cache.cache_manager import CacheManager
+from src.config.config import config
+from src.models.sentiment_analyzer import SentimentAnalyzer
+
+
+class FakeClient:
+    """Records the model of each call and can run a hook mid-call"""
+
+    def __init__(self, during_call=None):
+        self.models = []
+        self.during_call = during_call
+
+    def generate(self, model, prompt, **kwargs):
+        self.models.append(model)
+        if self.during_call:
+            self.during_call()
+        return {"response": json.dumps({"sentiment": "POSITIVE", "confidence": 0.9, "explanation": "Likes it"})}
+
+
+@pytest.fixture(autouse=True)
+def default_model():
+    model_paths = dict(config.model_paths)
+    config.set_current_model("llama")
+    yield
+    config.set_current_model("llama")
+    assert config.model_paths == model_paths
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = SentimentAnalyzer()
+    analyzer.client = FakeClient()
+    return analyzer
+
+
+def test_request_model_used_for_call_and_cache(analyzer):
+    """Each model gets its own cache entry, and the default is untouched"""
+    first = analyzer.analyze("I love it", None, "gemma2:2b")
+    second = analyzer.analyze("I love it")
+    again = analyzer.analyze("I love it", None, "gemma2:2b")
+
+    assert analyzer.client.models == ["gemma2:2b", "llama3.2:3b"]
+    assert first["model"] == again["model"] == "gemma2:2b"
+    assert second["model"] == "llama3.2:3b"
+    assert config.get_current_model() == "llama3.2:3b"
+
+def test_model_fixed_for_whole_request(analyzer):
+    """Changing the default mid-request doesn't change the request's model"""
+    analyzer.client = FakeClient(during_call=lambda: config.set_current_model("qwen"))
+    result = analyzer.analyze("I love it")
+
+    assert result["model"] == "llama3.2:3b"
+    cache_key = CacheManager().generate_key("sentiment", "I love it", model="llama3.2:3b")
+    assert CacheManager().get(cache_key)["model"] == "llama3.2:3b"
+
+def test_model_names_and_tags_accepted(client):
+    for model in ("gemma", "gemma2:2b"):
+        response = client.post("/api/v1/sentiment", json={"text": "", "model": model})
+        assert all(error["loc"][-1] != "model" for error in response.json()["detail"])
+
+    response = client.post("/api/v1/sentiment", json={"text": "I love it", "model": "gpt-9"})
+    assert response.status_code == 422
+    assert "Unknown model" in response.json()["detail"][0]["msg"]
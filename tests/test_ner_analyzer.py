@@ -1,4 +1,5 @@
 from tests.conftest import client
+from src.api.router import models
 
 def test_empty_input(client):
     """Test empty input text"""
@@ -95,4 +96,16 @@ def test_multilingual(client):
     # Validate entity positions
     for entity in data["entities"]:
         assert entity["start"] < entity["end"]
-        assert data["text"][entity["start"]:entity["end"]] == entity["text"]
\ No newline at end of file
+        assert data["text"][entity["start"]:entity["end"]] == entity["text"]
+def test_validated_entities_keep_only_response_fields():
+    """Extra fields from the model are dropped, positions are corrected"""
+    text = "Ada Lovelace lived in London."
+    entities = models.ner_analyzer._validate_entities(text, [
+        {"text": "Ada Lovelace", "type": "PERSON", "start": 0, "end": 12, "confidence": 0.912},
+        {"text": "London", "type": "LOCATION", "start": 3, "end": 9, "reason": "capital city"},
+        {"text": "Paris", "type": "LOCATION", "start": 0, "end": 5}
+    ])
+    assert entities == [
+        {"text": "Ada Lovelace", "type": "PERSON", "start": 0, "end": 12, "confidence": 0.91},
+        {"text": "London", "type": "LOCATION", "start": 22, "end": 28, "confidence": 0.85}
+    ]
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.exceptions.custom_exceptions import ModelConnectionError
+from src.inference.ollama_pool import OllamaPool
+from src.utils.request_context import routing_key
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Minimal Ollama API: /api/tags and /api/generate"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if not self.server.healthy:
+            return self._send(503, {"error": "unavailable"})
+        self._send(200, {"models": [{"name": name} for name in self.server.models]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not self.server.healthy:
+            return self._send(503, {"error": "unavailable"})
+        if body["model"] not in self.server.models:
+            return self._send(404, {"error": f"model '{body['model']}' not found"})
+        with self.server.lock:
+            self.server.hits += 1
+            self.server.requests.append(body)
+        time.sleep(self.server.delay)
+        self._send(200, {"model": body["model"], "response": self.server.response, "done": True, **self.server.stats})
+
+
+def start_stub(models, delay=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    server.models = set(models)
+    server.healthy = True
+    server.delay = delay
+    server.hits = 0
+    server.requests = []
+    server.response = '{"ok": true}'
+    server.stats = {}  # Extra fields of each /api/generate reply, e.g. eval_duration
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+
+@pytest.fixture
+def stubs():
+    servers = [start_stub(["llama3.2:3b"], delay=0.2) for _ in range(3)]
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_pool(servers, **settings):
+    pool = OllamaPool([server.url for server in servers], settings={"health_interval": 3600, **settings})
+    pool.probe()
+    return pool
+
+
+def test_least_outstanding_spreads_load(stubs):
+    """Concurrent requests are spread evenly across idle hosts"""
+    pool = make_pool(stubs)
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        results = list(executor.map(lambda _: pool.generate(model="llama3.2:3b", prompt="hi"), range(6)))
+
+    assert all(result["response"] == '{"ok": true}' for result in results)
+    assert [server.hits for server in stubs] == [2, 2, 2]
+    assert all(host["outstanding"] == 0 for host in pool.snapshot())
+    pool.stop()
+
+
+def test_routes_only_to_hosts_with_model(stubs):
+    """Hosts that don't serve a model never receive requests for it"""
+    for server in stubs:
+        server.delay = 0
+    stubs[0].models.add("gemma2:2b")
+    pool = make_pool(stubs)
+    for _ in range(5):
+        result = pool.generate(model="gemma2:2b", prompt="hi")
+        assert result["host"] == stubs[0].url
+
+    with pytest.raises(ModelConnectionError):
+        pool.generate(model="phi3:3.8b", prompt="hi")
+    pool.stop()
+
+
+def test_unhealthy_host_is_ejected_and_readmitted(stubs):
+    """A failing host is ejected by probes and comes back once healthy"""
+    pool = make_pool(stubs, unhealthy_threshold=2)
+    stubs[1].healthy = False
+    pool.probe()
+    pool.probe()
+    assert [host["healthy"] for host in pool.snapshot()] == [True, False, True]
+
+    for _ in range(4):
+        assert pool.generate(model="llama3.2:3b", prompt="hi")["host"] != stubs[1].url
+
+    stubs[1].healthy = True
+    pool.probe()
+    assert all(host["healthy"] for host in pool.snapshot())
+    pool.stop()
+
+
+def test_request_failures_eject_host(stubs):
+    """Connection failures on requests eject the host without waiting for a probe"""
+    for server in stubs:
+        server.delay = 0
+    pool = make_pool(stubs, unhealthy_threshold=1)
+    stubs[2].shutdown()
+    stubs[2].server_close()
+
+    seen = set()
+    for _ in range(6):
+        try:
+            seen.add(pool.generate(model="llama3.2:3b", prompt="hi")["host"])
+        except ModelConnectionError:
+            pass
+    assert stubs[2].url not in seen
+    assert pool.snapshot()[2]["healthy"] is False
+    pool.stop()
+
+
+def test_consistent_hash_affinity(stubs):
+    """The same cache key always lands on the same host"""
+    for server in stubs:
+        server.delay = 0
+    pool = make_pool(stubs, routing="consistent_hash")
+
+    hosts_by_key = {}
+    for i in range(30):
+        token = routing_key.set(f"sentiment:llama3.2:3b:{i}")
+        try:
+            first = pool.generate(model="llama3.2:3b", prompt="hi")["host"]
+            second = pool.generate(model="llama3.2:3b", prompt="hi")["host"]
+        finally:
+            routing_key.reset(token)
+        assert first == second
+        hosts_by_key[i] = first
+
+    # Keys are spread over the whole pool
+    assert len(set(hosts_by_key.values())) == 3
+    pool.stop()
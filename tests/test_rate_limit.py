@@ -0,0 +1,97 @@
+import time
+import uuid
+from redis.crc import key_slot
+from tests.conftest import client
+from src.api.rate_limiter import RateLimiter
+from src.config.config import config
+
+def api_key_headers():
+    """Fresh client identity so buckets don't leak between tests"""
+    return {"X-API-Key": uuid.uuid4().hex}
+
+def test_oversized_body_rejected(client):
+    """Bodies above max_request_size are refused before validation"""
+    response = client.post(
+        "/api/v1/sentiment",
+        json={"text": "a" * (config.api["max_request_size"] + 1)},
+        headers=api_key_headers()
+    )
+    assert response.status_code == 413
+    assert response.json()["error"]["code"] == "REQUEST_TOO_LARGE"
+
+def test_oversized_body_rejected_before_rate_limiting(client):
+    """A refused body doesn't take a token"""
+    headers = api_key_headers()
+    response = client.post(
+        "/api/v1/sentiment",
+        json={"text": "a" * (config.api["max_request_size"] + 1)},
+        headers=headers
+    )
+    assert response.status_code == 413 and "RateLimit-Limit" not in response.headers
+    response = client.post("/api/v1/sentiment", json={"text": ""}, headers=headers)
+    assert int(response.headers["RateLimit-Remaining"]) == config.api["rate_limit"] - 1
+
+def test_oversized_chunked_body_rejected(client):
+    """Chunked bodies without Content-Length are cut off at the limit"""
+    def chunks():
+        for _ in range(config.api["max_request_size"] // 1000 + 2):
+            yield b"a" * 1000
+
+    response = client.post(
+        "/api/v1/sentiment",
+        content=chunks(),
+        headers={**api_key_headers(), "Content-Type": "application/json"}
+    )
+    assert response.status_code == 413
+
+def test_rate_limit_headers(client):
+    """Limited endpoints report the bucket state"""
+    response = client.post("/api/v1/sentiment", json={"text": ""}, headers=api_key_headers())
+    assert response.status_code == 422
+    assert response.headers["RateLimit-Limit"] == str(config.api["rate_limit"])
+    assert int(response.headers["RateLimit-Remaining"]) == config.api["rate_limit"] - 1
+    assert "RateLimit-Reset" in response.headers
+
+def test_health_is_not_limited(client):
+    """Health checks are exempt from rate limiting"""
+    response = client.get("/api/v1/health")
+    assert response.status_code == 200
+    assert "RateLimit-Limit" not in response.headers
+
+def test_endpoint_limit_exceeded(client):
+    """Requests beyond the per-endpoint limit get 429 with Retry-After"""
+    headers = api_key_headers()
+    limit = config.api["endpoint_rate_limits"]["summarize"]
+    for _ in range(limit):
+        response = client.post("/api/v1/summarize", json={"text": ""}, headers=headers)
+        assert response.status_code == 422
+
+    response = client.post("/api/v1/summarize", json={"text": ""}, headers=headers)
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == "RATE_LIMIT_EXCEEDED"
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.headers["RateLimit-Remaining"] == "0"
+
+    # Other endpoints still have their own budget
+    response = client.post("/api/v1/sentiment", json={"text": ""}, headers=headers)
+    assert response.status_code == 422
+
+def test_buckets_share_a_cluster_slot():
+    """The token bucket script takes all of a request's buckets, which a cluster needs in one slot"""
+    buckets = RateLimiter(50, {"summarize": 10})._buckets("key:abc", "/api/v1/summarize")
+    assert len(buckets) == 2
+    assert len({key_slot(key.encode()) for key, _ in buckets}) == 1
+
+def test_local_buckets_are_bounded(monkeypatch):
+    """Fallback buckets don't pile up: refilled ones expire and the least recently used go past the cap"""
+    limiter = RateLimiter(60, max_local_buckets=100)
+    for i in range(500):
+        limiter._hit_local(limiter._buckets(f"ip:{i}", "/api/v1/sentiment"))
+    assert len(limiter._local) == 100
+    assert "ratelimit:{ip:499}" in limiter._local and "ratelimit:{ip:0}" not in limiter._local
+
+    # One token refills in a second, after which the buckets are full and dropped
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 1.5)
+    result = limiter._hit_local(limiter._buckets("ip:new", "/api/v1/sentiment"))
+    assert result.allowed and list(limiter._local) == ["ratelimit:{ip:new}"]
@@ -0,0 +1,143 @@
+import json
+import shutil
+import socket
+import time
+
+import pytest
+
+from tests.conftest import client
+from tests.test_redis_sharding import free_port, start_redis
+from src.api.rate_limiter import RateLimiter
+from src.cache import backend as cache_backend
+from src.cache.backend import FailoverCache
+from src.cache.redis_client import RedisClient
+from src.cache.sqlite_backend import SQLiteCache
+from src.jobs.job_queue import JobQueue
+from src.models.sentiment_analyzer import SentimentAnalyzer
+from src.utils.request_context import cache_stats
+
+FAST_RECONNECT = {"password": None, "reconnect_initial": 0.05, "reconnect_max": 0.2}
+
+
+class CountingClient:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, model, prompt, **kwargs):
+        self.calls += 1
+        return {"response": json.dumps({"sentiment": "POSITIVE", "confidence": 0.9, "explanation": "Likes it"})}
+
+
+@pytest.fixture
+def down():
+    """A client for a Redis that isn't running"""
+    return RedisClient({**FAST_RECONNECT, "port": free_port()})
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_unreachable_redis_is_bypassed_immediately(down):
+    assert not down.healthy
+    start = time.monotonic()
+    assert down.get("key") is None
+    assert down.set("key", "value", 60) is False
+    assert down.acquire_lock("lock:key", "token", 1000) is None
+    assert time.monotonic() - start < 0.05
+
+    snapshot = down.snapshot()
+    assert snapshot["state"] == "unhealthy" and snapshot["bypassed_operations"] == 3
+    assert wait_for(lambda: down.snapshot()["reconnect_attempts"] >= 2)
+
+def test_unreachable_cluster_doesnt_fail_construction():
+    cluster = RedisClient({**FAST_RECONNECT, "cluster": True, "port": free_port()})
+    assert cluster.client is None and not cluster.healthy
+    assert cluster.get("key") is None and cluster.set("key", "value", 60) is False
+
+@pytest.mark.skipif(shutil.which("redis-server") is None, reason="redis-server not installed")
+def test_outage_and_recovery(tmp_path):
+    port = free_port()
+    server = start_redis(tmp_path, port)
+    redis = RedisClient({**FAST_RECONNECT, "port": port})
+    try:
+        assert redis.healthy and redis.set("key", "value", 60)
+
+        server.terminate()
+        server.wait()
+        assert redis.get("key") is None  # Fails, and marks Redis down
+        assert not redis.healthy
+        assert redis.get("key") is None and redis.snapshot()["bypassed_operations"] == 1
+
+        server = start_redis(tmp_path, port)
+        assert wait_for(lambda: redis.healthy)
+        assert redis.set("key", "again", 60) and redis.get("key") == "again"
+        assert redis.snapshot()["outages"] == 1
+    finally:
+        server.terminate()
+        server.wait()
+
+def test_analyzer_bypasses_unhealthy_cache(down, monkeypatch):
+    monkeypatch.setattr(cache_backend, "_backend", down)
+    analyzer = SentimentAnalyzer()
+    analyzer.client = CountingClient()
+    stats = {}
+    token = cache_stats.set(stats)
+    try:
+        analyzer.analyze("I love it")
+        analyzer.analyze("I love it")
+    finally:
+        cache_stats.reset(token)
+    assert analyzer.client.calls == 2
+    assert stats == {"bypass": 2}
+
+def test_failover_to_sqlite_while_unhealthy(down, tmp_path):
+    cache = FailoverCache(down, lambda: SQLiteCache(str(tmp_path / "cache.db")))
+    assert isinstance(cache.active, SQLiteCache) and cache.healthy
+    assert cache.set("key", "value", 60) and cache.get("key") == "value"
+    assert cache.snapshot()["active"] == "fallback"
+
+def test_degraded_state_in_health_and_metrics(client, down, monkeypatch):
+    assert client.get("/api/v1/health").json()["status"] == "healthy"
+    monkeypatch.setattr(cache_backend, "_backend", down)
+    health = client.get("/api/v1/health").json()
+    assert health["status"] == "degraded" and health["cache"]["state"] == "unhealthy"
+    assert client.get("/api/v1/metrics").json()["cache"]["state"] == "unhealthy"
+
+def test_hung_redis_marked_unhealthy():
+    """A Redis that accepts connections but never answers times out instead of blocking"""
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        hung = RedisClient({**FAST_RECONNECT, "port": listener.getsockname()[1], "socket_timeout": 0.2})
+        start = time.monotonic()
+        assert hung.get("key") is None
+        assert not hung.healthy and time.monotonic() - start < 2
+
+def test_rate_limiter_skips_unhealthy_redis(down, monkeypatch):
+    monkeypatch.setattr(RedisClient, "_instance", down)
+    limiter = RateLimiter(5)
+    start = time.monotonic()
+    results = [limiter.hit("client", "/api/v1/sentiment") for _ in range(6)]
+    assert time.monotonic() - start < 0.05
+    assert [result.allowed for result in results] == [True] * 5 + [False]
+
+@pytest.mark.skipif(shutil.which("redis-server") is None, reason="redis-server not installed")
+def test_job_reads_block_past_command_timeout(tmp_path, monkeypatch):
+    port = free_port()
+    server = start_redis(tmp_path, port)
+    try:
+        monkeypatch.setattr(RedisClient, "_instance", RedisClient({"port": port, "password": None, "socket_timeout": 0.2}))
+        queue = JobQueue(settings={"stream": "jobs:test", "group": "workers"})
+        queue.redis.xgroup_create("jobs:test", "workers", id="0", mkstream=True)
+        start = time.monotonic()
+        assert queue.read("worker", 1, block_ms=500) == []
+        assert time.monotonic() - start >= 0.5
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,120 @@
+import shutil
+import socket
+import subprocess
+import time
+
+import pytest
+from redis import Redis
+
+from src.cache.redis_client import RedisClient
+from src.cache.sharding import HashRing
+
+pytestmark = pytest.mark.skipif(shutil.which("redis-server") is None, reason="redis-server not installed")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_redis(directory, port, *args):
+    process = subprocess.Popen(
+        ["redis-server", "--port", str(port), "--dir", str(directory), "--save", "", "--appendonly", "no", *args],
+        stdout=subprocess.DEVNULL
+    )
+    client = Redis(port=port)
+    for _ in range(100):
+        try:
+            client.ping()
+            return process
+        except Exception:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"redis-server on port {port} didn't start")
+
+
+@pytest.fixture(scope="module")
+def cluster(tmp_path_factory):
+    """Three shard nodes, the first with a read replica"""
+    directory = tmp_path_factory.mktemp("redis")
+    ports = [free_port() for _ in range(3)]
+    replica_port = free_port()
+    processes = [start_redis(directory, port) for port in ports]
+    processes.append(start_redis(directory, replica_port, "--replicaof", "127.0.0.1", str(ports[0])))
+    nodes = [f"127.0.0.1:{port}" for port in ports]
+    yield nodes, f"127.0.0.1:{replica_port}"
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+
+@pytest.fixture
+def sharded(cluster):
+    nodes, replica = cluster
+    client = RedisClient({"nodes": nodes, "replicas": {nodes[0]: [replica]}, "password": None})
+    yield client
+    client.flush()
+
+
+def wait_for_replica(client):
+    primary = client.shards.primaries[client.shards.ring.nodes[0]]
+    offset = primary.info("replication")["master_repl_offset"]
+    replica = client.shards.replicas[client.shards.ring.nodes[0]][0]
+    for _ in range(100):
+        if replica.info("replication").get("slave_repl_offset", -1) >= offset:
+            return
+        time.sleep(0.05)
+
+
+def test_ring_spreads_keys_and_moves_few_on_resize():
+    nodes = ["a:1", "b:2", "c:3"]
+    ring = HashRing(nodes)
+    keys = [f"sentiment:llama3.2:3b:{i}" for i in range(3000)]
+    counts = {node: 0 for node in nodes}
+    for key in keys:
+        counts[ring.node_for(key)] += 1
+    assert all(700 < count < 1300 for count in counts.values())
+
+    grown = HashRing(nodes + ["d:4"])
+    moved = sum(ring.node_for(key) != grown.node_for(key) for key in keys)
+    assert moved < len(keys) * 0.4
+    assert all(grown.node_for(key) == "d:4" for key in keys if ring.node_for(key) != grown.node_for(key))
+
+def test_keys_stored_on_their_shard(sharded):
+    for i in range(60):
+        assert sharded.set(f"key:{i}", {"i": i}, 60)
+    sizes = {node: client.dbsize() for node, client in sharded.shards.primaries.items()}
+    assert sum(sizes.values()) == 60 and all(sizes.values())
+    for i in range(60):
+        node = sharded.shards.ring.node_for(f"key:{i}")
+        assert sharded.shards.primaries[node].get(f"key:{i}") is not None
+
+    wait_for_replica(sharded)
+    assert [sharded.get(f"key:{i}") for i in range(60)] == [{"i": i} for i in range(60)]
+    assert sharded.delete("key:0") and sharded.get("key:0") is None
+
+def test_batch_operations_one_round_trip_per_shard(sharded):
+    items = {f"batch:{i}": {"i": i} for i in range(30)}
+    assert sharded.set_many(items, 60)
+    wait_for_replica(sharded)
+    groups = sharded.shards.group(list(items) + ["missing"], read=True)
+    assert len(groups) == 3
+    assert sharded.get_many(list(items) + ["missing"]) == items
+
+def test_reads_served_by_replica(sharded):
+    node = sharded.shards.ring.nodes[0]
+    key = next(f"key:{i}" for i in range(1000) if sharded.shards.ring.node_for(f"key:{i}") == node)
+    sharded.set(key, "value", 60)
+    wait_for_replica(sharded)
+    replica = sharded.shards.replicas[node][0]
+    before = replica.info("stats")["total_commands_processed"]
+    assert sharded.get(key) == "value"
+    assert replica.info("stats")["total_commands_processed"] > before + 1  # The GET, besides INFO
+
+def test_locks_on_shards(sharded):
+    assert sharded.acquire_lock("lock:k", "a", 1000)
+    assert not sharded.acquire_lock("lock:k", "b", 1000)
+    assert sharded.extend_lock("lock:k", "a", 1000)
+    assert not sharded.release_lock("lock:k", "b")
+    assert sharded.release_lock("lock:k", "a")
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from tests.conftest import client
+from tests.test_ollama_pool import start_stub
+from src.api.models import NERResponse, SentimentResponse
+from src.api import responses
+from src.api.responses import _shape, from_cache, wants_msgpack
+from src.api.router import models
+from src.config.config import config
+from src.inference.ollama_pool import OllamaPool
+from src.models.sentiment_analyzer import SentimentAnalyzer
+
+
+@pytest.fixture
+def sentiment_pool():
+    server = start_stub([config.get_current_model()])
+    server.response = json.dumps({"sentiment": "POSITIVE", "confidence": 0.9, "explanation": "Likes it"})
+    pool = OllamaPool([server.url], settings={"health_interval": 3600})
+    analyzer = SentimentAnalyzer()
+    analyzer.client = pool
+    models._sentiment = analyzer
+    yield pool
+    pool.stop()
+    server.shutdown()
+    server.server_close()
+
+
+def test_trusted_results_shaped_like_validated_ones():
+    result = {"model": "llama3.2:3b", "text": "Hi", "sentiment": "NEUTRAL", "confidence": 0.5,
+              "explanation": "Greeting", "internal": "dropped"}
+    validated = SentimentResponse.model_validate(result).model_dump(mode="json")
+    assert _shape(result, SentimentResponse) == validated
+    assert list(_shape(result, SentimentResponse)) == list(validated)
+
+    entities = {"text": "Bob", "entities": [{"text": "Bob", "type": "PERSON", "start": 0, "end": 3, "confidence": 0.9}],
+                "model": "llama3.2:3b"}
+    assert _shape(entities, NERResponse) == NERResponse.model_validate(entities).model_dump(mode="json")
+
+def test_only_pure_cache_hits_are_trusted():
+    assert from_cache({"hit": 1})
+    assert not from_cache({})
+    assert not from_cache({"hit": 1, "miss": 1})
+    assert not from_cache({"error": 1})
+
+def test_cached_response_identical_to_fresh(client, sentiment_pool):
+    fresh = client.post("/api/v1/sentiment", json={"text": "I love it"})
+    cached = client.post("/api/v1/sentiment", json={"text": "I love it"})
+    assert fresh.status_code == cached.status_code == 200
+    assert cached.headers["content-type"] == "application/json"
+    fresh_body, cached_body = fresh.json(), cached.json()
+    fresh_body["metadata"] = cached_body["metadata"] = None  # Processing time differs
+    assert fresh_body == cached_body
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/msgpack", True),
+    ("application/x-msgpack, */*", True),
+    ("application/msgpack;q=0", False),
+    ("application/json, application/msgpack; q=0.5", False),
+    ("application/json;q=0.8, application/msgpack", True),
+    ("application/json", False),
+])
+def test_msgpack_negotiated_by_quality(accept, expected, monkeypatch):
+    monkeypatch.setattr(responses, "msgpack", object())  # Installed or not
+    request = type("Request", (), {"headers": {"accept": accept}})()
+    assert wants_msgpack(request) is expected
+
+def test_msgpack_on_request(client, sentiment_pool):
+    msgpack = pytest.importorskip("msgpack")
+    response = client.post("/api/v1/sentiment", json={"text": "I love it"}, headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["sentiment"] == "POSITIVE"
+
+def test_large_responses_compressed(client):
+    response = client.get("/api/v1/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json()["info"]["title"]
+
+    small = client.get("/api/v1/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    refused = client.get("/api/v1/openapi.json", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from tests.conftest import client
+from tests.test_ollama_pool import start_stub
+from src.api.router import models
+from src.config.config import config
+from src.exceptions.custom_exceptions import CircuitOpenError, DeadlineExceededError
+from src.inference.ollama_pool import OllamaPool
+from src.inference.scheduler import PriorityScheduler
+from src.utils.request_context import deadline
+
+CLASSES = {
+    "interactive": {"weight": 3, "max_concurrency": 4},
+    "bulk": {"weight": 1, "max_concurrency": 4}
+}
+
+
+def wait_for(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "timed out waiting for condition"
+        time.sleep(0.005)
+
+
+def test_weighted_fair_dequeue():
+    """Under contention classes get slots in proportion to their weights"""
+    scheduler = PriorityScheduler(1, CLASSES, "bulk")
+    order = []
+
+    def worker(name):
+        with scheduler.slot(name):
+            order.append(name)
+
+    held = scheduler.acquire("bulk")
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ["bulk"] * 8 + ["interactive"] * 8]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: scheduler.snapshot()["classes"]["interactive"]["queue_depth"] == 8
+             and scheduler.snapshot()["classes"]["bulk"]["queue_depth"] == 8)
+
+    scheduler.release(held)
+    for thread in threads:
+        thread.join()
+
+    # While both classes wait, interactive gets about 3 of every 4 slots
+    assert order[:8].count("interactive") == 6
+    assert len(order) == 16
+
+def test_class_concurrency_cap():
+    """A class can't exceed its own cap even with global slots free"""
+    scheduler = PriorityScheduler(4, {**CLASSES, "bulk": {"weight": 1, "max_concurrency": 1}}, "bulk")
+    held = scheduler.acquire("bulk")
+
+    token = deadline.set(time.monotonic() + 0.1)
+    try:
+        with pytest.raises(DeadlineExceededError):
+            scheduler.acquire("bulk")
+        # Other classes are unaffected
+        scheduler.release(scheduler.acquire("interactive"))
+    finally:
+        deadline.reset(token)
+    scheduler.release(held)
+
+    snapshot = scheduler.snapshot()["classes"]["bulk"]
+    assert snapshot["expired"] == 1
+    assert snapshot["queue_depth"] == 0
+    assert snapshot["in_flight"] == 0
+    assert snapshot["dispatched"] == 1
+
+def test_unknown_class_uses_default():
+    """Unknown or missing classes are scheduled as the default class"""
+    scheduler = PriorityScheduler(2, CLASSES, "bulk")
+    with scheduler.slot("urgent") as cls:
+        assert cls.name == "bulk"
+    with scheduler.slot(None) as cls:
+        assert cls.name == "bulk"
+    assert scheduler.snapshot()["classes"]["bulk"]["dispatched"] == 2
+
+@pytest.fixture
+def scheduled_model():
+    """Point the sentiment analyzer at a stub Ollama behind a fresh scheduler"""
+    server = start_stub(["llama3.2:3b"], delay=0)
+    scheduler = PriorityScheduler(2, config.scheduler["classes"], config.scheduler["default_class"])
+    pool = OllamaPool([server.url], settings={"health_interval": 3600}, scheduler=scheduler)
+    models.sentiment_analyzer.client = pool
+    yield scheduler
+    pool.stop()
+    server.shutdown()
+    server.server_close()
+
+def test_open_circuits_fail_before_queueing():
+    """With every circuit open a call fails at once instead of waiting for a slot"""
+    server = start_stub(["llama3.2:3b"])
+    scheduler = PriorityScheduler(1, CLASSES, "bulk")
+    pool = OllamaPool([server.url], settings={"health_interval": 3600}, scheduler=scheduler)
+    try:
+        pool.probe()
+        breaker = pool.breaker(pool.hosts[0], "llama3.2:3b")
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        held = scheduler.acquire("bulk")  # Saturate the scheduler
+
+        token = deadline.set(time.monotonic() + 1.0)
+        try:
+            with pytest.raises(CircuitOpenError):
+                pool.generate("llama3.2:3b", "Hello")
+            with pytest.raises(CircuitOpenError):
+                pool.embed("llama3.2:3b", "Hello")
+        finally:
+            deadline.reset(token)
+        scheduler.release(held)
+
+        snapshot = scheduler.snapshot()["classes"]["bulk"]
+        assert snapshot["expired"] == 0
+        assert snapshot["dispatched"] == 1
+    finally:
+        pool.stop()
+        server.shutdown()
+        server.server_close()
+
+def test_priority_header_selects_class(client, scheduled_model):
+    """X-Priority decides which queue a request's model call waits in"""
+    client.post(
+        "/api/v1/sentiment",
+        json={"text": "Delivery took two weeks"},
+        headers={"X-Priority": "bulk"}
+    )
+    client.post("/api/v1/sentiment", json={"text": "Setup was painless"})
+
+    classes = scheduled_model.snapshot()["classes"]
+    assert classes["bulk"]["dispatched"] == 1
+    assert classes[config.scheduler["default_class"]]["dispatched"] == 1
+
+def test_metrics_endpoint(client):
+    """Per-class queue metrics are exposed without rate limiting"""
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    classes = response.json()["scheduler"]["classes"]
+    assert set(classes) == set(config.scheduler["classes"])
+    assert {"queue_depth", "in_flight", "wait_seconds"} <= set(classes["bulk"])
+    assert "RateLimit-Limit" not in response.headers
@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+
+from tests.conftest import client
+from performance_tests.ollama_stub import start_stub
+from src.api.router import models
+from src.cache import semantic_cache
+from src.cache.semantic_cache import SemanticCache, VectorIndex
+from src.config.config import config
+from src.inference.ollama_pool import OllamaPool
+from src.models.sentiment_analyzer import SentimentAnalyzer
+
+
+def unit_vectors(count, dim=32, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def stub():
+    server = start_stub(models=[config.get_current_model(), config.semantic_cache["embedding_model"]])
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def semantic(stub, tmp_path, monkeypatch):
+    """Semantic cache for sentiment, with the analyzer and embeddings on a stub host"""
+    pool = OllamaPool([stub.url], settings={"health_interval": 3600})
+    cache = SemanticCache(client=pool, settings={"enabled": True, "path": str(tmp_path)})
+    monkeypatch.setitem(config.semantic_cache, "enabled", True)
+    monkeypatch.setattr(semantic_cache, "_semantic_cache", cache)
+    analyzer = SentimentAnalyzer()
+    analyzer.client = pool
+    models._sentiment = analyzer
+    yield cache
+    pool.stop()
+
+
+def test_exact_search_finds_nearest_and_skips_removed():
+    vectors = unit_vectors(100)
+    index = VectorIndex()
+    for i, vector in enumerate(vectors):
+        index.add(vector, f"key:{i}")
+
+    row, similarity = index.search(vectors[42])
+    assert (index.keys[row], similarity) == ("key:42", pytest.approx(1.0))
+    index.remove(42)
+    assert index.search(vectors[42])[0] != 42
+
+def test_ivf_index_recall():
+    vectors = unit_vectors(4000)
+    index = VectorIndex(ann_threshold=1000, nprobe=8)
+    for i, vector in enumerate(vectors):
+        index.add(vector, f"key:{i}")
+    assert index._centroids is not None
+
+    # Slightly perturbed copies of stored vectors should find their originals
+    queries = vectors[:200] + 0.05 * unit_vectors(200, seed=1)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    found = sum(index.search(query)[0] == i for i, query in enumerate(queries))
+    assert found / len(queries) >= 0.95
+
+def test_save_and_memory_mapped_load(tmp_path):
+    vectors = unit_vectors(50)
+    index = VectorIndex()
+    for i, vector in enumerate(vectors):
+        index.add(vector, f"key:{i}")
+    index.remove(0)
+    index.save(str(tmp_path / "index"))
+
+    loaded = VectorIndex.load(str(tmp_path / "index"))
+    assert isinstance(loaded._mapped, np.memmap)
+    assert loaded.keys == [f"key:{i}" for i in range(1, 50)]
+    loaded.add(vectors[0], "key:0")
+    for i in (0, 10, 49):
+        assert loaded.keys[loaded.search(vectors[i])[0]] == f"key:{i}"
+
+def test_ivf_search_over_loaded_and_added_vectors(tmp_path):
+    vectors = unit_vectors(600)
+    index = VectorIndex()
+    for i, vector in enumerate(vectors[:300]):
+        index.add(vector, f"key:{i}")
+    index.save(str(tmp_path / "index"))
+
+    # Past the threshold with rows both memory-mapped and buffered, which
+    # the IVF lists interleave
+    loaded = VectorIndex.load(str(tmp_path / "index"), ann_threshold=400, nprobe=4)
+    for i, vector in enumerate(vectors[300:], start=300):
+        loaded.add(vector, f"key:{i}")
+    assert loaded._centroids is not None
+    for i in range(0, 600, 7):
+        row, similarity = loaded.search(vectors[i])
+        if row >= 0 and similarity > 0.99:
+            assert loaded.keys[row] == f"key:{i}"
+        assert similarity == pytest.approx(float(loaded.vectors()[row] @ vectors[i]), abs=1e-5)
+
+def test_saves_from_several_workers_are_merged(tmp_path):
+    vectors = unit_vectors(40)
+    path = str(tmp_path / "index")
+    workers = [VectorIndex(), VectorIndex()]
+    for i, vector in enumerate(vectors):
+        workers[i % 2].add(vector, f"key:{i}")
+    for worker in workers:
+        worker.save(path)
+
+    loaded = VectorIndex.load(path)
+    assert sorted(loaded.keys) == sorted(f"key:{i}" for i in range(40))
+    for i in (0, 1, 39):
+        assert loaded.keys[loaded.search(vectors[i])[0]] == f"key:{i}"
+
+def test_oldest_entries_dropped_beyond_max():
+    vectors = unit_vectors(30)
+    index = VectorIndex(max_entries=20)
+    for i, vector in enumerate(vectors):
+        index.add(vector, f"key:{i}")
+    assert len(index) <= 20
+    assert index.keys[-1] == "key:29" and "key:0" not in index.keys
+
+def test_full_index_evicts_in_chunks_without_reclustering(monkeypatch):
+    vectors = unit_vectors(600)
+    index = VectorIndex(ann_threshold=100, max_entries=200)
+    builds = []
+    build_ivf = index._build_ivf
+    monkeypatch.setattr(index, "_build_ivf", lambda: builds.append(len(index)) or build_ivf())
+    for i, vector in enumerate(vectors):
+        index.add(vector, f"key:{i}")
+
+    assert builds == [100, 200]  # Past the threshold, then doubled; never on eviction
+    assert 180 <= len(index) <= 200 and index.keys[-1] == "key:599"
+    assert sum(len(rows) for rows in index._lists) == len(index)
+    for i in (420, 500, 599):
+        assert index.keys[index.search(vectors[i])[0]] == f"key:{i}"
+
+def test_near_duplicate_served_from_semantic_cache(client, semantic, stub):
+    first = client.post("/api/v1/sentiment", json={"text": "I really love this phone, the camera is great"})
+    assert first.status_code == 200
+    assert "semantic_hit" not in (first.json()["metadata"] or {})
+
+    text = "I really love this phone. The camera is GREAT!"
+    second = client.post("/api/v1/sentiment", json={"text": text})
+    assert second.status_code == 200
+    body = second.json()
+    assert body["metadata"]["semantic_hit"]["similarity"] >= config.semantic_cache["thresholds"]["sentiment"]
+    assert body["text"] == text
+    assert body["sentiment"] == first.json()["sentiment"]
+    assert stub.stats["generate"] == 1
+
+    # Unrelated text is computed
+    third = client.post("/api/v1/sentiment", json={"text": "The parcel arrived on a Tuesday in a brown box"})
+    assert "semantic_hit" not in (third.json()["metadata"] or {})
+    assert stub.stats["generate"] == 2
+
+def test_expired_entry_dropped_from_index(semantic, stub):
+    models.sentiment_analyzer.analyze("I really love this phone, the camera is great")
+    semantic.backend.flush()
+    result = models.sentiment_analyzer.analyze("I really love this phone. The camera is great!")
+    assert "semantic_hit" not in (result.get("metadata") or {})
+    assert stub.stats["generate"] == 2
+
+def test_embedding_failure_falls_back_to_model(semantic, stub):
+    stub.models = [config.get_current_model()]  # Embedding model missing
+    result = models.sentiment_analyzer.analyze("I really love this phone, the camera is great")
+    assert result["sentiment"]
+    assert stub.stats["generate"] == 1
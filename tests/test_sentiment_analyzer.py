@@ -1,4 +1,5 @@
 from tests.conftest import client
+from src.config.config import config
 
 def test_empty_input(client):
     """Test empty input text"""
@@ -24,7 +25,7 @@ def test_whitespace_input(client):
 
 def test_too_long_input(client):
     """Test text exceeding max length"""
-    long_text = "a" * 1001  # Exceeds 1000 char limit
+    long_text = "a" * (config.sentiment["max_length"] + 1)
     response = client.post(
         "/api/v1/sentiment",
         json={"text": long_text}
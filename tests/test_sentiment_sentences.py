@@ -0,0 +1,118 @@
+import json
+import re
+import threading
+import time
+
+import pytest
+
+from tests.conftest import client
+from src.api.router import models
+from src.config.config import config
+from src.models.sentiment_analyzer import SentimentAnalyzer
+from src.utils.text_utils import group_spans, split_sentences
+
+
+class SentenceClient:
+    """Scores the analyzed text by keyword, tracking calls and concurrency"""
+
+    def __init__(self, delay=0.0):
+        self.texts = []
+        self.delay = delay
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate(self, model, prompt, **kwargs):
+        text = re.search(r'Analyze this text: "(.*)"\s*$', prompt, re.S).group(1)
+        with self.lock:
+            self.texts.append(text)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if "love" in text:
+            result = {"sentiment": "POSITIVE", "confidence": 0.9, "explanation": "Praise"}
+        elif "hate" in text:
+            result = {"sentiment": "NEGATIVE", "confidence": 0.6, "explanation": "Complaint"}
+        else:
+            result = {"sentiment": "NEUTRAL", "confidence": 0.5, "explanation": "Factual"}
+        return {"response": json.dumps(result)}
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = SentimentAnalyzer()
+    analyzer.client = SentenceClient(delay=0.05)
+    return analyzer
+
+
+def review(sentences):
+    return " ".join(sentences)
+
+
+def test_split_sentences():
+    text = "Dr. Smith loved the U.S. version! It lasted 2.5 days, said J. Doe.\nNew line here without a stop"
+    assert [text[s:e] for s, e in split_sentences(text)] == [
+        "Dr. Smith loved the U.S. version!", "It lasted 2.5 days, said J. Doe.", "New line here without a stop"
+    ]
+    # Short fragments join the previous sentence, run-ons are broken up
+    text = "I like it a lot. Ok. That settles it then."
+    assert [text[s:e] for s, e in split_sentences(text)] == ["I like it a lot. Ok.", "That settles it then."]
+    run_on = ", ".join(["the screen is bright"] * 40)
+    assert all(e - s <= 100 for s, e in split_sentences(run_on, max_chars=100))
+    assert group_spans([(0, 1), (2, 3), (4, 5), (6, 7), (8, 9)], 2) == [(0, 5), (6, 9)]
+
+def test_long_text_scored_per_sentence(analyzer):
+    sentences = [f"I love the camera on this phone, shot number {i} looks great." for i in range(6)] + \
+                [f"I hate how the battery drains during call number {i} at work." for i in range(3)]
+    result = analyzer.analyze(review(sentences))
+
+    assert len(analyzer.client.texts) == 9
+    assert 1 < analyzer.client.peak <= config.sentiment["concurrency"]
+    assert result["sentiment"] == "POSITIVE"
+    # 6 * 0.9 positive against 3 * 0.6 negative
+    assert result["metadata"]["score"] == pytest.approx((5.4 - 1.8) / 7.2, abs=1e-4)
+    assert result["confidence"] == pytest.approx(5.4 / 7.2, abs=1e-4)
+    assert result["metadata"]["sentence_counts"] == {"POSITIVE": 6, "NEUTRAL": 0, "NEGATIVE": 3}
+    first = result["metadata"]["sentences"][0]
+    assert result["text"][first["start"]:first["end"]] == first["text"] == sentences[0]
+
+def test_shared_sentences_hit_the_cache(analyzer):
+    shared = [f"I love the support team, ticket {i} was closed within an hour." for i in range(9)]
+    analyzer.analyze(review(shared + ["The parcel arrived on a Tuesday in a plain brown box."]))
+    analyzer.client.texts.clear()
+    result = analyzer.analyze(review(shared + ["I hate that the manual is only available online as a PDF."]))
+
+    assert analyzer.client.texts == ["I hate that the manual is only available online as a PDF."]
+    assert result["sentiment"] == "POSITIVE"
+
+def test_short_text_single_call_unless_asked(analyzer):
+    analyzer.analyze("I love it. I hate the box.")
+    assert len(analyzer.client.texts) == 1
+    result = analyzer.analyze("I love it so much. I hate the box it came in.", {"mode": "sentences"})
+    assert len(result["metadata"]["sentences"]) == 2
+
+def test_long_text_accepted_by_api(client, analyzer):
+    models._sentiment = analyzer
+    text = review([f"I love this blender, smoothie number {i} came out perfectly smooth." for i in range(30)])
+    assert len(text) > 1000
+    response = client.post("/api/v1/sentiment", json={"text": text})
+    assert response.status_code == 200
+    assert response.json()["metadata"]["mode"] == "sentences"
+
+def test_analyze_endpoint_matches_sentiment_endpoint(client, analyzer):
+    models._sentiment = analyzer
+    text = review([f"I love this kettle, pot number {i} boiled in under two minutes." for i in range(6)] +
+                  [f"I hate the lid, it stuck shut on the morning number {i} again." for i in range(4)])
+    assert len(text) > 600
+
+    single = client.post("/api/v1/sentiment", json={"text": text}).json()
+    analyzer.client.texts.clear()
+    response = client.post("/api/v1/analyze", json={"text": text, "tasks": ["sentiment"]})
+    assert response.status_code == 200
+    joint = response.json()
+
+    assert analyzer.client.texts == []  # Served from the per-sentence cache entries
+    assert joint["sentiment"]["sentiment"] == single["sentiment"]
+    assert joint["sentiment"]["confidence"] == single["confidence"]
+    assert joint["sentiment"]["metadata"]["mode"] == "sentences"
@@ -0,0 +1,107 @@
+import json
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from src.cache.cache_manager import CacheManager
+from src.cache.redis_client import RedisClient
+from src.cache.single_flight import SingleFlight
+from src.config.config import config
+from src.models.sentiment_analyzer import SentimentAnalyzer
+
+CALLS_KEY = "test:single_flight:calls"
+
+
+class CountingClient:
+    """Slow model counting its calls in Redis, so calls from every process add up"""
+
+    def __init__(self, delay=0.5, fail=False):
+        self.delay = delay
+        self.fail = fail
+
+    def generate(self, model, prompt, **kwargs):
+        RedisClient().client.incr(CALLS_KEY)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return {"response": json.dumps({"sentiment": "POSITIVE", "confidence": 0.9, "explanation": "Likes it"})}
+
+
+@pytest.fixture(autouse=True)
+def single_flight(monkeypatch):
+    monkeypatch.setitem(config.single_flight, "enabled", True)
+    monkeypatch.setitem(config.single_flight, "poll_initial", 0.02)
+    monkeypatch.setitem(config.single_flight, "poll_max", 0.1)
+
+
+def calls():
+    return int(RedisClient().client.get(CALLS_KEY) or 0)
+
+
+def analyze_in_process(text, results):
+    analyzer = SentimentAnalyzer()
+    analyzer.client = CountingClient()
+    results.put(analyzer.analyze(text)["sentiment"])
+
+
+def test_one_model_call_across_processes():
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [context.Process(target=analyze_in_process, args=("I love it", results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+
+    assert [results.get(timeout=1) for _ in processes] == ["POSITIVE"] * 4
+    assert calls() == 1
+
+def test_dead_holder_lock_expires_and_work_is_taken_over():
+    """A lock left by a crashed process only delays the next one by its TTL"""
+    key = CacheManager().generate_key("sentiment", "I love it", model=config.get_current_model())
+    RedisClient().acquire_lock(f"lock:{key}", "crashed-worker", 300)
+
+    analyzer = SentimentAnalyzer()
+    analyzer.client = CountingClient(delay=0)
+    start = time.monotonic()
+    assert analyzer.analyze("I love it")["sentiment"] == "POSITIVE"
+    assert 0.25 <= time.monotonic() - start < 5
+    assert calls() == 1
+
+def test_failed_holder_releases_lock_for_waiters():
+    failing, healthy = SentimentAnalyzer(), SentimentAnalyzer()
+    failing.client = CountingClient(delay=0.3, fail=True)
+    healthy.client = CountingClient(delay=0)
+    errors = []
+
+    def run_failing():
+        try:
+            failing.analyze("I love it")
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run_failing)
+    thread.start()
+    time.sleep(0.1)  # Let it take the lock
+    assert healthy.analyze("I love it")["sentiment"] == "POSITIVE"
+    thread.join()
+    assert len(errors) == 1 and calls() == 2
+
+def test_lock_held_while_computing_and_released_by_owner_only():
+    redis = RedisClient()
+    flight = SingleFlight(redis, {"lock_ttl_ms": 200, "renew_interval": 0.05})
+
+    def compute():
+        time.sleep(0.5)  # Outlives the TTL; the renewer keeps the lock
+        assert redis.client.get("lock:k") is not None
+        return "done"
+
+    assert flight.run("k", compute, lambda: None) == ("done", "computed")
+    assert redis.client.get("lock:k") is None
+
+    assert redis.acquire_lock("lock:k", "a", 1000)
+    assert not redis.acquire_lock("lock:k", "b", 1000)
+    assert not redis.release_lock("lock:k", "b")
+    assert redis.release_lock("lock:k", "a")
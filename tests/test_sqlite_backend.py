@@ -0,0 +1,101 @@
+import json
+import multiprocessing
+import time
+
+import pytest
+
+from src.cache import backend as cache_backend
+from src.cache.backend import FailoverCache, load_backend
+from src.cache.redis_client import RedisClient
+from src.cache.sqlite_backend import SQLiteCache
+from src.config.config import config
+from src.models.sentiment_analyzer import SentimentAnalyzer
+
+
+class CountingClient:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, model, prompt, **kwargs):
+        self.calls += 1
+        return {"response": json.dumps({"sentiment": "POSITIVE", "confidence": 0.9, "explanation": "Likes it"})}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SQLiteCache(str(tmp_path / "cache.db"))
+
+
+def write_entries(path, worker, results):
+    cache = SQLiteCache(path)
+    results.put(all(cache.set(f"key:{worker}:{i}", {"worker": worker, "i": i}, 60) for i in range(200)))
+
+
+def test_get_set_delete_and_expiry(cache):
+    assert cache.get("missing") is None
+    assert cache.set("key", {"sentiment": "POSITIVE"}, 60)
+    assert cache.get("key") == {"sentiment": "POSITIVE"}
+    assert cache.set("short", [1, 2], 1)
+    time.sleep(1.1)
+    assert cache.get("short") is None
+    assert cache.delete("key") and not cache.delete("key")
+    assert cache.flush() and cache.get("key") is None
+
+def test_least_recently_used_evicted_beyond_size(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_bytes=10_000, evict_every=1)
+    for i in range(5):
+        cache.set(f"old:{i}", "x" * 1000, 60)
+    time.sleep(1.1)
+    cache.get("old:0")  # Recently used, so kept
+    for i in range(6):
+        cache.set(f"new:{i}", "x" * 1000, 60)
+
+    total = cache._db().execute("SELECT SUM(size) FROM entries").fetchone()[0]
+    assert total <= 10_000
+    assert cache.get("old:0") is not None and cache.get("old:1") is None
+
+def test_locks(cache):
+    assert cache.acquire_lock("lock:k", "a", 1000)
+    assert cache.acquire_lock("lock:k", "b", 1000) is False
+    assert not cache.release_lock("lock:k", "b")
+    assert cache.extend_lock("lock:k", "a", 1000)
+    assert cache.release_lock("lock:k", "a")
+
+    assert cache.acquire_lock("lock:k", "dead", 100)
+    time.sleep(0.15)
+    assert cache.acquire_lock("lock:k", "b", 1000)  # Expired lock taken over
+    assert not cache.extend_lock("lock:k", "dead", 1000)
+
+def test_concurrent_writers_across_processes(cache):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [context.Process(target=write_entries, args=(cache.path, worker, results)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+
+    assert [results.get(timeout=1) for _ in processes] == [True] * 4
+    assert cache.get("key:3:199") == {"worker": 3, "i": 199}
+    assert cache._db().execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 800
+
+def test_falls_back_to_sqlite_without_redis(tmp_path, monkeypatch):
+    monkeypatch.setattr(RedisClient, "_instance", None)
+    monkeypatch.setitem(config.redis, "port", 1)  # Nothing listens there
+    settings = {**config.cache_backend, "sqlite_path": str(tmp_path / "fallback.db")}
+    backend = load_backend(settings)
+    assert isinstance(backend, FailoverCache) and isinstance(backend.active, SQLiteCache)
+    assert backend.set("key", "value", 60) and backend.get("key") == "value"
+
+    monkeypatch.setattr(RedisClient, "_instance", None)
+    redis = load_backend({**settings, "fallback": "none"})
+    assert isinstance(redis, RedisClient) and not redis.healthy
+
+def test_analyzer_cached_in_sqlite(cache, monkeypatch):
+    monkeypatch.setattr(cache_backend, "_backend", cache)
+    analyzer = SentimentAnalyzer()
+    analyzer.client = CountingClient()
+    assert analyzer.analyze("I love it")["sentiment"] == "POSITIVE"
+    assert analyzer.analyze("I love it")["sentiment"] == "POSITIVE"
+    assert analyzer.client.calls == 1
+    assert cache._db().execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 1
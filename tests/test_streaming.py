@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+
+import pytest
+
+from tests.conftest import client
+from src.api.router import models
+from src.config.config import config
+
+
+class FakeClassifier:
+    """Stands in for TextClassifier and tracks how many calls overlap"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def classify(self, text, options=None, model=None):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return {"text": text, "categories": [{"category": "tech", "confidence": 0.9}], "model": "stub"}
+
+
+@pytest.fixture
+def classifier():
+    fake = FakeClassifier()
+    models._classifier = fake
+    return fake
+
+
+def ndjson(*items):
+    return "".join(json.dumps(item) + "\n" for item in items)
+
+def parse(response):
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return sorted(lines, key=lambda line: line["index"])
+
+def test_stream_results_per_line(client, classifier):
+    """Every input line gets a result line with its index, errors included"""
+    body = ndjson({"text": "Phones are getting faster"}, {"text": "   "}) + "not json\n\n" + ndjson(
+        {"text": "Rates went up again", "options": {"multi_label": True}}
+    )
+    response = client.post("/api/v1/stream/classify", content=body,
+                           headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = parse(response)
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert lines[0]["result"]["text"] == "Phones are getting faster"
+    assert lines[1]["error"]["code"] == "VALIDATION_ERROR"
+    assert lines[2]["error"]["code"] == "VALIDATION_ERROR"
+    assert lines[3]["result"]["text"] == "Rates went up again"
+
+def test_stream_gzip(client, classifier):
+    """Output is gzip-compressed when the client accepts it"""
+    body = ndjson(*({"text": f"Headline number {i}"} for i in range(20)))
+    response = client.post("/api/v1/stream/classify", content=body, headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(parse(response)) == 20  # Decoded by the client
+
+def test_stream_concurrency_is_bounded(client, classifier, monkeypatch):
+    """No more than `concurrency` lines run at once"""
+    monkeypatch.setitem(config.stream, "concurrency", 3)
+    classifier.delay = 0.02
+    body = ndjson(*({"text": f"Headline number {i}"} for i in range(15)))
+    response = client.post("/api/v1/stream/classify", content=body)
+
+    assert len(parse(response)) == 15
+    assert 1 < classifier.max_active <= 3
+
+def test_stream_exempt_from_body_limit(client, classifier):
+    """Streams may exceed max_request_size; only single lines are limited"""
+    line = {"text": "word " * 150}
+    count = config.api["max_request_size"] // len(json.dumps(line)) + 10
+    body = ndjson(*([line] * count)) + ndjson({"text": "x" * (config.stream["max_line_size"] + 1)})
+    response = client.post("/api/v1/stream/classify", content=body)
+
+    assert response.status_code == 200
+    lines = parse(response)
+    assert len(lines) == count + 1
+    assert all("result" in line for line in lines[:-1])
+    assert lines[-1]["error"]["code"] == "LINE_TOO_LARGE"
+
+def test_stream_unknown_task(client):
+    response = client.post("/api/v1/stream/translate", content=ndjson({"text": "hello there"}))
+    assert response.status_code == 422
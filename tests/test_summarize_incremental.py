@@ -0,0 +1,108 @@
+import json
+import random
+import re
+import threading
+
+import pytest
+
+from tests.conftest import client
+from src.api.router import models
+from src.config.config import config
+from src.models.text_summarizer import TextSummarizer
+from src.utils.text_utils import content_defined_chunks
+
+
+class SummaryClient:
+    """Summarizes with the first words of the text, recording what it was asked to summarize"""
+
+    def __init__(self):
+        self.texts = []
+        self.lock = threading.Lock()
+
+    def generate(self, model, prompt, **kwargs):
+        text = re.search(r"Text to summarize: (.*)\s*$", prompt, re.S).group(1).strip()
+        with self.lock:
+            self.texts.append(text)
+        words = text.split()
+        return {"response": json.dumps({"summary": " ".join(words[:12]), "key_points": [words[0], words[-1]]})}
+
+
+def document(paragraphs=12, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ["ticket", "release", "server", "deploy", "customer", "latency", "patch", "rollback",
+                  "database", "queue", "review", "budget", "team", "meeting", "incident", "metric"]
+    return "\n\n".join(
+        " ".join(rng.choice(vocabulary) for _ in range(rng.randint(80, 160))) + "." for _ in range(paragraphs)
+    )
+
+
+@pytest.fixture
+def summarizer():
+    summarizer = TextSummarizer()
+    summarizer.client = SummaryClient()
+    return summarizer
+
+
+def test_chunks_cover_text_and_survive_edits():
+    text = document()
+    spans = content_defined_chunks(text, min_size=200, avg_size=600, max_size=1500)
+    assert "".join(text[s:e] for s, e in spans) == text
+    assert all(e - s <= 1500 for s, e in spans)
+    assert len(spans) > 5
+
+    # An insertion in the middle leaves the other chunks identical
+    middle = len(text) // 2
+    edited = text[:middle] + " urgent hotfix applied overnight " + text[middle:]
+    before = {text[s:e] for s, e in spans}
+    after = [edited[s:e] for s, e in content_defined_chunks(edited, min_size=200, avg_size=600, max_size=1500)]
+    assert sum(chunk not in before for chunk in after) <= 2
+
+def test_edit_only_resummarizes_changed_chunks(summarizer, monkeypatch):
+    monkeypatch.setitem(config.summarize, "min_chunk", 200)
+    monkeypatch.setitem(config.summarize, "avg_chunk", 600)
+    monkeypatch.setitem(config.summarize, "max_chunk", 1500)
+    text = document()
+
+    first = summarizer.summarize(text, {"mode": "incremental"})
+    chunks = first["metadata"]["chunks"]
+    assert first["metadata"]["chunks_reused"] == 0
+    assert len(summarizer.client.texts) == chunks + 1  # Map plus reduce
+    assert first["original_text"] == text and first["summary"]
+
+    summarizer.client.texts.clear()
+    middle = len(text) // 2
+    edited = text[:middle] + " urgent hotfix applied overnight " + text[middle:]
+    second = summarizer.summarize(edited, {"mode": "incremental"})
+    assert second["metadata"]["chunks_reused"] >= second["metadata"]["chunks"] - 2
+    assert len(summarizer.client.texts) <= 3  # Changed chunks plus reduce
+    assert any("urgent hotfix" in text for text in summarizer.client.texts)
+
+def test_single_chunk_summarized_as_requested(summarizer):
+    text = document(paragraphs=1)[:400].strip()  # Below the minimum chunk size
+    incremental = summarizer.summarize(text, {"mode": "incremental", "max_length": 30, "type": "extractive"})
+    assert incremental["metadata"]["chunks"] == 1
+    assert summarizer.client.texts == [text]  # One call, on the whole text
+
+    # Same summary (and cache entry) as without incremental mode
+    plain = summarizer.summarize(text, {"max_length": 30, "type": "extractive"})
+    assert plain["summary"] == incremental["summary"]
+    assert len(summarizer.client.texts) == 1
+
+def test_incremental_mode_through_api(client, summarizer):
+    models._summarizer = summarizer
+    response = client.post("/api/v1/summarize", json={"text": document(), "options": {"mode": "incremental"}})
+    assert response.status_code == 200
+    assert response.json()["metadata"]["mode"] == "incremental"
+
+def test_incremental_mode_through_analyze(client, summarizer):
+    models._summarizer = summarizer
+    text = document()
+    single = client.post("/api/v1/summarize", json={"text": text, "options": {"mode": "incremental"}}).json()
+    summarizer.client.texts.clear()
+    response = client.post("/api/v1/analyze", json={"text": text, "tasks": ["summarize"],
+                                                     "options": {"summarize": {"mode": "incremental"}}})
+    assert response.status_code == 200
+    joint = response.json()["summarize"]
+    assert joint["metadata"]["mode"] == "incremental"
+    assert joint["summary"] == single["summary"]
+    assert summarizer.client.texts == []  # Chunk and reduce summaries came from the cache
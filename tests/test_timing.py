@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from tests.conftest import client
+from tests.test_ollama_pool import start_stub
+from src.api.router import models
+from src.config.config import config
+from src.inference.ollama_pool import OllamaPool
+from src.inference.scheduler import PriorityScheduler
+from src.models.sentiment_analyzer import SentimentAnalyzer
+from src.utils.request_context import StageTimings, record_timing, timed, timings
+
+
+def parse_server_timing(header):
+    stages = {}
+    for entry in header.split(", "):
+        name, duration = entry.split(";dur=")
+        stages[name] = float(duration)
+    return stages
+
+
+@pytest.fixture
+def sentiment_pool():
+    """Sentiment analyzer backed by a stub Ollama host reporting its own durations"""
+    server = start_stub([config.get_current_model()])
+    server.response = json.dumps({"sentiment": "POSITIVE", "confidence": 0.9, "explanation": "Likes it"})
+    server.stats = {"load_duration": 1_000_000, "prompt_eval_duration": 20_000_000, "eval_duration": 30_000_000,
+                    "prompt_eval_count": 12, "eval_count": 9}
+    scheduler = PriorityScheduler(2, {"standard": {"weight": 1, "max_concurrency": 2}}, "standard")
+    pool = OllamaPool([server.url], settings={"health_interval": 3600}, scheduler=scheduler)
+    analyzer = SentimentAnalyzer()
+    analyzer.client = pool
+    models._sentiment = analyzer
+    yield pool
+    pool.stop()
+    server.shutdown()
+    server.server_close()
+
+
+def test_stages_in_server_timing_header(client, sentiment_pool):
+    response = client.post("/api/v1/sentiment", json={"text": "I love it"})
+    assert response.status_code == 200
+    stages = parse_server_timing(response.headers["Server-Timing"])
+
+    for stage in ("validate", "handler", "serialize", "cache_key", "redis", "queue", "ollama", "parse", "total"):
+        assert stage in stages
+    assert stages["prompt_eval"] == 20.0
+    assert stages["generation"] == 30.0
+    assert stages["total"] >= stages["handler"] >= stages["ollama"]
+    assert "metadata" not in response.json() or "timings_ms" not in (response.json()["metadata"] or {})
+
+def test_cache_hit_skips_model_stages(client, sentiment_pool):
+    client.post("/api/v1/sentiment", json={"text": "I love it"})
+    response = client.post("/api/v1/sentiment", json={"text": "I love it"})
+    stages = parse_server_timing(response.headers["Server-Timing"])
+    assert "redis" in stages
+    assert "ollama" not in stages
+
+def test_timings_in_metadata_on_request(client, sentiment_pool):
+    response = client.post(
+        "/api/v1/sentiment",
+        json={"text": "I love it", "options": {"include_metadata": True}},
+        headers={"X-Include-Timings": "true"}
+    )
+    metadata = response.json()["metadata"]
+    assert "sentiment_breakdown" in metadata
+    assert metadata["timings_ms"]["generation"] == 30.0
+    assert isinstance(metadata["processing_time_seconds"], float)
+
+def test_rejected_request_still_timed(client):
+    response = client.post("/api/v1/sentiment", json={"text": ""})
+    assert response.status_code == 422
+    assert "validate" in parse_server_timing(response.headers["Server-Timing"])
+
+def test_stages_accumulate_and_noop_without_request():
+    with timed("redis"):
+        pass  # No timing context: nothing to record into
+    record_timing("redis", 1.0)
+
+    current = StageTimings()
+    token = timings.set(current)
+    try:
+        record_timing("redis", 0.001)
+        record_timing("redis", 0.002)
+        with timed("parse"):
+            pass
+    finally:
+        timings.reset(token)
+    assert current.milliseconds()["redis"] == 3.0
+    assert "parse;dur=" in current.server_timing()
@@ -0,0 +1,103 @@
+import json
+import random
+
+import pytest
+
+from tests.conftest import client
+from tests.test_timing import sentiment_pool
+from src.cli import main as cli_main
+from src.utils.tracing import JSONLExporter, Tracer, set_tracer, summarize_spans
+
+
+def read_spans(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+
+@pytest.fixture
+def span_file(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(JSONLExporter(str(path)))
+    previous = set_tracer(tracer)
+    yield path
+    set_tracer(previous)
+    tracer.shutdown()
+
+
+def test_request_trace(client, sentiment_pool, span_file):
+    """A request's spans form one trace from the handler down to the Ollama host"""
+    client.post("/api/v1/sentiment", json={"text": "I love it"})
+    client.post("/api/v1/sentiment", json={"text": "I love it"})
+
+    spans = read_spans(span_file)
+    first_trace = [span for span in spans if span["trace_id"] == spans[0]["trace_id"]]
+    by_name = {span["name"]: span for span in first_trace}
+    assert {"http.request", "service", "redis", "model.generate", "scheduler.wait", "ollama.call"} <= set(by_name)
+
+    root = by_name["http.request"]
+    assert root["parent_id"] is None
+    assert root["attributes"]["route"] == "/api/v1/sentiment"
+    assert root["attributes"]["status_code"] == 200
+    assert by_name["service"]["parent_id"] == root["span_id"]
+    assert by_name["service"]["attributes"] == {"service": "sentiment", "model": "llama3.2:3b", "cache": "miss"}
+    call = by_name["ollama.call"]
+    assert call["parent_id"] == by_name["model.generate"]["span_id"]
+    assert call["attributes"]["host"] == sentiment_pool.hosts[0].url
+    assert call["attributes"]["prompt_tokens"] == 12
+
+    cached = [span for span in spans if span["name"] == "service" and span["trace_id"] != root["trace_id"]]
+    assert cached[0]["attributes"]["cache"] == "hit"
+
+def test_sampling_keeps_whole_traces(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(JSONLExporter(str(path), sample_rate=0.5))
+    random.seed(7)
+    for _ in range(40):
+        with tracer.span("root"):
+            with tracer.span("child"):
+                pass
+    tracer.shutdown()
+
+    spans = read_spans(path)
+    traces = {span["trace_id"] for span in spans}
+    assert 0 < len(traces) < 40
+    assert len(spans) == 2 * len(traces)
+
+def test_error_recorded_on_span(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(JSONLExporter(str(path)))
+    with pytest.raises(ValueError):
+        with tracer.span("parse"):
+            raise ValueError("bad json")
+    tracer.shutdown()
+
+    span = read_spans(path)[0]
+    assert span["status"] == "error"
+    assert span["attributes"]["error"] == "ValueError: bad json"
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(None)
+    with tracer.span("root") as span:
+        span.set_attribute("ignored", True)
+        assert not span.sampled
+
+def test_summary(tmp_path, capsys):
+    spans = [
+        {"trace_id": "a", "span_id": "1", "parent_id": None, "name": "http.request", "duration_ms": 100.0, "attributes": {}},
+        {"trace_id": "a", "span_id": "2", "parent_id": "1", "name": "service", "duration_ms": 90.0,
+         "attributes": {"service": "ner", "cache": "miss"}},
+        {"trace_id": "b", "span_id": "3", "parent_id": None, "name": "http.request", "duration_ms": 10.0, "attributes": {}},
+        {"trace_id": "b", "span_id": "4", "parent_id": "3", "name": "service", "duration_ms": 2.0,
+         "attributes": {"service": "ner", "cache": "hit"}, "status": "ok"},
+    ]
+    summary = summarize_spans(spans)
+    assert summary["traces"] == 2
+    ner = summary["spans"]["service[ner]"]
+    assert ner["count"] == 2
+    assert ner["cache_hit_ratio"] == 0.5
+    assert ner["share_of_root"] == round(92 / 110, 4)
+
+    path = tmp_path / "spans.jsonl"
+    path.write_text("".join(json.dumps(span) + "\n" for span in spans))
+    assert cli_main(["traces", str(path)]) == 0
+    assert json.loads(capsys.readouterr().out)["spans"]["http.request"]["count"] == 2
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from tests.conftest import client
+from tests.test_ollama_pool import start_stub
+from src.api.router import models
+from src.config.config import config
+from src.inference.ollama_pool import OllamaPool, get_ollama_pool
+from src.inference.usage import UsageStats
+from src.models.sentiment_analyzer import SentimentAnalyzer
+
+STATS = {"load_duration": 10_000_000, "prompt_eval_duration": 100_000_000, "eval_duration": 200_000_000,
+         "total_duration": 320_000_000, "prompt_eval_count": 50, "eval_count": 20}
+
+
+@pytest.fixture
+def stub():
+    server = start_stub([config.get_current_model()])
+    server.response = json.dumps({"sentiment": "POSITIVE", "confidence": 0.9, "explanation": "Likes it"})
+    server.stats = dict(STATS)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def sentiment_pool(stub):
+    """Sentiment analyzer on a stub host, accounting into the pool /metrics reports"""
+    pool = OllamaPool([stub.url], settings={"health_interval": 3600}, usage=get_ollama_pool().usage)
+    pool.usage.reset()
+    analyzer = SentimentAnalyzer()
+    analyzer.client = pool
+    models._sentiment = analyzer
+    yield pool
+    pool.usage.reset()
+    pool.stop()
+
+
+def test_aggregates_per_service_model_and_host():
+    usage = UsageStats()
+    usage.record("sentiment", "llama3.2:3b", "http://a", STATS)
+    usage.record("sentiment", "llama3.2:3b", "http://a", {**STATS, "load_duration": 0})
+    usage.record("ner", "llama3.2:3b", "http://a", {})  # Older Ollama without statistics
+
+    ner, sentiment = usage.snapshot()
+    assert (sentiment["service"], sentiment["calls"]) == ("sentiment", 2)
+    assert sentiment["prompt_tokens_per_second"] == 500.0
+    assert sentiment["generation_tokens_per_second"] == 100.0
+    assert sentiment["avg_completion_tokens"] == 20.0
+    assert sentiment["avg_total_ms"] == 320.0
+    assert sentiment["time_split"]["generation"] == pytest.approx(400 / 610, abs=1e-4)
+    assert ner["generation_tokens_per_second"] is None
+
+def test_usage_in_metrics_and_metadata(client, sentiment_pool, stub):
+    response = client.post("/api/v1/sentiment", json={"text": "I love it"}, headers={"X-Include-Timings": "true"})
+    assert response.json()["metadata"]["model_usage"] == {"model_calls": 1, "prompt_tokens": 50, "completion_tokens": 20}
+
+    # Served from the cache: no model call to account for
+    cached = client.post("/api/v1/sentiment", json={"text": "I love it"}, headers={"X-Include-Timings": "true"})
+    assert "model_usage" not in cached.json()["metadata"]
+
+    groups = client.get("/api/v1/metrics").json()["model_usage"]
+    assert [(g["service"], g["model"], g["host"], g["calls"]) for g in groups] == [
+        ("sentiment", config.get_current_model(), stub.url, 1)
+    ]
@@ -0,0 +1,89 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from tests.conftest import client
+from tests.test_ollama_pool import start_stub
+import src.api.router as router_module
+from src.api.router import LazyModelLoader
+from src.inference.ollama_pool import OllamaPool
+from src.inference.warmup import WarmupState, check_readiness, configured_models, run_warmup
+
+
+@pytest.fixture
+def stub():
+    server = start_stub(configured_models())
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def pool(stub):
+    pool = OllamaPool([stub.url], settings={"health_interval": 3600})
+    yield pool
+    pool.stop()
+
+
+def test_concurrent_first_requests_build_one_analyzer(monkeypatch):
+    """Analyzers are built once even when first requested concurrently"""
+    built = []
+
+    class SlowClassifier:
+        def __init__(self):
+            built.append(self)
+            time.sleep(0.05)
+
+    monkeypatch.setattr(router_module, "TextClassifier", SlowClassifier)
+    loader = LazyModelLoader()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(loader.classifier)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(result is built[0] for result in results)
+
+def test_warmup_loads_every_model(pool, stub):
+    """Each configured model gets a one-token generation with keep_alive"""
+    state = WarmupState()
+    run_warmup(SimpleNamespace(load_all=lambda: None), state, pool)
+
+    snapshot = state.snapshot()
+    assert snapshot["status"] == "ready"
+    assert snapshot["steps"]["redis"]["ok"]
+    assert stub.hits == len(configured_models())
+    request = stub.requests[0]
+    assert request["options"] == {"num_predict": 1}
+    assert request["keep_alive"] == pool.settings["keep_alive"]
+
+def test_warmup_fails_without_model(pool, stub):
+    """A model no host can load leaves the instance not ready"""
+    stub.models = {"other:1b"}
+    state = WarmupState()
+    run_warmup(SimpleNamespace(load_all=lambda: None), state, pool)
+
+    assert state.status == "failed"
+    ready, checks = check_readiness(state, pool)
+    assert not ready
+    assert not any(check["ok"] for check in checks["models"].values())
+
+def test_ready_when_models_served(pool):
+    pool.probe()
+    ready, checks = check_readiness(WarmupState(), pool)
+    assert ready
+    for check in checks["models"].values():
+        assert check["hosts"] == [pool.hosts[0].url]
+
+def test_ready_endpoint_separate_from_health(client):
+    """Without a reachable Ollama host /ready is 503 while /health stays up"""
+    assert client.get("/api/v1/health").status_code == 200
+    response = client.get("/api/v1/ready")
+    assert response.status_code in (200, 503)
+    body = response.json()
+    assert body["status"] == ("ready" if response.status_code == 200 else "not_ready")
+    assert body["checks"]["redis"]["ok"]
+    assert "RateLimit-Limit" not in response.headers